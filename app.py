@@ -1,18 +1,54 @@
 # Your main Flask application (backend logic, API routes)
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Request, current_app, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context, send_file, abort
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 import os
 import json
+import time
+import threading
+import zipfile
 from datetime import datetime
-from models import db, User, DroneImage, SoilReport, WeatherSuggestion, ChatHistory
+from sqlalchemy.exc import IntegrityError
+from database import init_database, WriteBehindBatcher
+from models import db, User, DroneImage, SoilReport, SoilNutrient, WeatherSuggestion, ChatHistory, Job, UserSummary
+from jobs import JobQueue, job_handler
+from translation import translator, translate_batch
+from llm_client import llm_client
+from response_cache import response_cache
+from model_registry import model_registry
+from pagination import paginate_user_rows
+from thumbnails import get_derivative, generate_derivatives, DERIVATIVE_SIZES, DERIVATIVE_FORMATS
+from nutrients import parse_nutrients, nutrient_trends, NUTRIENTS, PERIOD_FORMATS
+from field_health import field_health_trend, image_metrics
+import migrations
+import metrics
+import summaries
+import outbreaks
+import http_cache
+from http_cache import conditional_get
+from chat_context import build_chat_context, fold_history
+from config import load_settings
+from weather import get_user_suggestion, prewarm_weather_advisories, WeatherPrewarmScheduler
 from utils import (
     save_uploaded_file, analyze_image_with_ml, extract_text_with_ocr,
-    analyze_soil_with_ai, translate_text, get_weather_suggestion, chat_with_gemma
+    analyze_soil_with_ai, chat_with_gemma, stream_chat_with_gemma,
+    allowed_file, save_file_bytes, read_zip_frames, analyze_images_batch, summarize_flight
 )
 
+
+class UploadLimitRequest(Request):
+    """A whole drone flight may exceed MAX_CONTENT_LENGTH, so the batch route has its own limit"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'api_analyze_images_batch':
+            return current_app.config['BATCH_MAX_UPLOAD_BYTES']
+        return super().max_content_length
+
+
 app = Flask(__name__)
+app.request_class = UploadLimitRequest
 CORS(app)  # Enable CORS for API calls
 
 # Configuration
@@ -21,13 +57,150 @@ app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///instance/database.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['LLM_API_URL'] = os.environ.get('GEMMA_API_URL')  # Unset = placeholder responses
+app.config['LLM_POOL_SIZE'] = 10  # Keep-alive connections to the LLM endpoint
+app.config['LLM_MAX_CONCURRENCY'] = 8  # Max concurrent upstream calls per process
+app.config['LLM_CONNECT_TIMEOUT'] = 5.0
+app.config['LLM_READ_TIMEOUT'] = 60.0
+app.config['LLM_DEADLINE'] = 90.0  # Overall seconds per call, including retries
+app.config['LLM_MAX_RETRIES'] = 3
+app.config['MODEL_PATHS'] = {
+    'pest_detector': 'ml_models/pest_detector.h5',
+    'soil_model': 'ml_models/soil_model.pth'
+}
+app.config['MODEL_PRELOAD'] = False  # True = load at startup instead of on first use
+app.config['MODEL_BATCH_MAX_SIZE'] = 16  # Max inputs per forward pass
+app.config['MODEL_BATCH_MAX_WAIT_MS'] = 10  # Max wait for a batch to fill
+app.config['MODEL_RELOAD_CHECK_SECONDS'] = 5.0  # How often model files are checked for changes
+app.config['CHAT_CACHE_ENABLED'] = True
+app.config['CHAT_CACHE_MAX_ENTRIES'] = 5000
+app.config['CHAT_CACHE_TTL_SECONDS'] = 24 * 3600
+app.config['CHAT_CACHE_SIMILARITY'] = 0.85  # Cosine similarity for near-duplicate questions
+app.config['CHAT_HISTORY_TURNS'] = 6  # Most recent turns sent verbatim with each question
+app.config['CHAT_CONTEXT_TOKEN_BUDGET'] = 1200  # Estimated tokens for summary + recent turns
+app.config['CHAT_TURN_MAX_TOKENS'] = 250  # Longer messages/answers are clipped in the prompt
+app.config['CHAT_SUMMARY_MAX_TOKENS'] = 250  # Size of the rolling summary of older turns
+app.config['CHAT_CONTEXT_MAX_AGE_HOURS'] = 12  # Older turns only reach the prompt via the summary
+app.config['TRANSLATION_BACKEND'] = 'google'  # 'google' or 'offline' (no network, for tests)
+app.config['TRANSLATION_LRU_SIZE'] = 1024
+app.config['WEATHER_PREWARM_ENABLED'] = True
+app.config['WEATHER_PREWARM_TIME'] = '00:00'  # UTC (05:30 IST), before the morning login spike
+app.config['BATCH_MAX_UPLOAD_BYTES'] = 512 * 1024 * 1024  # Request body limit for batch uploads only
+app.config['BATCH_MAX_FRAMES'] = 500  # Max frames per batch upload
+app.config['BATCH_MAX_FRAME_BYTES'] = 16 * 1024 * 1024  # Max uncompressed size of one zipped frame
+app.config['BATCH_MAX_TOTAL_BYTES'] = 512 * 1024 * 1024  # Max uncompressed frames per batch upload
+app.config['SQLITE_JOURNAL_MODE'] = 'WAL'  # Readers no longer block the writer
+app.config['SQLITE_SYNCHRONOUS'] = 'NORMAL'  # Safe with WAL, far fewer fsyncs than FULL
+app.config['SQLITE_CACHE_SIZE_KB'] = 20000
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = 5000  # Wait for the write lock instead of "database is locked"
+app.config['WRITE_BATCH_SIZE'] = 100  # Rows per group commit
+app.config['WRITE_BATCH_INTERVAL'] = 0.05  # Seconds between group commits
+app.config['JOB_WORKERS'] = 4  # Max analysis jobs running concurrently
+app.config['JOB_MAX_ATTEMPTS'] = 3
+app.config['JOB_RETRY_BASE_DELAY'] = 2.0  # Seconds, doubled on each retry
+app.config['JOB_LEASE_SECONDS'] = 600  # Running jobs older than this are recovered
+app.config['PROFILE_ENABLED'] = False  # Allow ?profile=1 / X-Profile: 1 sampling profiles
+app.config['PROFILE_SAMPLE_RATE'] = 0.0  # Fraction of requests profiled automatically
+app.config['PROFILE_INTERVAL_MS'] = 5
+app.config['PROFILE_DIR'] = 'instance/profiles'  # Collapsed-stack files for flame graphs
+app.config['AUTO_MIGRATE'] = True  # Apply pending migrations before the first request
+app.config['HTTP_CACHE_ENABLED'] = True  # ETags from per-user table versions, 304 for unchanged data
+app.config['COMPRESS_ENABLED'] = True  # gzip (or brotli, if installed) JSON responses
+app.config['COMPRESS_MIN_SIZE'] = 1024  # Bytes; smaller bodies are sent as-is
+app.config['COMPRESS_GZIP_LEVEL'] = 6
+app.config['COMPRESS_BROTLI_QUALITY'] = 4
+app.config['STATIC_MAX_AGE'] = 300  # Seconds for unversioned static URLs (url_for adds ?v= and a 1-year max-age)
+
+# Settings file (APP_SETTINGS) and FLASK_* env vars override the defaults above
+load_settings(app)
 
 # Initialize database
 db.init_app(app)
+init_database(app)
+metrics.init_app(app)
+summaries.init_app(app)
+outbreaks.init_app(app)
+http_cache.init_app(app)
+translator.init_app(app)
+llm_client.init_app(app)
+response_cache.init_app(app)
+model_registry.init_app(app)
+
+# Background worker pool for slow analysis pipelines (started on first enqueue)
+job_queue = JobQueue(app)
+
+# Groups ChatHistory/DroneImage inserts into periodic commits; flushed at exit
+write_batcher = WriteBehindBatcher(app)
+weather_scheduler = WeatherPrewarmScheduler(app, job_queue)
+_background_started = False
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def ensure_schema():
+    """
+    Create or upgrade the schema (see migrations.py) once per process.
+    Runs on first use rather than at import, so importing the app stays cheap.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        if app.config['AUTO_MIGRATE']:
+            with app.app_context():
+                migrations.upgrade()
+        _schema_ready = True
+
+@app.before_request
+def start_background_services():
+    """Apply pending migrations and start per-process background threads on the first request"""
+    global _background_started
+    if _background_started:
+        return
+    ensure_schema()
+    _background_started = True
+    # Picks up jobs queued or left running before a restart, without waiting for the next enqueue
+    job_queue.start()
+    if app.config['WEATHER_PREWARM_ENABLED'] and not app.config.get('TESTING'):
+        weather_scheduler.start()
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Apply pending schema migrations"""
+    applied = migrations.upgrade()
+    print(f"Applied migrations: {applied}" if applied else "Database is up to date")
 
-# Create tables on first run
-with app.app_context():
-    db.create_all()
+@app.cli.command('db-check')
+def db_check_command():
+    """Fail if hot dashboard queries do not use their indexes"""
+    ensure_schema()
+    failures = migrations.check_query_plans()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        raise SystemExit(1)
+    print("All query plans use their indexes")
+
+@app.cli.command('rebuild-summaries')
+def rebuild_summaries_command():
+    """Recompute every user's dashboard summary from the source tables"""
+    ensure_schema()
+    with db.engine.begin() as conn:
+        print(f"Rebuilt {summaries.rebuild_summaries(conn)} user summaries")
+
+@app.cli.command('rebuild-outbreaks')
+def rebuild_outbreaks_command():
+    """Recompute the regional pest-outbreak counters from drone_images"""
+    ensure_schema()
+    with db.engine.begin() as conn:
+        print(f"Rebuilt {outbreaks.rebuild_outbreak_counts(conn)} outbreak counters")
+
+@app.cli.command('prewarm-weather')
+def prewarm_weather_command():
+    """Generate today's shared weather advisories for all users"""
+    ensure_schema()
+    print(prewarm_weather_advisories())
 
 # ==================== Page Routes ====================
 
@@ -129,6 +302,7 @@ def api_logout():
 # ==================== Dashboard API ====================
 
 @app.route('/api/user-details', methods=['GET'])
+@conditional_get('users')
 def api_user_details():
     """Get current user details"""
     if 'user_id' not in session:
@@ -140,25 +314,73 @@ def api_user_details():
     
     return jsonify(user.to_dict()), 200
 
+@app.route('/api/dashboard-summary', methods=['GET'])
+@conditional_get('users', 'drone_images', 'soil_reports', 'chat_history', 'weather_suggestions', daily=True)
+def api_dashboard_summary():
+    """
+    Everything the dashboard renders on load: user details, counts, latest
+    stress level, pest alerts, recent items and (once generated) today's
+    weather advisory. The aggregates come from one user_summaries row.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    row = db.session.query(User, UserSummary).outerjoin(
+        UserSummary, UserSummary.user_id == User.id).filter(User.id == session['user_id']).first()
+    if not row:
+        return jsonify({'error': 'User not found'}), 404
+    user, summary = row
+    
+    # Only an already generated suggestion; the dashboard asks /api/weather-suggestion otherwise
+    suggestion = WeatherSuggestion.query.filter_by(user_id=user.id, date=datetime.utcnow().date()).first()
+    
+    data = (summary or UserSummary(user_id=user.id)).to_dict()
+    data['user'] = user.to_dict()
+    data['weather'] = {
+        'suggestion_text': suggestion.suggestion_text,
+        'suggestion_marathi': suggestion.suggestion_marathi,
+        'suggestion_hindi': suggestion.suggestion_hindi,
+        'date': suggestion.date.isoformat() if suggestion.date else None
+    } if suggestion else None
+    return jsonify(data), 200
+
+def paginated_response(model, default_limit=None):
+    """
+    One page of the current user's rows as a JSON list.
+    Query params: limit, cursor, fields=a,b,c, view=list|full.
+    The cursor for the next page is sent in the X-Next-Cursor header.
+    """
+    try:
+        kwargs = {'default_limit': default_limit} if default_limit else {}
+        items, next_cursor = paginate_user_rows(model, session['user_id'], request.args, **kwargs)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(items)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
 @app.route('/api/drone-images', methods=['GET'])
+@conditional_get('drone_images')
 def api_drone_images():
-    """Get all drone images for current user"""
+    """Get drone images for current user (paginated, newest first)"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    images = DroneImage.query.filter_by(user_id=session['user_id']).order_by(DroneImage.created_at.desc()).all()
-    return jsonify([img.to_dict() for img in images]), 200
+    return paginated_response(DroneImage)
 
 @app.route('/api/soil-reports', methods=['GET'])
+@conditional_get('soil_reports')
 def api_soil_reports():
-    """Get all soil reports for current user"""
+    """Get soil reports for current user (paginated, newest first)"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    reports = SoilReport.query.filter_by(user_id=session['user_id']).order_by(SoilReport.created_at.desc()).all()
-    return jsonify([report.to_dict() for report in reports]), 200
+    return paginated_response(SoilReport)
 
 @app.route('/api/weather-suggestion', methods=['GET'])
+@conditional_get('users', 'weather_suggestions', daily=True)
 def api_weather_suggestion():
     """Get today's weather-based farming suggestion"""
     if 'user_id' not in session:
@@ -168,28 +390,9 @@ def api_weather_suggestion():
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Check if suggestion exists for today
+    # Shared per-(location, crop) advisory, generated once per day
     today = datetime.utcnow().date()
-    suggestion = WeatherSuggestion.query.filter_by(
-        user_id=user.id,
-        date=today
-    ).first()
-    
-    if not suggestion:
-        # Generate new suggestion
-        suggestion_text = get_weather_suggestion(user.farm_location or 'Unknown', user.crop_type or 'General')
-        suggestion_marathi = translate_text(suggestion_text, 'mr')
-        suggestion_hindi = translate_text(suggestion_text, 'hi')
-        
-        suggestion = WeatherSuggestion(
-            user_id=user.id,
-            date=today,
-            suggestion_text=suggestion_text,
-            suggestion_marathi=suggestion_marathi,
-            suggestion_hindi=suggestion_hindi
-        )
-        db.session.add(suggestion)
-        db.session.commit()
+    suggestion = get_user_suggestion(user, today)
     
     return jsonify({
         'suggestion_text': suggestion.suggestion_text,
@@ -200,9 +403,54 @@ def api_weather_suggestion():
 
 # ==================== Image Analysis API ====================
 
+def find_existing_analysis(model, content_hash, user_id):
+    """Latest completed analysis of the same file bytes, preferring the user's own row"""
+    query = model.query.filter_by(content_hash=content_hash)
+    if model is SoilReport:
+        # Failed OCR, LLM and translation steps are saved as text; never reuse them
+        translated = (SoilReport.analysis_marathi, SoilReport.analysis_hindi,
+                      SoilReport.recommendations_marathi, SoilReport.recommendations_hindi)
+        query = query.filter(
+            ~SoilReport.ocr_text.startswith('OCR Error'),
+            ~SoilReport.analysis_summary.startswith('AI Analysis Error'),
+            *[~column.contains('[Translation unavailable:') for column in translated]
+        )
+    own = query.filter_by(user_id=user_id).order_by(model.id.desc()).first()
+    return own or query.order_by(model.id.desc()).first()
+
+def copy_drone_image(source, user_id, filename):
+    """Give another user their own row for an already-analyzed image"""
+    drone_image = DroneImage(
+        user_id=user_id,
+        filename=filename,
+        file_path=source.file_path,
+        content_hash=source.content_hash,
+        analysis_result=source.analysis_result,
+        crop_stress_level=source.crop_stress_level,
+        pest_detected=source.pest_detected,
+        pest_type=source.pest_type,
+        nutrient_deficiency=source.nutrient_deficiency,
+        green_percentage=source.green_percentage,
+        image_health_score=source.image_health_score,
+        vegetation_grid=source.vegetation_grid
+    )
+    db.session.add(drone_image)
+    db.session.commit()
+    return drone_image
+
+def drone_image_result(drone_image):
+    """Same shape as the analyze_image job result, for duplicate uploads"""
+    return {
+        'success': True,
+        'duplicate': True,
+        'analysis': json.loads(drone_image.analysis_result or '{}'),
+        'image_id': drone_image.id,
+        'file_path': drone_image.file_path
+    }
+
 @app.route('/api/analyze-image', methods=['POST'])
 def api_analyze_image():
-    """Analyze uploaded drone/field image"""
+    """Queue analysis of an uploaded drone/field image"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -214,37 +462,175 @@ def api_analyze_image():
         return jsonify({'error': 'No file selected'}), 400
     
     try:
-        # Save uploaded file
-        file_path = save_uploaded_file(file, folder='images')
-        if not file_path:
+        # Save uploaded file (content-addressed)
+        stored = save_uploaded_file(file, folder='images')
+        if not stored:
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Analyze image with ML
-        analysis_result = analyze_image_with_ml(file_path)
+        # Identical bytes were analyzed before: reuse that analysis
+        existing = find_existing_analysis(DroneImage, stored.content_hash, session['user_id'])
+        if existing:
+            if existing.user_id != session['user_id']:
+                existing = copy_drone_image(existing, session['user_id'], secure_filename(file.filename))
+            return jsonify(drone_image_result(existing)), 200
         
-        if 'error' in analysis_result:
-            return jsonify({'error': analysis_result['error']}), 500
+        # Analysis runs in the background; poll /api/jobs/<id> for the outcome
+        job_id = job_queue.enqueue('analyze_image', {
+            'user_id': session['user_id'],
+            'filename': secure_filename(file.filename),
+            'file_path': stored.path,
+            'content_hash': stored.content_hash
+        }, user_id=session['user_id'])
         
-        # Save to database
-        drone_image = DroneImage(
-            user_id=session['user_id'],
-            filename=secure_filename(file.filename),
-            file_path=file_path,
-            analysis_result=json.dumps(analysis_result),
-            crop_stress_level=analysis_result.get('crop_stress_level'),
-            pest_detected=analysis_result.get('pest_detected', False),
-            pest_type=analysis_result.get('pest_type'),
-            nutrient_deficiency=analysis_result.get('nutrient_deficiency')
-        )
+        return jsonify(job_accepted_response(job_id)), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@job_handler('analyze_image')
+def run_image_analysis(payload):
+    """Background job: analyze a saved field image and store the result"""
+    file_path = payload['file_path']
+    
+    # Analyze image with ML
+    analysis_result = analyze_image_with_ml(file_path)
+    
+    if 'error' in analysis_result:
+        raise RuntimeError(analysis_result['error'])
+    
+    # Pre-render gallery thumbnails; the /thumbs route renders lazily if this fails
+    if payload.get('content_hash'):
+        try:
+            generate_derivatives(file_path, payload['content_hash'])
+        except Exception as e:
+            app.logger.warning('Thumbnail generation failed for %s: %s', file_path, e)
+    
+    # Save to database (group-committed with other pending inserts)
+    image_id = write_batcher.submit(
+        DroneImage,
+        user_id=payload['user_id'],
+        filename=payload['filename'],
+        file_path=file_path,
+        content_hash=payload.get('content_hash'),
+        analysis_result=json.dumps(analysis_result),
+        crop_stress_level=analysis_result.get('crop_stress_level'),
+        pest_detected=analysis_result.get('pest_detected', False),
+        pest_type=analysis_result.get('pest_type'),
+        nutrient_deficiency=analysis_result.get('nutrient_deficiency'),
+        **image_metrics(analysis_result)
+    ).result(timeout=30)
+    
+    return {
+        'success': True,
+        'analysis': analysis_result,
+        'image_id': image_id,
+        'file_path': file_path
+    }
+
+@app.route('/thumbs/<size>/<content_hash>.<fmt>', methods=['GET'])
+def thumbnail(size, content_hash, fmt):
+    """Serve a thumbnail/preview of an uploaded image, rendered on first request"""
+    if size not in DERIVATIVE_SIZES or fmt not in DERIVATIVE_FORMATS or len(content_hash) != 64:
+        abort(404)
+    
+    source = db.session.query(DroneImage.file_path).filter_by(content_hash=content_hash).first()
+    if not source or not os.path.exists(source.file_path):
+        abort(404)
+    
+    try:
+        path = get_derivative(source.file_path, content_hash, size, fmt)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    # The URL is derived from the file content, so it can be cached forever
+    response = send_file(path, mimetype=DERIVATIVE_FORMATS[fmt][2], conditional=True,
+                         etag=f"{content_hash}-{size}-{fmt}", max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/api/analyze-images-batch', methods=['POST'])
+def api_analyze_images_batch():
+    """Analyze a whole drone flight: multiple `files` and/or a zip `archive` of frames"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    max_frames = app.config['BATCH_MAX_FRAMES']
+    max_frame_bytes = app.config['BATCH_MAX_FRAME_BYTES']
+    max_total_bytes = app.config['BATCH_MAX_TOTAL_BYTES']
+    
+    # Parsed outside the try below so a body over BATCH_MAX_UPLOAD_BYTES stays a 413
+    uploads = request.files.getlist('files')
+    archive = request.files.get('archive')
+    if archive and archive.filename:
+        uploads.append(archive)
+    
+    try:
+        # Collect (filename, bytes) for every frame in the upload, stopping at the
+        # first limit exceeded so a small zip cannot expand into gigabytes
+        frames = []
+        total_bytes = 0
+        try:
+            for file in uploads:
+                if file.filename.lower().endswith('.zip'):
+                    members = read_zip_frames(file.stream, max_frame_bytes)
+                elif allowed_file(file.filename, 'image'):
+                    members = [(file.filename, file.read)]
+                else:
+                    continue
+                for filename, read in members:
+                    if len(frames) >= max_frames:
+                        return jsonify({'error': f"Too many frames (max {max_frames})"}), 400
+                    data = read()
+                    total_bytes += len(data)
+                    if total_bytes > max_total_bytes:
+                        return jsonify({'error': f"Frames exceed {max_total_bytes // (1024 * 1024)} MB in total"}), 400
+                    frames.append((filename, data))
+        except (ValueError, zipfile.BadZipFile) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not frames:
+            return jsonify({'error': 'No image frames uploaded'}), 400
+        
+        # Vectorized analysis over all frames
+        results = analyze_images_batch([data for _, data in frames])
+        
+        # Store frames and write all rows in one bulk insert
+        drone_images = []
+        for (filename, data), analysis_result in zip(frames, results):
+            if 'error' in analysis_result:
+                continue
+            stored = save_file_bytes(data, filename, folder='images')
+            drone_images.append(DroneImage(
+                user_id=session['user_id'],
+                filename=secure_filename(filename),
+                file_path=stored.path,
+                content_hash=stored.content_hash,
+                analysis_result=json.dumps(analysis_result),
+                crop_stress_level=analysis_result.get('crop_stress_level'),
+                pest_detected=analysis_result.get('pest_detected', False),
+                pest_type=analysis_result.get('pest_type'),
+                nutrient_deficiency=analysis_result.get('nutrient_deficiency'),
+                **image_metrics(analysis_result)
+            ))
         
-        db.session.add(drone_image)
+        db.session.add_all(drone_images)
         db.session.commit()
         
+        saved = iter(drone_images)
+        frame_results = []
+        for (filename, _), analysis_result in zip(frames, results):
+            entry = {'filename': filename, 'analysis': analysis_result}
+            if 'error' not in analysis_result:
+                drone_image = next(saved)
+                entry['image_id'] = drone_image.id
+                entry['file_path'] = drone_image.file_path
+            frame_results.append(entry)
+        
         return jsonify({
             'success': True,
-            'analysis': analysis_result,
-            'image_id': drone_image.id,
-            'file_path': file_path
+            'flight': summarize_flight(results),
+            'frames': frame_results
         }), 200
         
     except Exception as e:
@@ -253,9 +639,47 @@ def api_analyze_image():
 
 # ==================== Soil Health Advisory API ====================
 
+def copy_soil_report(source, user_id, filename):
+    """Give another user their own copy of an already-analyzed soil report"""
+    created_at = datetime.utcnow()
+    soil_report = SoilReport(
+        user_id=user_id,
+        filename=filename,
+        created_at=created_at,
+        **{column: getattr(source, column) for column in (
+            'file_path', 'content_hash', 'ocr_text', 'analysis_summary', 'analysis_marathi',
+            'analysis_hindi', 'nutrient_levels', 'recommendations',
+            'recommendations_marathi', 'recommendations_hindi'
+        )}
+    )
+    soil_report.nutrients = [
+        SoilNutrient(user_id=user_id, nutrient=reading.nutrient, value=reading.value,
+                     unit=reading.unit, created_at=created_at)
+        for reading in source.nutrients
+    ]
+    db.session.add(soil_report)
+    db.session.commit()
+    return soil_report
+
+def soil_report_result(soil_report):
+    """Same shape as the analyze_soil job result, for duplicate uploads"""
+    return {
+        'success': True,
+        'duplicate': True,
+        'ocr_text': (soil_report.ocr_text or '')[:500],
+        'nutrient_levels': json.loads(soil_report.nutrient_levels or '{}'),
+        'analysis_summary': soil_report.analysis_summary,
+        'analysis_marathi': soil_report.analysis_marathi,
+        'analysis_hindi': soil_report.analysis_hindi,
+        'recommendations': soil_report.recommendations,
+        'recommendations_marathi': soil_report.recommendations_marathi,
+        'recommendations_hindi': soil_report.recommendations_hindi,
+        'report_id': soil_report.id
+    }
+
 @app.route('/api/analyze-soil', methods=['POST'])
 def api_analyze_soil():
-    """Analyze soil report with OCR, AI, and translation"""
+    """Queue soil report analysis (OCR, AI, and translation)"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -267,61 +691,261 @@ def api_analyze_soil():
         return jsonify({'error': 'No file selected'}), 400
     
     try:
-        # Save uploaded file
-        file_path = save_uploaded_file(file, folder='soil-reports')
-        if not file_path:
+        # Save uploaded file (content-addressed)
+        stored = save_uploaded_file(file, folder='soil-reports', file_type='document')
+        if not stored:
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Step 1: OCR - Extract text from image
-        ocr_text = extract_text_with_ocr(file_path)
+        # Identical report was analyzed before: reuse that analysis
+        existing = find_existing_analysis(SoilReport, stored.content_hash, session['user_id'])
+        if existing:
+            if existing.user_id != session['user_id']:
+                existing = copy_soil_report(existing, session['user_id'], secure_filename(file.filename))
+            return jsonify(soil_report_result(existing)), 200
         
-        # Step 2: AI Analysis - Analyze with LLM
-        analysis_summary = analyze_soil_with_ai(ocr_text)
+        # OCR, AI analysis and translation run in the background
+        job_id = job_queue.enqueue('analyze_soil', {
+            'user_id': session['user_id'],
+            'filename': secure_filename(file.filename),
+            'file_path': stored.path,
+            'content_hash': stored.content_hash
+        }, user_id=session['user_id'])
         
-        # Step 3: Translation
-        analysis_marathi = translate_text(analysis_summary, 'mr')
-        analysis_hindi = translate_text(analysis_summary, 'hi')
+        return jsonify(job_accepted_response(job_id)), 202
         
-        # Extract recommendations (simple extraction - enhance with AI)
-        recommendations = "Based on the soil analysis, consider consulting with an agricultural expert for specific recommendations."
-        recommendations_marathi = translate_text(recommendations, 'mr')
-        recommendations_hindi = translate_text(recommendations, 'hi')
-        
-        # Save to database
-        soil_report = SoilReport(
-            user_id=session['user_id'],
-            filename=secure_filename(file.filename),
-            file_path=file_path,
-            ocr_text=ocr_text,
-            analysis_summary=analysis_summary,
-            analysis_marathi=analysis_marathi,
-            analysis_hindi=analysis_hindi,
-            recommendations=recommendations,
-            recommendations_marathi=recommendations_marathi,
-            recommendations_hindi=recommendations_hindi
-        )
-        
-        db.session.add(soil_report)
-        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@job_handler('analyze_soil')
+def run_soil_analysis(payload):
+    """Background job: OCR, analyze and translate a saved soil report"""
+    file_path = payload['file_path']
+    
+    # Step 1: OCR - Extract text from image
+    ocr_text = extract_text_with_ocr(file_path)
+    
+    # Step 2: Parse N/P/K, pH and micronutrient readings (deterministic, no LLM)
+    nutrient_levels = parse_nutrients(ocr_text)
+    
+    # Step 3: AI Analysis - Analyze with LLM
+    analysis_summary = analyze_soil_with_ai(ocr_text)
+    
+    # Extract recommendations (simple extraction - enhance with AI)
+    recommendations = "Based on the soil analysis, consider consulting with an agricultural expert for specific recommendations."
+    
+    # Step 4: Translation - all segments and languages in one cached batch
+    translations = translate_batch([analysis_summary, recommendations], ('mr', 'hi'))
+    analysis_marathi, recommendations_marathi = translations['mr']
+    analysis_hindi, recommendations_hindi = translations['hi']
+    
+    # Save to database
+    created_at = datetime.utcnow()
+    soil_report = SoilReport(
+        user_id=payload['user_id'],
+        filename=payload['filename'],
+        file_path=file_path,
+        content_hash=payload.get('content_hash'),
+        ocr_text=ocr_text,
+        analysis_summary=analysis_summary,
+        analysis_marathi=analysis_marathi,
+        analysis_hindi=analysis_hindi,
+        nutrient_levels=json.dumps(nutrient_levels),
+        recommendations=recommendations,
+        recommendations_marathi=recommendations_marathi,
+        recommendations_hindi=recommendations_hindi,
+        created_at=created_at
+    )
+    soil_report.nutrients = [
+        SoilNutrient(user_id=payload['user_id'], nutrient=nutrient, value=reading['value'],
+                     unit=reading['unit'], created_at=created_at)
+        for nutrient, reading in nutrient_levels.items()
+    ]
+    
+    db.session.add(soil_report)
+    db.session.commit()
+    
+    return {
+        'success': True,
+        'ocr_text': ocr_text[:500],  # Return first 500 chars
+        'nutrient_levels': nutrient_levels,
+        'analysis_summary': analysis_summary,
+        'analysis_marathi': analysis_marathi,
+        'analysis_hindi': analysis_hindi,
+        'recommendations': recommendations,
+        'recommendations_marathi': recommendations_marathi,
+        'recommendations_hindi': recommendations_hindi,
+        'report_id': soil_report.id
+    }
+
+@job_handler('weather_prewarm')
+def run_weather_prewarm(payload):
+    """Background job: pre-generate the day's weather advisories"""
+    return prewarm_weather_advisories(datetime.strptime(payload['date'], '%Y-%m-%d').date())
+
+@app.route('/api/soil-trends', methods=['GET'])
+def api_soil_trends():
+    """
+    Nutrient time series from parsed soil reports.
+    Query params: nutrient, period=day|week|month|year, scope=user|region, since=YYYY-MM-DD
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    nutrient = request.args.get('nutrient')
+    period = request.args.get('period', 'month')
+    scope = request.args.get('scope', 'user')
+    if nutrient and nutrient not in NUTRIENTS:
+        return jsonify({'error': f"Unknown nutrient '{nutrient}'"}), 400
+    if period not in PERIOD_FORMATS:
+        return jsonify({'error': f"period must be one of: {', '.join(PERIOD_FORMATS)}"}), 400
+    if scope not in ('user', 'region'):
+        return jsonify({'error': 'scope must be user or region'}), 400
+    
+    try:
+        since = request.args.get('since')
+        since = datetime.strptime(since, '%Y-%m-%d') if since else None
+    except ValueError:
+        return jsonify({'error': 'since must be YYYY-MM-DD'}), 400
+    
+    try:
+        farm_location = None
+        if scope == 'region':
+            user = User.query.get(session['user_id'])
+            if not user or not user.farm_location:
+                return jsonify({'error': 'Set a farm location to see regional trends'}), 400
+            farm_location = user.farm_location
         
+        series = nutrient_trends(nutrient, period, user_id=session['user_id'],
+                                 farm_location=farm_location, since=since)
         return jsonify({
-            'success': True,
-            'ocr_text': ocr_text[:500],  # Return first 500 chars
-            'analysis_summary': analysis_summary,
-            'analysis_marathi': analysis_marathi,
-            'analysis_hindi': analysis_hindi,
-            'recommendations': recommendations,
-            'recommendations_marathi': recommendations_marathi,
-            'recommendations_hindi': recommendations_hindi,
-            'report_id': soil_report.id
+            'scope': scope,
+            'period': period,
+            'farm_location': farm_location,
+            'series': series
         }), 200
-        
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/field-health-trend', methods=['GET'])
+@conditional_get('drone_images', daily=True)
+def api_field_health_trend():
+    """
+    Green cover and health score per period for the user's drone images, with
+    tile-level change maps (first vs. last period, per-tile trend).
+    Query params: period=day|week|month|year, since=YYYY-MM-DD, until=YYYY-MM-DD
+    (default: the last SEASON_DAYS days)
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    period = request.args.get('period', 'week')
+    if period not in PERIOD_FORMATS:
+        return jsonify({'error': f"period must be one of: {', '.join(PERIOD_FORMATS)}"}), 400
+    
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        since = datetime.strptime(since, '%Y-%m-%d').date() if since else None
+        until = datetime.strptime(until, '%Y-%m-%d').date() if until else None
+    except ValueError:
+        return jsonify({'error': 'since and until must be YYYY-MM-DD'}), 400
+    if since and until and since > until:
+        return jsonify({'error': 'since must not be after until'}), 400
+    
+    try:
+        return jsonify(field_health_trend(session['user_id'], period, since, until)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/region-alerts', methods=['GET'])
+def api_region_alerts():
+    """
+    Pest detections around the user's farm location (its grid cell and the
+    neighbouring cells) over the last `days` days (default 7, max 28).
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        days = int(request.args.get('days', outbreaks.ALERT_WINDOW_DAYS))
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+    if not 1 <= days <= outbreaks.BASELINE_DAYS:
+        return jsonify({'error': f'days must be between 1 and {outbreaks.BASELINE_DAYS}'}), 400
+    
+    user = User.query.get(session['user_id'])
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    if not user.farm_location:
+        return jsonify({'error': 'Set a farm location to see regional alerts'}), 400
+    
+    try:
+        return jsonify(outbreaks.region_alerts(user.farm_location, user.crop_type, window_days=days)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== Background Jobs API ====================
+
+def job_accepted_response(job_id):
+    """Body returned by endpoints that hand work to the job queue"""
+    return {
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('api_job_status', job_id=job_id),
+        'result_url': url_for('api_job_result', job_id=job_id)
+    }
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """Get the status of a background job"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    job = db.session.get(Job, job_id)
+    if not job or job.user_id != session['user_id']:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def api_job_result(job_id):
+    """Get the result of a finished background job"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    job = db.session.get(Job, job_id)
+    if not job or job.user_id != session['user_id']:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job.status == 'succeeded':
+        return jsonify(json.loads(job.result)), 200
+    if job.status == 'failed':
+        return jsonify({'error': job.error or 'Job failed', 'status': job.status}), 500
+    
+    # Still queued or running
+    return jsonify(job.to_dict()), 202
+
 # ==================== Chatbot API ====================
 
+def load_chat_context(user_id):
+    """Conversation context for the next answer; queues a summary fold when turns left the window"""
+    context = build_chat_context(user_id)
+    if context.fold_through_id is not None:
+        try:
+            # One job per fold point, however many requests notice it
+            job_queue.enqueue('chat_summary', {'user_id': user_id}, user_id=user_id,
+                              job_id=f"chat-summary-{user_id}-{context.fold_through_id}")
+        except IntegrityError:
+            pass  # Already queued
+    return context
+
+@job_handler('chat_summary')
+def run_chat_summary(payload):
+    """Background job: fold chat turns that left the prompt window into the rolling summary"""
+    return fold_history(payload['user_id'])
+
 @app.route('/api/chat', methods=['POST'])
 def api_chat():
     """Chat with Gemma AI chatbot"""
@@ -342,18 +966,27 @@ def api_chat():
             'crop_type': user.crop_type,
             'soil_type': user.soil_type
         } if user else None
+        history = load_chat_context(session['user_id'])
         
-        # Get response from Gemma
-        response = chat_with_gemma(user_query, user_context)
+        # Near-identical questions from farmers with the same context share an answer;
+        # follow-ups are only reused within the same conversation state
+        cached = response_cache.get(user_query, user_context, history)
+        if cached:
+            response = cached.response
+        else:
+            # Get response from Gemma
+            started = time.perf_counter()
+            response = chat_with_gemma(user_query, user_context, history)
+            if not response.startswith('Chat error:'):
+                response_cache.put(user_query, response, user_context, time.perf_counter() - started, history)
         
-        # Save to chat history
-        chat_history = ChatHistory(
+        # Save to chat history (write-behind, committed with the next batch)
+        write_batcher.submit(
+            ChatHistory,
             user_id=session['user_id'],
             message=user_query,
             response=response
         )
-        db.session.add(chat_history)
-        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -364,14 +997,88 @@ def api_chat():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def sse_event(data, event=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def api_chat_stream():
+    """Chat with Gemma, streaming tokens as Server-Sent Events"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    user_query = data.get('message', '').strip()
+    if not user_query:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    user_id = session['user_id']
+    user = User.query.get(user_id)
+    user_context = {
+        'farm_location': user.farm_location,
+        'crop_type': user.crop_type,
+        'soil_type': user.soil_type
+    } if user else None
+    
+    def generate():
+        try:
+            history = load_chat_context(user_id)
+            cached = response_cache.get(user_query, user_context, history)  # See api_chat
+        except Exception as e:
+            db.session.rollback()
+            yield sse_event({'error': f"Chat error: {str(e)}"}, event='error')
+            return
+        
+        if cached:
+            tokens = [cached.response]
+            yield sse_event({'token': cached.response})
+        else:
+            tokens = []
+            started = time.perf_counter()
+            try:
+                for token in stream_chat_with_gemma(user_query, user_context, history):
+                    tokens.append(token)
+                    yield sse_event({'token': token})
+            except Exception as e:
+                yield sse_event({'error': f"Chat error: {str(e)}"}, event='error')
+                return
+            response_cache.put(user_query, ''.join(tokens).strip(), user_context,
+                               time.perf_counter() - started, history)
+        
+        # Persist once the full answer is known
+        response = ''.join(tokens).strip()
+        write_batcher.submit(ChatHistory, user_id=user_id, message=user_query, response=response)
+        yield sse_event({'response': response}, event='done')
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop reverse proxies from buffering the stream
+    })
+
+@app.route('/api/chat-cache/stats', methods=['GET'])
+def api_chat_cache_stats():
+    """Hit-rate metrics for the chatbot response cache"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    return jsonify(response_cache.stats()), 200
+
 @app.route('/api/chat-history', methods=['GET'])
+@conditional_get('chat_history')
 def api_chat_history():
-    """Get chat history for current user"""
+    """Get chat history for current user (paginated, newest first)"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    chats = ChatHistory.query.filter_by(user_id=session['user_id']).order_by(ChatHistory.created_at.desc()).limit(50).all()
-    return jsonify([chat.to_dict() for chat in chats]), 200
+    return paginated_response(ChatHistory)
+
+# ==================== Metrics ====================
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Route latency, pipeline stage, SQL and job metrics in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # ==================== User Profile Update ====================
 
@@ -414,5 +1121,6 @@ if __name__ == '__main__':
     # Create upload directories
     os.makedirs('static/uploads/images', exist_ok=True)
     os.makedirs('static/uploads/soil-reports', exist_ok=True)
+    ensure_schema()
     
     app.run(debug=True, port=3001, host='127.0.0.1')
@@ -0,0 +1,7 @@
+# Benchmark suite: seed data, HTTP/test-client load tests and micro-benchmarks
+#
+# Run from the repository root as modules, e.g.:
+#   python -m benchmarks.seed --users 1000 --images 100000
+#   python -m benchmarks.load --duration 30 --threads 16
+#   python -m benchmarks.micro
+#   python -m benchmarks.compare old.json new.json
@@ -0,0 +1,87 @@
+# Shared helpers: benchmark database/app setup, latency statistics, JSON results
+import json
+import os
+import platform
+import subprocess
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+DEFAULT_DATABASE_URL = 'sqlite:///benchmark.db'  # Relative to the Flask instance folder
+BENCH_PASSWORD = 'benchmark'
+
+
+def load_app(database_url=DEFAULT_DATABASE_URL):
+    """Import the Flask app against the benchmark database (never the real one)"""
+    os.environ['DATABASE_URL'] = database_url
+    from app import app, ensure_schema
+    ensure_schema()
+    app.config['TRANSLATION_BACKEND'] = 'offline'
+    app.config['WEATHER_PREWARM_ENABLED'] = False
+    from translation import translator
+    translator.init_app(app)
+    return app
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed=None, errors=0):
+    """Latency statistics in milliseconds (plus throughput when elapsed seconds are given)"""
+    values = sorted(latencies)
+    summary = {
+        'count': len(values),
+        'errors': errors,
+        'mean_ms': round(1000 * sum(values) / len(values), 3) if values else None,
+        'p50_ms': round(1000 * percentile(values, 50), 3) if values else None,
+        'p90_ms': round(1000 * percentile(values, 90), 3) if values else None,
+        'p99_ms': round(1000 * percentile(values, 99), 3) if values else None,
+        'max_ms': round(1000 * values[-1], 3) if values else None
+    }
+    if elapsed:
+        summary['throughput_rps'] = round(len(values) / elapsed, 2)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def write_results(benchmark, params, results, output=None):
+    """Write a results document and return its path"""
+    commit = git_commit()
+    document = {
+        'benchmark': benchmark,
+        'git_commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        'results': results
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{benchmark}-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+    return output
+
+
+def print_table(results, columns=('count', 'errors', 'throughput_rps', 'p50_ms', 'p90_ms', 'p99_ms')):
+    width = max([len(name) for name in results] + [10])
+    print(f"{'name':<{width}}  " + '  '.join(f'{column:>14}' for column in columns))
+    for name, summary in results.items():
+        cells = []
+        for column in columns:
+            value = summary.get(column)
+            cells.append(f"{'-' if value is None else value:>14}")
+        print(f'{name:<{width}}  ' + '  '.join(cells))
@@ -0,0 +1,65 @@
+# Compare two benchmark result files and flag regressions
+#
+#   python -m benchmarks.compare benchmarks/results/load-abc123-....json benchmarks/results/load-def456-....json
+#
+# Exits with status 1 when any shared entry's p50/p99 grows (or throughput drops)
+# by more than --threshold percent, so it can gate CI.
+import argparse
+import json
+
+# metric -> True when larger is better
+METRICS = {
+    'p50_ms': False,
+    'p99_ms': False,
+    'mean_ms': False,
+    'throughput_rps': True,
+}
+
+
+def compare(baseline, candidate, threshold):
+    rows = []
+    regressions = []
+    for name, new in candidate['results'].items():
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            before, after = old.get(metric), new.get(metric)
+            if not before or after is None:
+                continue
+            change = 100.0 * (after - before) / before
+            worse = -change if higher_is_better else change
+            rows.append((name, metric, before, after, change, worse > threshold))
+            if worse > threshold:
+                regressions.append((name, metric, change))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark JSON result files')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed regression in percent')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['git_commit']} ({baseline['timestamp']})  ->  "
+          f"candidate {candidate['git_commit']} ({candidate['timestamp']})")
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    width = max([len(row[0]) for row in rows] + [10])
+    for name, metric, before, after, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<{width}}  {metric:<15} {before:>12} -> {after:>12}  {change:+7.1f}%{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold}%")
+        raise SystemExit(1)
+    print('No regressions')
+
+
+if __name__ == '__main__':
+    main()
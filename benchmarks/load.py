@@ -0,0 +1,254 @@
+# Multi-threaded load generator for the /api/* routes
+#
+#   python -m benchmarks.load --duration 30 --threads 16            # local HTTP server
+#   python -m benchmarks.load --mode client --duration 10           # Flask test client, no sockets
+#   python -m benchmarks.load --url http://127.0.0.1:3001 ...       # an already running server
+#
+# Each thread logs in as a random seeded user (see benchmarks.seed) and issues
+# requests drawn from a weighted route mix until the duration elapses. Upload
+# routes post multipart bodies picked from synthetic fixtures generated up front
+# from a fixed seed (--upload-variants distinct files each), so the first upload
+# of a file queues a job and repeats take the duplicate-file path.
+import argparse
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+import zipfile
+from collections import defaultdict, namedtuple
+
+from benchmarks.common import DEFAULT_DATABASE_URL, BENCH_PASSWORD, load_app, print_table, summarize, write_results
+
+# Body of an upload route: a multipart form drawn from the named upload fixture
+Upload = namedtuple('Upload', ['fixture'])
+
+BATCH_FRAMES = 8
+
+# (name, method, path, json body or Upload, weight) - read-heavy, like the dashboard
+ROUTES = [
+    ('user-details', 'GET', '/api/user-details', None, 10),
+    ('dashboard-summary', 'GET', '/api/dashboard-summary', None, 10),
+    ('drone-images', 'GET', '/api/drone-images?view=list&limit=6', None, 20),
+    ('drone-images-page', 'GET', '/api/drone-images?limit=50', None, 5),
+    ('soil-reports', 'GET', '/api/soil-reports?fields=id,filename,analysis_summary,recommendations,created_at&limit=5', None, 15),
+    ('chat-history', 'GET', '/api/chat-history?limit=5', None, 10),
+    ('soil-trends', 'GET', '/api/soil-trends?nutrient=ph&period=month', None, 5),
+    ('soil-trends-region', 'GET', '/api/soil-trends?nutrient=nitrogen&period=month&scope=region', None, 3),
+    ('region-alerts', 'GET', '/api/region-alerts', None, 5),
+    ('field-health-trend', 'GET', '/api/field-health-trend?period=week', None, 3),
+    ('weather-suggestion', 'GET', '/api/weather-suggestion', None, 5),
+    ('chat', 'POST', '/api/chat', {'message': 'When should I irrigate my wheat?'}, 2),
+    ('analyze-image', 'POST', '/api/analyze-image', Upload('field_image'), 3),
+    ('analyze-soil', 'POST', '/api/analyze-soil', Upload('soil_report'), 1),
+    ('analyze-images-batch', 'POST', '/api/analyze-images-batch', Upload('flight_zip'), 1),
+]
+
+
+def build_upload_fixtures(variants=8, seed=0):
+    """
+    Multipart bodies for the upload routes: fixture name -> list of variants,
+    each a list of (form field, filename, bytes)
+    """
+    import cv2
+    from benchmarks.micro import synthetic_field, synthetic_soil_report
+
+    def field_jpeg(index, width=1280, height=720):
+        return cv2.imencode('.jpg', synthetic_field(width, height, seed + index))[1].tobytes()
+
+    fixtures = {'field_image': [], 'soil_report': [], 'flight_zip': []}
+    with tempfile.TemporaryDirectory() as workdir:
+        for i in range(variants):
+            fixtures['field_image'].append([('file', f'field_{i}.jpg', field_jpeg(i))])
+
+            path = synthetic_soil_report(os.path.join(workdir, f'soil_card_{i}.jpg'),
+                                         skew_degrees=1.0 + (seed + i) % 8 * 0.5)
+            with open(path, 'rb') as f:
+                fixtures['soil_report'].append([('file', f'soil_card_{i}.jpg', f.read())])
+
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, 'w') as zf:
+                for frame in range(BATCH_FRAMES):
+                    zf.writestr(f'frame_{frame}.jpg', field_jpeg(1000 * (i + 1) + frame, 640, 480))
+            fixtures['flight_zip'].append([('archive', f'flight_{i}.zip', archive.getvalue())])
+    return fixtures
+
+
+class HttpTarget:
+    """requests.Session per thread against a real server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def session(self):
+        import requests
+        return requests.Session()
+
+    def send(self, session, method, path, body=None, files=None):
+        if files is not None:
+            files = [(field, (filename, data)) for field, filename, data in files]
+        response = session.request(method, self.base_url + path, json=body, files=files, timeout=60)
+        return response.status_code
+
+
+class ClientTarget:
+    """Flask test client per thread (measures the app without HTTP overhead)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        return self.app.test_client()
+
+    def send(self, client, method, path, body=None, files=None):
+        if files is not None:
+            form = defaultdict(list)
+            for field, filename, data in files:
+                form[field].append((io.BytesIO(data), filename))
+            response = client.open(path, method=method, data=dict(form), content_type='multipart/form-data')
+        else:
+            response = client.open(path, method=method, json=body)
+        status = response.status_code
+        response.close()
+        return status
+
+
+def start_local_server(app, port=0):
+    """Serve the app with werkzeug's threaded server in a background thread"""
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def bench_user_emails(app, limit=1000):
+    from models import User
+
+    with app.app_context():
+        rows = User.query.with_entities(User.email).filter(User.username.like('bench_%')).limit(limit).all()
+    return [row.email for row in rows]
+
+
+def run_load(target, emails, routes, duration, threads, warmup=2.0, fixtures=None):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    weights = [route[4] for route in routes]
+    state = {}
+
+    def start_clock():
+        # Runs once every worker has logged in, before any of them is released
+        begin = time.perf_counter()
+        state['measure_from'] = begin + warmup
+        state['stop_at'] = begin + warmup + duration
+
+    start_barrier = threading.Barrier(threads + 1, action=start_clock)
+
+    def worker(index):
+        rng = random.Random(index)
+        session = target.session()
+        target.send(session, 'POST', '/api/login', {'email': rng.choice(emails), 'password': BENCH_PASSWORD})
+        start_barrier.wait()
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        while True:
+            now = time.perf_counter()
+            if now >= state['stop_at']:
+                break
+            name, method, path, body, _ = rng.choices(routes, weights)[0]
+            files = None
+            if isinstance(body, Upload):
+                body, files = None, rng.choice(fixtures[body.fixture])
+            started = time.perf_counter()
+            try:
+                status = target.send(session, method, path, body, files)
+                failed = status >= 400
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - started
+            if started < state['measure_from']:
+                continue  # Warm-up requests are not recorded
+            if failed:
+                local_errors[name] += 1
+            else:
+                local_latencies[name].append(elapsed)
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            for name, count in local_errors.items():
+                errors[name] += count
+
+    workers = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    for thread in workers:
+        thread.join()
+
+    results = {}
+    all_latencies = []
+    for name, _, _, _, _ in routes:
+        all_latencies.extend(latencies[name])
+        results[name] = summarize(latencies[name], duration, errors[name])
+    results['total'] = summarize(all_latencies, duration, sum(errors.values()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput and p50/p99 latency per /api route')
+    parser.add_argument('--mode', choices=['http', 'client'], default='http')
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting one')
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+    parser.add_argument('--duration', type=float, default=20.0, help='Measured seconds (after warm-up)')
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--routes', help='Comma-separated route names to include (default: all)')
+    parser.add_argument('--upload-variants', type=int, default=8, help='Distinct files per upload fixture')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic upload files')
+    parser.add_argument('--output', help='JSON results path (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    routes = ROUTES
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        routes = [route for route in ROUTES if route[0] in wanted]
+
+    fixtures = None
+    if any(isinstance(route[3], Upload) for route in routes):
+        fixtures = build_upload_fixtures(args.upload_variants, args.seed)
+
+    app = load_app(args.database_url)
+    emails = bench_user_emails(app)
+    if not emails:
+        raise SystemExit('No benchmark users found; run `python -m benchmarks.seed` first')
+
+    server = None
+    if args.mode == 'client':
+        target = ClientTarget(app)
+    elif args.url:
+        target = HttpTarget(args.url)
+    else:
+        server, url = start_local_server(app)
+        target = HttpTarget(url)
+
+    try:
+        results = run_load(target, emails, routes, args.duration, args.threads, args.warmup, fixtures)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if fixtures is not None:
+            # Let the analysis jobs queued by the uploads finish before the interpreter exits
+            from app import job_queue
+            job_queue.stop()
+
+    print_table(results)
+    params = {'mode': args.mode, 'url': args.url, 'duration': args.duration, 'threads': args.threads,
+              'routes': [route[0] for route in routes], 'upload_variants': args.upload_variants,
+              'seed': args.seed}
+    print(f"Results written to {write_results('load', params, results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
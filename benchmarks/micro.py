@@ -0,0 +1,161 @@
+# Micro-benchmarks for the CPU-heavy pipeline functions
+#
+#   python -m benchmarks.micro                      # all benchmarks
+#   python -m benchmarks.micro --only image --repeat 20
+#
+# Inputs are synthetic and generated into a temp directory, so results are
+# comparable between commits and machines of the same type.
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.common import print_table, summarize, write_results
+
+# (name, width, height) - phone photo up to a large drone orthophoto tile
+IMAGE_SIZES = [
+    ('image_0.3mp', 640, 480),
+    ('image_2mp', 1920, 1080),
+    ('image_12mp', 4000, 3000),
+    ('image_42mp', 7952, 5304),
+]
+
+SOIL_REPORT_LINES = [
+    'SOIL HEALTH CARD',
+    'pH 7.45',
+    'EC (dS/m) 0.32',
+    'Organic Carbon (OC) 0.58 %',
+    'Available Nitrogen (N) 245.6 kg/ha',
+    'Available Phosphorus (P) 18.2 kg/ha',
+    'Available Potassium (K) 310 kg/ha',
+    'Zinc (Zn) 0.62 ppm',
+]
+
+
+def synthetic_field(width, height, seed=0):
+    """Field-like JPEG content: green rows with brown gaps and noise"""
+    rng = np.random.default_rng(seed)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = (40, 80, 120)  # Soil (BGR)
+    for x in range(0, width, 40):
+        image[:, x:x + 24] = (40, 160, 60)  # Crop rows
+    noise = rng.integers(-20, 20, size=(height, width, 1), dtype=np.int16)
+    return np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_soil_report(path, skew_degrees=2.0):
+    """A4-ish page at ~200 DPI with the report text, slightly rotated like a phone photo"""
+    page = np.full((2339, 1654), 255, dtype=np.uint8)
+    for i, line in enumerate(SOIL_REPORT_LINES):
+        cv2.putText(page, line, (120, 200 + i * 90), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 0, 3, cv2.LINE_AA)
+    matrix = cv2.getRotationMatrix2D((page.shape[1] / 2, page.shape[0] / 2), skew_degrees, 1.0)
+    page = cv2.warpAffine(page, matrix, (page.shape[1], page.shape[0]), borderValue=255)
+    cv2.imwrite(path, page)
+    return path
+
+
+def time_calls(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux (bytes on macOS); report as MiB for Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def bench_images(workdir, repeat):
+    from utils import analyze_image_with_ml
+
+    results = {}
+    for name, width, height in IMAGE_SIZES:
+        key = f'analyze_image_with_ml[{name}]'
+        path = os.path.join(workdir, f'{name}.jpg')
+        cv2.imwrite(path, synthetic_field(width, height), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        result = analyze_image_with_ml(path)
+        if 'error' in result:
+            results[key] = {'skipped': result['error']}
+            continue
+        summary = summarize(time_calls(lambda: analyze_image_with_ml(path), repeat))
+        summary['megapixels'] = round(width * height / 1e6, 1)
+        summary['peak_rss_mb'] = peak_rss_mb()
+        results[key] = summary
+    return results
+
+
+def bench_batch(workdir, repeat, frames=32):
+    from utils import analyze_images_batch
+
+    _, data = cv2.imencode('.jpg', synthetic_field(1920, 1080))
+    batch = [data.tobytes()] * frames
+    summary = summarize(time_calls(lambda: analyze_images_batch(batch), max(1, repeat // 4)))
+    summary['frames'] = frames
+    return {f'analyze_images_batch[{frames}x2mp]': summary}
+
+
+def bench_ocr(workdir, repeat):
+    import ocr
+    from utils import extract_text_with_ocr
+
+    path = synthetic_soil_report(os.path.join(workdir, 'soil_report.png'))
+    page = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    results = {'ocr.preprocess[a4]': summarize(time_calls(lambda: ocr.preprocess(page), repeat))}
+
+    # Outside an app context extract_text_with_ocr skips the OCR cache, so tesseract runs every time
+    text = extract_text_with_ocr(path)
+    if text.startswith('OCR Error'):
+        results['extract_text_with_ocr[a4]'] = {'skipped': text}
+    else:
+        results['extract_text_with_ocr[a4]'] = summarize(time_calls(lambda: extract_text_with_ocr(path), repeat))
+    return results
+
+
+def bench_parsing(workdir, repeat):
+    from nutrients import parse_nutrients
+
+    text = '\n'.join(SOIL_REPORT_LINES)
+    return {'parse_nutrients': summarize(time_calls(lambda: parse_nutrients(text), repeat * 100))}
+
+
+BENCHMARKS = {
+    'image': bench_images,
+    'batch': bench_batch,
+    'ocr': bench_ocr,
+    'parse': bench_parsing,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for image analysis and OCR')
+    parser.add_argument('--only', help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', help='JSON results path (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    selected = args.only.split(',') if args.only else list(BENCHMARKS)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in selected:
+            results.update(BENCHMARKS[name](workdir, args.repeat))
+
+    print_table({name: summary for name, summary in results.items() if 'skipped' not in summary},
+                columns=('count', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms'))
+    for name, summary in results.items():
+        if 'skipped' in summary:
+            print(f"{name}: skipped ({summary['skipped']})")
+    params = {'repeat': args.repeat, 'benchmarks': selected}
+    print(f"Results written to {write_results('micro', params, results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+# Seed the benchmark database with synthetic users, drone images, soil reports and chats
+#
+#   python -m benchmarks.seed --users 1000 --images 100000 --reports 20000 --chats 50000
+#
+# Rows are inserted with executemany in large chunks, so 1M rows take well under
+# a minute. Every user can log in with password 'benchmark'.
+import argparse
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import DEFAULT_DATABASE_URL, BENCH_PASSWORD, load_app
+
+LOCATIONS = ['Pune', 'Nashik', 'Nagpur', 'Aurangabad', 'Solapur', 'Kolhapur', 'Satara', 'Sangli',
+             'Ahmednagar', 'Jalgaon', 'Latur', 'Amravati', 'Akola', 'Nanded', 'Indore', 'Bhopal']
+CROPS = ['Wheat', 'Rice', 'Cotton', 'Sugarcane', 'Soybean', 'Onion', 'Grapes', 'Tomato']
+SOILS = ['Black', 'Red', 'Alluvial', 'Laterite', 'Sandy loam']
+STRESS = [('Low', None), ('Medium', 'Mild nutrient stress possible'), ('High', 'Possible nitrogen deficiency detected')]
+PESTS = [None, None, None, None, 'aphids', 'whitefly', 'stem borer']
+QUESTIONS = ['When should I irrigate {crop}?', 'Which fertilizer is best for {crop}?',
+             'How do I control aphids on {crop}?', 'What is the right sowing time for {crop}?']
+
+SOIL_REPORT_TEMPLATE = """SOIL HEALTH CARD
+pH {ph}
+EC (dS/m) {ec}
+Organic Carbon (OC) {oc} %
+Available Nitrogen (N) {n} kg/ha
+Available Phosphorus (P) {p} kg/ha
+Available Potassium (K) {k} kg/ha
+Zinc (Zn) {zn} ppm
+"""
+
+CHUNK_SIZE = 5000
+
+
+def _timestamps(count, days):
+    now = datetime.utcnow()
+    return [now - timedelta(seconds=random.randint(0, days * 86400)) for _ in range(count)]
+
+
+def _insert(table, rows_iter, total, label):
+    from models import db
+
+    started = time.perf_counter()
+    chunk = []
+    inserted = 0
+    for row in rows_iter:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            db.session.execute(table.insert(), chunk)
+            db.session.commit()
+            inserted += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+        inserted += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {inserted} rows in {elapsed:.1f}s ({inserted / elapsed if elapsed else 0:.0f} rows/s)")
+    return inserted
+
+
+def seed(users, images, reports, chats, days=365, seed_value=42):
+    from werkzeug.security import generate_password_hash
+    from models import db, User, DroneImage, SoilReport, SoilNutrient, ChatHistory
+    from nutrients import parse_nutrients
+    from field_health import image_metrics
+
+    random.seed(seed_value)
+    password_hash = generate_password_hash(BENCH_PASSWORD)  # Hashing is slow; share one hash
+
+    first_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    run_tag = f"{int(time.time())}"
+    _insert(User.__table__, (
+        {
+            'username': f'bench_{run_tag}_{i}',
+            'email': f'bench_{run_tag}_{i}@example.com',
+            'password_hash': password_hash,
+            'farmer_name': f'Farmer {i}',
+            'farm_location': random.choice(LOCATIONS),
+            'crop_type': random.choice(CROPS),
+            'soil_type': random.choice(SOILS),
+            'created_at': datetime.utcnow()
+        } for i in range(users)
+    ), users, 'users')
+    user_ids = list(range(first_id, first_id + users))
+
+    def image_rows():
+        for i, created_at in enumerate(_timestamps(images, days)):
+            green = round(random.uniform(5, 95), 2)
+            stress, deficiency = STRESS[0 if green >= 60 else 1 if green >= 30 else 2]
+            pest = random.choice(PESTS)
+            analysis = {'green_percentage': green, 'crop_stress_level': stress, 'pest_detected': bool(pest),
+                        'pest_type': pest, 'nutrient_deficiency': deficiency, 'image_health_score': green,
+                        'stress_heatmap': {'rows': 8, 'cols': 8, 'green_percentage': [
+                            [round(min(max(random.gauss(green, 8), 0), 100), 1) for _ in range(8)]
+                            for _ in range(8)]}}
+            content_hash = hashlib.sha256(f'{run_tag}-image-{i}'.encode()).hexdigest()
+            yield {
+                'user_id': random.choice(user_ids),
+                'filename': f'frame_{i}.jpg',
+                'file_path': f'static/uploads/images/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.jpg',
+                'content_hash': content_hash,
+                'analysis_result': json.dumps(analysis),
+                'crop_stress_level': stress,
+                'pest_detected': bool(pest),
+                'pest_type': pest,
+                'nutrient_deficiency': deficiency,
+                'created_at': created_at,
+                **image_metrics(analysis)
+            }
+    _insert(DroneImage.__table__, image_rows(), images, 'drone_images')
+
+    # Soil reports go in one chunk at a time so their nutrient rows can reference the new ids
+    started = time.perf_counter()
+    timestamps = _timestamps(reports, days)
+    nutrient_count = 0
+    for offset in range(0, reports, CHUNK_SIZE):
+        batch = []
+        for created_at in timestamps[offset:offset + CHUNK_SIZE]:
+            ocr_text = SOIL_REPORT_TEMPLATE.format(
+                ph=round(random.uniform(5.5, 8.5), 2), ec=round(random.uniform(0.1, 1.5), 2),
+                oc=round(random.uniform(0.2, 1.2), 2), n=random.randint(120, 450),
+                p=round(random.uniform(8, 40), 1), k=random.randint(120, 500),
+                zn=round(random.uniform(0.2, 2.0), 2))
+            batch.append((random.choice(user_ids), created_at, ocr_text, parse_nutrients(ocr_text)))
+
+        report_rows = [SoilReport(
+            user_id=user_id, filename='soil_card.jpg', file_path='static/uploads/soil-reports/soil_card.jpg',
+            ocr_text=ocr_text, analysis_summary='Synthetic benchmark report. ' * 20,
+            nutrient_levels=json.dumps(levels), recommendations='Consult an agricultural expert.',
+            created_at=created_at
+        ) for user_id, created_at, ocr_text, levels in batch]
+        db.session.add_all(report_rows)
+        db.session.flush()
+        nutrient_rows = [
+            {'report_id': report.id, 'user_id': report.user_id, 'nutrient': nutrient, 'value': reading['value'],
+             'unit': reading['unit'], 'created_at': report.created_at}
+            for report, (_, _, _, levels) in zip(report_rows, batch)
+            for nutrient, reading in levels.items()
+        ]
+        if nutrient_rows:
+            db.session.execute(SoilNutrient.__table__.insert(), nutrient_rows)
+        db.session.commit()
+        db.session.expunge_all()
+        nutrient_count += len(nutrient_rows)
+    elapsed = time.perf_counter() - started
+    print(f"soil_reports: {reports} rows (+{nutrient_count} nutrient rows) in {elapsed:.1f}s")
+
+    def chat_rows():
+        for created_at in _timestamps(chats, days):
+            question = random.choice(QUESTIONS).format(crop=random.choice(CROPS))
+            yield {
+                'user_id': random.choice(user_ids),
+                'message': question,
+                'response': f'Synthetic answer to: {question} ' * 5,
+                'created_at': created_at
+            }
+    _insert(ChatHistory.__table__, chat_rows(), chats, 'chat_history')
+
+    # Core inserts bypass the incremental summary and outbreak listeners
+    from summaries import rebuild_summaries
+    from outbreaks import rebuild_outbreak_counts
+    started = time.perf_counter()
+    rebuild_summaries(db.session.connection(), user_ids)
+    db.session.commit()
+    print(f"user_summaries: {len(user_ids)} rows in {time.perf_counter() - started:.1f}s")
+    started = time.perf_counter()
+    counters = rebuild_outbreak_counts(db.session.connection())
+    db.session.commit()
+    print(f"outbreak_counts: {counters} rows in {time.perf_counter() - started:.1f}s")
+
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed the benchmark database with synthetic data')
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--images', type=int, default=10000)
+    parser.add_argument('--reports', type=int, default=2000)
+    parser.add_argument('--chats', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365, help='Spread created_at over this many days')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = load_app(args.database_url)
+    with app.app_context():
+        seed(args.users, args.images, args.reports, args.chats, args.days, args.seed)
+
+
+if __name__ == '__main__':
+    main()
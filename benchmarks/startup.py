@@ -0,0 +1,109 @@
+# Startup benchmark: cold `import app` time and time-to-first-request
+#
+#   python -m benchmarks.startup                    # 10 fresh interpreters
+#   python -m benchmarks.startup --runs 20 --path /login
+#   python -m benchmarks.startup --importtime 15    # also list the slowest imports
+#
+# Every run is a new Python process, so nothing is shared with earlier runs
+# except the OS page cache (the first, unrecorded run warms it). The database is
+# a temporary SQLite file, migrated by that warm-up run like a restarted server.
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import print_table, summarize, write_results
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only load when an analysis actually needs them
+HEAVY_MODULES = ('numpy', 'cv2', 'PIL.Image', 'requests', 'pytesseract', 'pdf2image', 'tensorflow', 'torch',
+                 'googletrans')
+
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+status = client.get(sys.argv[1]).status_code
+finished = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - started,
+    'first_request_s': finished - imported,
+    'status': status,
+    'heavy_modules': [name for name in sys.argv[2:] if name in sys.modules]
+}))
+"""
+
+
+def child_env(database_url):
+    env = dict(os.environ)
+    env['DATABASE_URL'] = database_url
+    env['FLASK_WEATHER_PREWARM_ENABLED'] = 'false'
+    env['FLASK_TRANSLATION_BACKEND'] = 'offline'
+    return env
+
+
+def run_once(path, env):
+    output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, path, *HEAVY_MODULES],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top):
+    """Cumulative time of the first import of each top-level package, from `python -X importtime`"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True).stderr
+    totals = {}
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$', line)
+        # Packages only (not their submodules); cumulative times of nested packages overlap
+        if match and '.' not in match.group(2) and match.group(2) != 'app':
+            totals[match.group(2)] = int(match.group(1))
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {package: round(micros / 1000, 1) for package, micros in ranked}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold import time and time-to-first-request')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/', help='Route requested after the import')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='Also report the N slowest top-level imports')
+    parser.add_argument('--output', help='JSON results path (default: benchmarks/results/)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = child_env('sqlite:///' + os.path.join(workdir, 'startup.db'))
+        warmup = run_once(args.path, env)  # Migrates the database and warms the page cache
+        runs = [run_once(args.path, env) for _ in range(args.runs)]
+        imports = slowest_imports(env, args.importtime) if args.importtime else None
+
+    results = {
+        'import': summarize([run['import_s'] for run in runs]),
+        'first_request': summarize([run['first_request_s'] for run in runs]),
+        'first_request_with_migration': summarize([warmup['first_request_s']]),
+        'total': summarize([run['import_s'] + run['first_request_s'] for run in runs])
+    }
+    print_table(results, columns=('count', 'mean_ms', 'p50_ms', 'p90_ms', 'max_ms'))
+    heavy = runs[-1]['heavy_modules']
+    print(f"Status of {args.path}: {runs[-1]['status']}")
+    print(f"Heavy modules loaded by startup: {', '.join(heavy) if heavy else 'none'}")
+    if imports:
+        print('Slowest imports (ms, cumulative):')
+        for package, millis in imports.items():
+            print(f'  {package:<24} {millis:>8}')
+
+    results['total']['heavy_modules'] = heavy
+    if imports:
+        results['slowest_imports_ms'] = imports
+    params = {'runs': args.runs, 'path': args.path}
+    print(f"Results written to {write_results('startup', params, results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
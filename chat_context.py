@@ -0,0 +1,127 @@
+# Bounded multi-turn context for the chatbot
+#
+# A prompt carries the user's rolling summary plus the newest chat turns that
+# fit CHAT_CONTEXT_TOKEN_BUDGET (at most CHAT_HISTORY_TURNS, none older than
+# CHAT_CONTEXT_MAX_AGE_HOURS). Turns that fall out of that window are folded
+# into the summary by a background `chat_summary` job, a few turns at a time,
+# so prompt size stays flat however long the conversation gets.
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ChatHistory, ChatSummary
+
+FOLD_MAX_TURNS = 20  # Turns folded per job; older backlog beyond this is skipped
+
+# summary: str, turns: [(message, response)] oldest first,
+# fold_through_id: newest ChatHistory id outside the window (None = nothing to fold)
+ChatContext = namedtuple('ChatContext', ['summary', 'turns', 'fold_through_id'])
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English text)"""
+    return (len(text or '') + 3) // 4
+
+
+def clip_to_tokens(text, max_tokens):
+    text = text or ''
+    max_chars = max_tokens * 4
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(' ', 1)[0] + ' ...'
+
+
+def _settings():
+    config = current_app.config
+    return {
+        'turns': config.get('CHAT_HISTORY_TURNS', 6),
+        'budget': config.get('CHAT_CONTEXT_TOKEN_BUDGET', 1200),
+        'turn_tokens': config.get('CHAT_TURN_MAX_TOKENS', 250),
+        'summary_tokens': config.get('CHAT_SUMMARY_MAX_TOKENS', 250),
+        'max_age': timedelta(hours=config.get('CHAT_CONTEXT_MAX_AGE_HOURS', 12)),
+    }
+
+
+def _unsummarized_turns(user_id, after_id, limit):
+    """
+    Newest-first turns not yet in the summary (ix_chat_history_user_created).
+    ids and created_at are both assigned at insert, so the id cursor and the
+    created_at order agree.
+    """
+    return (ChatHistory.query
+            .filter(ChatHistory.user_id == user_id, ChatHistory.id > after_id)
+            .order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc())
+            .limit(limit).all())
+
+
+def _split_window(rows, summary, settings, now):
+    """
+    Split newest-first rows into (window, overflow): the window is the newest
+    recent turns that fit the token budget next to the summary.
+    """
+    cutoff = now - settings['max_age']
+    used = estimate_tokens(summary)
+    window = []
+    for index, row in enumerate(rows):
+        if len(window) >= settings['turns'] or (row.created_at and row.created_at < cutoff):
+            return window, rows[index:]
+        message = clip_to_tokens(row.message, settings['turn_tokens'])
+        response = clip_to_tokens(row.response, settings['turn_tokens'])
+        cost = estimate_tokens(message) + estimate_tokens(response)
+        if used + cost > settings['budget']:
+            return window, rows[index:]
+        window.append((message, response))
+        used += cost
+    return window, []
+
+
+def build_chat_context(user_id, now=None):
+    """Summary and recent turns for the user's next prompt (two indexed lookups)"""
+    settings = _settings()
+    summary_row = db.session.get(ChatSummary, user_id)
+    summary = summary_row.summary if summary_row else ''
+    after_id = summary_row.last_chat_id if summary_row else 0
+
+    # One row past the window is enough to know whether anything needs folding
+    rows = _unsummarized_turns(user_id, after_id, settings['turns'] + 1)
+    window, overflow = _split_window(rows, summary, settings, now or datetime.utcnow())
+    return ChatContext(summary, list(reversed(window)), overflow[0].id if overflow else None)
+
+
+def fold_history(user_id, now=None):
+    """
+    Fold the turns that have left the window into the user's summary.
+    Runs as the `chat_summary` job; a concurrent fold for the same user wins
+    and this one becomes a no-op.
+    """
+    from utils import summarize_conversation
+
+    settings = _settings()
+    summary_row = db.session.get(ChatSummary, user_id)
+    previous = summary_row.summary if summary_row else ''
+    after_id = summary_row.last_chat_id if summary_row else 0
+
+    rows = _unsummarized_turns(user_id, after_id, settings['turns'] + FOLD_MAX_TURNS)
+    _, overflow = _split_window(rows, previous, settings, now or datetime.utcnow())
+    if not overflow:
+        return {'folded': 0}
+
+    turns = [(row.message, row.response) for row in reversed(overflow)]
+    summary = summarize_conversation(previous, turns, settings['summary_tokens'])
+    values = {'summary': summary, 'last_chat_id': overflow[0].id, 'updated_at': datetime.utcnow()}
+
+    if summary_row is None:
+        db.session.add(ChatSummary(user_id=user_id, folded_turns=len(turns), **values))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return {'folded': 0}
+    else:
+        # Only advance from the state this fold started from
+        updated = ChatSummary.query.filter_by(user_id=user_id, last_chat_id=after_id).update(
+            dict(values, folded_turns=ChatSummary.folded_turns + len(turns)), synchronize_session=False)
+        db.session.commit()
+        if not updated:
+            return {'folded': 0}
+    return {'folded': len(turns), 'last_chat_id': values['last_chat_id']}
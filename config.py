@@ -0,0 +1,28 @@
+# Deployment settings
+#
+# Defaults are the app.config values in app.py. A settings file and environment
+# variables override them without code changes:
+#   APP_SETTINGS=/etc/agri/settings.toml   (.py, .json or .toml)
+#   FLASK_JOB_WORKERS=8 FLASK_MODEL_PRELOAD=true FLASK_SECRET_KEY=...
+#   FLASK_MODEL_PATHS__pest_detector=/models/pest.h5   (nested keys use __)
+#   DATABASE_URL=sqlite:////var/lib/agri/database.db
+import json
+import os
+
+
+def load_settings(app):
+    """Apply the settings file, then FLASK_* env vars (values parsed as JSON when possible)"""
+    path = os.environ.get('APP_SETTINGS')
+    if path:
+        if path.endswith('.json'):
+            app.config.from_file(path, load=json.load)
+        elif path.endswith('.toml'):
+            import tomllib
+            app.config.from_file(path, load=tomllib.load, text=False)
+        else:
+            app.config.from_pyfile(path)
+
+    app.config.from_prefixed_env()
+
+    if os.environ.get('DATABASE_URL'):
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DATABASE_URL']
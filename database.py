@@ -0,0 +1,153 @@
+# SQLite engine tuning and write-behind insert batching
+import atexit
+import threading
+from concurrent.futures import Future
+
+from sqlalchemy import event
+
+from models import db
+
+
+# ==================== Connection Pragmas ====================
+
+def _apply_pragmas(app):
+    journal_mode = app.config.get('SQLITE_JOURNAL_MODE', 'WAL')
+    synchronous = app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    cache_size_kb = int(app.config.get('SQLITE_CACHE_SIZE_KB', 20000))
+    busy_timeout_ms = int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+            cursor.execute(f'PRAGMA cache_size=-{cache_size_kb}')  # Negative = size in KiB
+            cursor.execute(f'PRAGMA busy_timeout={busy_timeout_ms}')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+        finally:
+            cursor.close()
+
+    return on_connect
+
+
+def init_database(app):
+    """Attach SQLite pragmas to the app's engine; call right after db.init_app()"""
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _apply_pragmas(app))
+            # Connections opened before the listener existed miss the pragmas
+            engine.dispose()
+
+
+# ==================== Write-Behind Batching ====================
+
+class WriteBehindBatcher:
+    """
+    Collects single-row inserts from many requests and writes them in one
+    transaction (group commit) every WRITE_BATCH_INTERVAL seconds or once
+    WRITE_BATCH_SIZE rows are pending.
+
+    submit() returns a Future resolving to the new row id after the commit;
+    callers that need the id wait on it, others fire and forget.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.batch_size = 100
+        self.flush_interval = 0.05
+        self._pending = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('WRITE_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('WRITE_BATCH_INTERVAL', self.flush_interval)
+        atexit.register(self.stop)
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._loop, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def submit(self, model, **values):
+        """Queue an insert of model(**values); returns a Future for the row id"""
+        future = Future()
+        self.start()
+        with self._condition:
+            self._pending.append((model, values, future))
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        return future
+
+    def flush(self):
+        """
+        Write all pending rows now in a single transaction. If the group commit
+        fails, each row is retried in its own transaction, so one bad row does
+        not lose the rest of the batch.
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            with self.app.app_context():
+                try:
+                    rows = [model(**values) for model, values, _ in batch]
+                    db.session.add_all(rows)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.warning('Write-behind batch of %d rows failed, retrying row by row: %s',
+                                            len(batch), e)
+                    return self._insert_each(batch)
+                for row, (_, _, future) in zip(rows, batch):
+                    future.set_result(row.id)
+            return len(batch)
+
+    def _insert_each(self, batch):
+        written = 0
+        for model, values, future in batch:
+            try:
+                row = model(**values)
+                db.session.add(row)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error('Write-behind insert into %s failed: %s; row: %.500r',
+                                      model.__tablename__, e, values)
+                future.set_exception(e)
+            else:
+                future.set_result(row.id)
+                written += 1
+        return written
+
+    def stop(self):
+        """Flush remaining rows and stop the background thread (runs at exit)"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.app is not None:
+            self.flush()
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
@@ -0,0 +1,182 @@
+# Field health over time from the per-image vegetation metrics
+#
+# Every analyzed DroneImage stores its green cover and health score as typed
+# columns and its per-tile green cover (the stress heatmap grid) as a small
+# float16 .npy blob, so trends are plain column aggregates and change maps are
+# array arithmetic over stacked grids, without parsing analysis_result JSON.
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, select
+
+from models import db, DroneImage
+from nutrients import PERIOD_FORMATS
+
+SEASON_DAYS = 120  # Default trend window, roughly one cropping season
+DECLINE_THRESHOLD = 10.0  # Green-cover points lost by a tile to list it as declining
+BACKFILL_CHUNK_SIZE = 1000
+
+
+# ==================== Storage ====================
+
+def pack_grid(grid):
+    """Per-tile green cover (2-D, 0-100) -> .npy bytes (float16, ~0.1 point resolution)"""
+    import numpy as np
+
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(grid, dtype=np.float16), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def unpack_grid(data):
+    import numpy as np
+
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+def image_metrics(analysis_result):
+    """Typed DroneImage column values from an analysis result dict"""
+    heatmap = analysis_result.get('stress_heatmap') or {}
+    grid = heatmap.get('green_percentage')
+    return {
+        'green_percentage': analysis_result.get('green_percentage'),
+        'image_health_score': analysis_result.get('image_health_score'),
+        'vegetation_grid': pack_grid(grid) if grid else None
+    }
+
+
+def backfill_image_metrics(conn):
+    """Fill the metric columns of older rows from their analysis_result JSON; returns rows updated"""
+    table = DroneImage.__table__
+    updated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.analysis_result)
+            .where(table.c.id > last_id, table.c.green_percentage.is_(None), table.c.analysis_result.isnot(None))
+            .order_by(table.c.id).limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            return updated
+        last_id = rows[-1].id
+
+        values = []
+        for row in rows:
+            try:
+                metrics = image_metrics(json.loads(row.analysis_result))
+            except (ValueError, TypeError, AttributeError):
+                continue
+            if metrics['green_percentage'] is not None:
+                values.append({'row_id': row.id, **metrics})
+        if values:
+            conn.execute(
+                table.update().where(table.c.id == bindparam('row_id')).values(
+                    green_percentage=bindparam('green_percentage'),
+                    image_health_score=bindparam('image_health_score'),
+                    vegetation_grid=bindparam('vegetation_grid')),
+                values
+            )
+            updated += len(values)
+
+
+# ==================== Trends ====================
+
+def _health_series(user_id, period, since, until):
+    """Per-period green cover and health score (from ix_drone_images_user_created_health)"""
+    bucket = func.strftime(PERIOD_FORMATS[period], DroneImage.created_at)
+    rows = db.session.query(
+        bucket.label('period'), func.count(), func.avg(DroneImage.green_percentage),
+        func.min(DroneImage.green_percentage), func.max(DroneImage.green_percentage),
+        func.avg(DroneImage.image_health_score)
+    ).filter(
+        DroneImage.user_id == user_id, DroneImage.created_at >= since, DroneImage.created_at < until,
+        DroneImage.green_percentage.isnot(None)
+    ).group_by(bucket).order_by(bucket)
+    return [{
+        'period': label,
+        'images': images,
+        'avg_green_percentage': round(avg_green, 2),
+        'min_green_percentage': round(low, 2),
+        'max_green_percentage': round(high, 2),
+        'avg_health_score': round(avg_health, 2) if avg_health is not None else None
+    } for label, images, avg_green, low, high, avg_health in rows]
+
+
+def _change_maps(user_id, period, since, until):
+    """Per-period mean tile grids, first-to-last change and per-tile linear trend"""
+    import numpy as np
+
+    rows = db.session.query(DroneImage.created_at, DroneImage.vegetation_grid).filter(
+        DroneImage.user_id == user_id, DroneImage.created_at >= since, DroneImage.created_at < until,
+        DroneImage.vegetation_grid.isnot(None)
+    ).order_by(DroneImage.created_at).all()
+    if not rows:
+        return None
+
+    grids = [unpack_grid(row.vegetation_grid) for row in rows]
+    # Only grids of the most common shape are comparable tile by tile
+    shapes = [grid.shape for grid in grids]
+    shape = max(set(shapes), key=shapes.count)
+    keep = [i for i, grid_shape in enumerate(shapes) if grid_shape == shape]
+    stack = np.stack([grids[i] for i in keep]).astype(np.float32)  # (images, rows, cols)
+    created = [rows[i].created_at for i in keep]
+
+    labels, bucket_index = np.unique([stamp.strftime(PERIOD_FORMATS[period]) for stamp in created],
+                                     return_inverse=True)
+    sums = np.zeros((len(labels),) + shape, dtype=np.float64)
+    np.add.at(sums, bucket_index, stack)
+    means = sums / np.bincount(bucket_index)[:, None, None]
+
+    # Least-squares slope per tile over every image, in green-cover points per 30 days
+    days = np.array([(stamp - created[0]).total_seconds() / 86400 for stamp in created])
+    centered = days - days.mean()
+    spread = float(np.dot(centered, centered))
+    trend = None
+    if spread > 0:
+        slope = np.tensordot(centered, stack - stack.mean(axis=0), axes=1) / spread
+        trend = np.round(slope * 30, 2).tolist()
+
+    change = means[-1] - means[0]
+    declining = [
+        {'row': int(r), 'col': int(c), 'change': round(float(change[r, c]), 1)}
+        for r, c in zip(*np.nonzero(change <= -DECLINE_THRESHOLD))
+    ]
+    declining.sort(key=lambda tile: tile['change'])
+
+    return {
+        'rows': int(shape[0]),
+        'cols': int(shape[1]),
+        'images': len(keep),
+        'periods': [
+            {'period': str(label), 'images': int(count), 'green_percentage': np.round(mean, 1).tolist()}
+            for label, count, mean in zip(labels, np.bincount(bucket_index), means)
+        ],
+        'change': {
+            'from': str(labels[0]),
+            'to': str(labels[-1]),
+            'green_percentage': np.round(change, 1).tolist(),
+            'mean': round(float(change.mean()), 2)
+        },
+        'trend_per_30_days': trend,
+        'declining_tiles': declining
+    }
+
+
+def field_health_trend(user_id, period='week', since=None, until=None):
+    """
+    Season view of a user's field health: per-period green cover/health
+    series plus tile-level change maps. since/until are inclusive dates;
+    the default is the last SEASON_DAYS up to today (UTC).
+    """
+    until = until or datetime.utcnow().date()
+    since = since or until - timedelta(days=SEASON_DAYS - 1)
+    start = datetime.combine(since, datetime.min.time())
+    end = datetime.combine(until + timedelta(days=1), datetime.min.time())
+    return {
+        'period': period,
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'series': _health_series(user_id, period, start, end),
+        'maps': _change_maps(user_id, period, start, end)
+    }
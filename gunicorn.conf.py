@@ -0,0 +1,35 @@
+# Gunicorn settings:  gunicorn -c gunicorn.conf.py wsgi:app
+# Every value can be overridden with the env vars below or on the command line.
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:3001')
+
+# Processes for CPU-bound image/OCR work, threads for I/O (LLM calls, SSE chat streams)
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+
+# Import the app (cv2, numpy, models) once in the master before forking
+preload_app = True
+
+# Recycle workers after N requests (jitter avoids all of them restarting together)
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))  # Time to finish jobs on reload/recycle
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    from wsgi import after_fork
+    after_fork()
+
+
+def worker_exit(server, worker):
+    from wsgi import before_exit
+    before_exit()
@@ -0,0 +1,200 @@
+# HTTP caching for the read APIs: version-counter ETags, JSON compression, static asset headers
+#
+# Every insert/update/delete of a user's rows in a watched table bumps a
+# (user_id, table) counter in cache_versions, in the same transaction. GET
+# endpoints decorated with @conditional_get build their ETag from those
+# counters, so an unchanged resource is answered with 304 after one primary-key
+# lookup, without loading or serializing any rows.
+#
+# Rows written with Core statements (e.g. benchmarks.seed) do not bump the
+# counters; clients revalidate again after the next ORM write or deploy.
+import gzip
+import hashlib
+import os
+from datetime import datetime
+from functools import wraps
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, User, DroneImage, SoilReport, ChatHistory, WeatherSuggestion, CacheVersion
+
+# model -> (versioned table name, attribute holding the owning user's id)
+WATCHED_MODELS = {
+    User: ('users', 'id'),
+    DroneImage: ('drone_images', 'user_id'),
+    SoilReport: ('soil_reports', 'user_id'),
+    ChatHistory: ('chat_history', 'user_id'),
+    WeatherSuggestion: ('weather_suggestions', 'user_id'),
+}
+
+COMPRESSIBLE_MIMETYPES = ('application/json',)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is used when brotli is not installed
+    brotli = None
+
+_schema_salt = ''  # Changes with the schema version, so a deploy invalidates every ETag
+_static_versions = {}  # filename -> (mtime, content hash)
+
+
+# ==================== Version Counters ====================
+
+def _touched_tables(session):
+    touched = set()
+    changed = [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in (*session.new, *changed, *session.deleted):
+        watched = WATCHED_MODELS.get(type(obj))
+        if watched is None:
+            continue
+        table_name, user_attribute = watched
+        user_id = getattr(obj, user_attribute)
+        if user_id is not None:
+            touched.add((user_id, table_name))
+    return touched
+
+
+def _after_flush(session, flush_context):
+    touched = _touched_tables(session)
+    if not touched:
+        return
+
+    table = CacheVersion.__table__
+    statement = sqlite_insert(table).values(version=1).on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.table_name],
+        set_={'version': table.c.version + 1}
+    )
+    session.connection().execute(statement, [
+        {'user_id': user_id, 'table_name': table_name} for user_id, table_name in sorted(touched)
+    ])
+
+
+def current_versions(user_id, tables):
+    """{table: version} for one user (0 for tables never written)"""
+    rows = db.session.execute(
+        select(CacheVersion.table_name, CacheVersion.version)
+        .where(CacheVersion.user_id == user_id, CacheVersion.table_name.in_(tables))
+    ).all()
+    versions = dict.fromkeys(tables, 0)
+    versions.update(rows)
+    return versions
+
+
+# ==================== Conditional GET ====================
+
+def conditional_get(*tables, daily=False):
+    """
+    Decorate a per-user GET view whose output depends only on the user's rows
+    in `tables` (and, with daily=True, on the current UTC date). Matching
+    If-None-Match requests get a 304 without running the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import current_app, make_response, request, session
+
+            if 'user_id' not in session or not current_app.config.get('HTTP_CACHE_ENABLED', True):
+                return view(*args, **kwargs)
+
+            # Read the counters before the view runs, so the body is never older than its ETag
+            versions = current_versions(session['user_id'], tables)
+            parts = [_schema_salt, request.endpoint, request.query_string.decode('latin-1'), str(session['user_id'])]
+            parts += [f'{table}:{versions[table]}' for table in tables]
+            if daily:
+                parts.append(datetime.utcnow().date().isoformat())
+            etag = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # Weak, because the compressed and identity encodings share the tag
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+# ==================== Compression ====================
+
+def _compress(app, request, response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli is not None else ['gzip'])
+    if encoding == 'br':
+        data = brotli.compress(data, quality=app.config.get('COMPRESS_BROTLI_QUALITY', 4))
+    elif encoding == 'gzip':
+        data = gzip.compress(data, compresslevel=app.config.get('COMPRESS_GZIP_LEVEL', 6))
+    else:
+        return response
+
+    response.set_data(data)  # Also updates Content-Length
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# ==================== Static Assets ====================
+
+def static_version(app, filename):
+    """Short content hash of a static file, recomputed when its mtime changes"""
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _static_versions.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = _static_versions[filename] = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+    return cached[1]
+
+
+def _static_headers(app, request, response):
+    if request.args.get('v'):
+        # url_for('static') adds ?v=<content hash>, so a versioned URL never changes meaning
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = f"public, max-age={app.config.get('STATIC_MAX_AGE', 300)}"
+    return response
+
+
+# ==================== Flask Integration ====================
+
+def init_app(app):
+    """Register the version-counter listener, compression and static asset headers"""
+    from flask import request
+    from migrations import MIGRATIONS
+
+    global _schema_salt
+    _schema_salt = str(MIGRATIONS[-1][0])
+
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        if endpoint == 'static' and 'v' not in values and values.get('filename'):
+            version = static_version(app, values['filename'])
+            if version:
+                values['v'] = version
+
+    @app.after_request
+    def http_cache_headers(response):
+        if request.endpoint == 'static':
+            return _static_headers(app, request, response)
+        if app.config.get('COMPRESS_ENABLED', True):
+            return _compress(app, request, response)
+        return response
@@ -0,0 +1,250 @@
+# Background job queue backed by the SQLite jobs table
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+import metrics
+from models import db, Job
+
+# Registered job handlers: job_type -> callable(payload) -> JSON-serializable result
+_handlers = {}
+
+
+def job_handler(job_type):
+    """Register a function as the handler for a job type"""
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+class JobQueue:
+    """
+    Local worker pool that runs jobs persisted in the jobs table.
+
+    Jobs are claimed by a single dispatcher thread per process and executed on a
+    bounded thread pool. Failed jobs are retried with exponential backoff, and
+    jobs left 'running' by a crashed process are re-queued once their lease expires.
+    The dispatcher renews the lease of every job this process is still running,
+    so long OCR or batch jobs are never picked up a second time.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_workers = 4
+        self.max_attempts = 3
+        self.retry_base_delay = 2.0
+        self.poll_interval = 1.0
+        self.lease_seconds = 600
+        self._executor = None
+        self._dispatcher = None
+        self._slots = None
+        self._active = set()  # Ids of jobs running in this process
+        self._active_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read queue settings from the Flask config"""
+        self.app = app
+        self.max_workers = app.config.get('JOB_WORKERS', self.max_workers)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', self.max_attempts)
+        self.retry_base_delay = app.config.get('JOB_RETRY_BASE_DELAY', self.retry_base_delay)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', self.poll_interval)
+        self.lease_seconds = app.config.get('JOB_LEASE_SECONDS', self.lease_seconds)
+
+    @property
+    def running(self):
+        return self._dispatcher is not None and self._dispatcher.is_alive()
+
+    def start(self):
+        """Recover in-flight jobs and start the dispatcher (idempotent)"""
+        with self._start_lock:
+            if self.running:
+                return
+            self._stopping.clear()
+            self._slots = threading.BoundedSemaphore(self.max_workers)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-worker')
+            with self.app.app_context():
+                self.recover()
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='job-dispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def stop(self, wait=True):
+        """Stop claiming new jobs and optionally wait for running ones"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=self.poll_interval * 2)
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        self._dispatcher = None
+        self._executor = None
+
+    def enqueue(self, job_type, payload, user_id=None, max_attempts=None, job_id=None):
+        """
+        Persist a new job and wake the dispatcher; returns the job id.
+        Passing a deterministic job_id makes enqueueing idempotent: a second
+        enqueue with the same id raises IntegrityError.
+        """
+        if job_type not in _handlers:
+            raise ValueError(f"No handler registered for job type '{job_type}'")
+
+        job = Job(
+            id=job_id or uuid.uuid4().hex,
+            user_id=user_id,
+            job_type=job_type,
+            status='queued',
+            payload=json.dumps(payload),
+            max_attempts=max_attempts or self.max_attempts,
+            run_after=datetime.utcnow()
+        )
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise
+
+        self.start()
+        self._wakeup.set()
+        return job.id
+
+    def recover(self):
+        """
+        Re-queue jobs whose worker died while running them. A job that has
+        already used all its attempts (e.g. one that keeps crashing the worker)
+        is marked failed instead. Returns the number of jobs re-queued.
+        """
+        expired = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        abandoned = Job.query.filter(
+            Job.status == 'running',
+            db.or_(Job.locked_at.is_(None), Job.locked_at < expired)
+        )
+        abandoned.filter(Job.attempts >= Job.max_attempts).update(
+            {'status': 'failed', 'locked_at': None, 'error': 'Worker stopped while running the job'},
+            synchronize_session=False)
+        count = abandoned.filter(Job.attempts < Job.max_attempts).update(
+            {'status': 'queued', 'locked_at': None, 'run_after': datetime.utcnow()},
+            synchronize_session=False)
+        db.session.commit()
+        return count
+
+    # ==================== Dispatcher ====================
+
+    def _dispatch_loop(self):
+        last_recovery = last_renewal = time.monotonic()
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    if time.monotonic() - last_renewal > self.lease_seconds / 3:
+                        self._renew_leases()
+                        last_renewal = time.monotonic()
+                    if time.monotonic() - last_recovery > self.lease_seconds:
+                        self.recover()
+                        last_recovery = time.monotonic()
+                    claimed = self._claim_ready_jobs()
+            except Exception as e:
+                self.app.logger.exception('Job dispatcher error: %s', e)
+                claimed = 0
+
+            if not claimed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim_ready_jobs(self):
+        """Claim as many ready jobs as there are free worker slots"""
+        claimed = 0
+        while self._slots.acquire(blocking=False):
+            job_id = self._claim_next()
+            if job_id is None:
+                self._slots.release()
+                break
+            with self._active_lock:
+                self._active.add(job_id)
+            self._executor.submit(self._run, job_id)
+            claimed += 1
+        return claimed
+
+    def _renew_leases(self):
+        """Heartbeat: push back the lease of every job still running here"""
+        with self._active_lock:
+            active = list(self._active)
+        if not active:
+            return
+        Job.query.filter(Job.id.in_(active), Job.status == 'running').update(
+            {'locked_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+    def _claim_next(self):
+        now = datetime.utcnow()
+        candidate = db.session.query(Job.id).filter(
+            Job.status == 'queued',
+            Job.run_after <= now
+        ).order_by(Job.run_after, Job.created_at).first()
+        if candidate is None:
+            db.session.rollback()
+            return None
+
+        # Conditional update so two processes never claim the same job
+        updated = Job.query.filter_by(id=candidate.id, status='queued').update(
+            {'status': 'running', 'locked_at': now, 'attempts': Job.attempts + 1},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return candidate.id if updated else self._claim_next()
+
+    # ==================== Execution ====================
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                job = db.session.get(Job, job_id)
+                job_type = job.job_type
+                handler = _handlers.get(job_type)
+                started = time.perf_counter()
+                try:
+                    if handler is None:
+                        raise ValueError(f"No handler registered for job type '{job_type}'")
+                    with metrics.bind_context(f'job:{job_type}'):
+                        result = handler(json.loads(job.payload or '{}'))
+                except Exception as e:
+                    metrics.JOB_DURATION.observe(time.perf_counter() - started, job_type=job_type, status='failed')
+                    db.session.rollback()
+                    self._record_failure(job_id, e)
+                else:
+                    metrics.JOB_DURATION.observe(time.perf_counter() - started, job_type=job_type, status='succeeded')
+                    job.status = 'succeeded'
+                    job.result = json.dumps(result)
+                    job.error = None
+                    job.locked_at = None
+                    db.session.commit()
+        except Exception as e:
+            self.app.logger.exception('Job %s could not be finalized: %s', job_id, e)
+        finally:
+            with self._active_lock:
+                self._active.discard(job_id)
+            self._slots.release()
+            self._wakeup.set()
+
+    def _record_failure(self, job_id, error):
+        job = db.session.get(Job, job_id)
+        job.error = str(error)
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            # Exponential backoff with jitter: base * 2^(n-1) * [0.5, 1.5)
+            delay = self.retry_base_delay * (2 ** (job.attempts - 1)) * (0.5 + random.random())
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        else:
+            job.status = 'failed'
+        db.session.commit()
@@ -0,0 +1,171 @@
+# Pooled HTTP client for the Gemma/LLM endpoint
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from singleflight import SingleFlight
+
+
+class LLMError(Exception):
+    """The LLM endpoint failed or returned an unusable response"""
+
+
+class LLMTimeoutError(LLMError):
+    """The call's deadline passed before a response was received"""
+
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMClient:
+    """
+    Keep-alive LLM client shared by the whole process.
+
+    - one requests.Session with a bounded connection pool
+    - a semaphore capping concurrent upstream calls
+    - connect/read timeouts plus an overall per-call deadline
+    - retries with exponential backoff and full jitter
+    - identical in-flight generate() calls are coalesced into one request
+    """
+
+    def __init__(self, endpoint=None):
+        self.endpoint = endpoint or os.environ.get('GEMMA_API_URL')
+        self.pool_size = 10
+        self.max_concurrency = 8
+        self.connect_timeout = 5.0
+        self.read_timeout = 60.0
+        self.deadline = 90.0
+        self.max_retries = 3
+        self.backoff_base = 0.5
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._coalescer = SingleFlight()
+
+    def init_app(self, app):
+        """Read endpoint, pool and timeout settings from the Flask config"""
+        self.endpoint = app.config.get('LLM_API_URL', self.endpoint)
+        self.pool_size = app.config.get('LLM_POOL_SIZE', self.pool_size)
+        self.max_concurrency = app.config.get('LLM_MAX_CONCURRENCY', self.max_concurrency)
+        self.connect_timeout = app.config.get('LLM_CONNECT_TIMEOUT', self.connect_timeout)
+        self.read_timeout = app.config.get('LLM_READ_TIMEOUT', self.read_timeout)
+        self.deadline = app.config.get('LLM_DEADLINE', self.deadline)
+        self.max_retries = app.config.get('LLM_MAX_RETRIES', self.max_retries)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._session = None
+
+    @property
+    def configured(self):
+        return bool(self.endpoint)
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    # ==================== Public API ====================
+
+    def generate(self, prompt, max_tokens=500, deadline=None):
+        """Return the full completion for a prompt; concurrent identical prompts share one call"""
+        key = hashlib.sha256(f"{max_tokens}\0{prompt}".encode('utf-8')).hexdigest()
+        return self._coalescer.do(key, self._generate, prompt, max_tokens, deadline)
+
+    def stream(self, prompt, max_tokens=500, deadline=None):
+        """
+        Yield completion tokens as they arrive.
+        Retries happen only before the first token has been yielded.
+        """
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        response = self._post({'prompt': prompt, 'max_tokens': max_tokens, 'stream': True},
+                              expires_at, stream=True)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if time.monotonic() > expires_at:
+                    raise LLMTimeoutError('LLM stream exceeded its deadline')
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('done'):
+                    break
+                yield chunk.get('token', '')
+        finally:
+            response.close()
+            self._slots.release()
+
+    # ==================== Internals ====================
+
+    def _generate(self, prompt, max_tokens, deadline):
+        expires_at = time.monotonic() + (deadline or self.deadline)
+        response = self._post({'prompt': prompt, 'max_tokens': max_tokens}, expires_at)
+        try:
+            return response.json()['response']
+        except (ValueError, KeyError) as e:
+            raise LLMError(f'Malformed LLM response: {e}')
+        finally:
+            response.close()
+            self._slots.release()
+
+    def _remaining(self, expires_at):
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            raise LLMTimeoutError('LLM call exceeded its deadline')
+        return remaining
+
+    def _post(self, payload, expires_at, stream=False):
+        """
+        POST with retries; returns the response while still holding a
+        concurrency slot, which the caller must release.
+        """
+        if not self.configured:
+            raise LLMError('LLM endpoint is not configured')
+
+        import requests
+
+        attempt = 0
+        while True:
+            if not self._slots.acquire(timeout=self._remaining(expires_at)):
+                raise LLMTimeoutError('Timed out waiting for a free LLM slot')
+            response = None
+            handed_off = False
+            try:
+                read_timeout = min(self.read_timeout, self._remaining(expires_at))
+                response = self.session.post(self.endpoint, json=payload, stream=stream,
+                                             timeout=(self.connect_timeout, read_timeout))
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    handed_off = True
+                    return response
+                error = LLMError(f'LLM endpoint returned {response.status_code}')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = LLMError(f'LLM request failed: {e}')
+            except requests.HTTPError as e:
+                raise LLMError(str(e))
+            finally:
+                # Unless the caller now owns it, give the connection back to the pool
+                if not handed_off:
+                    if response is not None:
+                        response.close()
+                    self._slots.release()
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            # Full jitter: sleep uniformly in [0, base * 2^attempt], within the deadline
+            delay = random.uniform(0, self.backoff_base * (2 ** attempt))
+            time.sleep(min(delay, self._remaining(expires_at)))
+
+
+llm_client = LLMClient()
@@ -0,0 +1,349 @@
+# Request/stage/SQL instrumentation exported in the Prometheus text format
+#
+# Metrics live in this process only; under several worker processes each one
+# reports its own numbers (scrape them per worker or aggregate downstream).
+import functools
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter as FrameCounter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from models import db
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ==================== Metric Types ====================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key, state):
+        counts, total, count = state
+        lines = [
+            f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", bound)])} {n}'
+            for bound, n in zip(self.buckets, counts)
+        ]
+        lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", "+Inf")])} {count}')
+        lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total}')
+        lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'http_request_duration_seconds', 'Request latency by route (streamed responses until the last byte)',
+    ('method', 'endpoint', 'status')))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    'http_requests_in_flight', 'Requests currently being handled', ('endpoint',)))
+STAGE_DURATION = registry.register(Histogram(
+    'stage_duration_seconds', 'Time spent in pipeline stages (OCR, ML, LLM, translation)',
+    ('stage', 'outcome')))
+DB_QUERIES = registry.register(Counter(
+    'db_queries_total', 'SQL statements executed, by route or job', ('context',)))
+DB_QUERY_DURATION = registry.register(Histogram(
+    'db_query_duration_seconds', 'SQL statement latency, by route or job', ('context',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)))
+REQUEST_DB_QUERIES = registry.register(Histogram(
+    'http_request_db_queries', 'SQL statements per request', ('endpoint',),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200)))
+JOB_DURATION = registry.register(Histogram(
+    'job_duration_seconds', 'Background job handler latency', ('job_type', 'status')))
+
+
+def render():
+    return registry.render()
+
+
+# ==================== Per-Request Context ====================
+
+class _Context:
+    """Timings collected for one request or background job on the current thread"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.stages = {}
+        self.profiler = None
+
+    def add_stage(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self):
+        """Server-Timing header value (durations in milliseconds)"""
+        parts = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"']
+        parts += [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in self.stages.items()]
+        return ', '.join(parts)
+
+
+_local = threading.local()
+
+
+def current_context():
+    return getattr(_local, 'context', None)
+
+
+@contextmanager
+def bind_context(name):
+    """Attribute SQL and stage timings on this thread to `name` (e.g. a job type)"""
+    previous = current_context()
+    _local.context = context = _Context(name)
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+
+# ==================== Stage Timers ====================
+
+def _record_stage(stage, started, outcome):
+    elapsed = time.perf_counter() - started
+    STAGE_DURATION.observe(elapsed, stage=stage, outcome=outcome)
+    context = current_context()
+    if context is not None:
+        context.add_stage(stage, elapsed)
+
+
+def timed(stage):
+    """Decorator recording a function's duration under `stage`; generators are timed until exhausted"""
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = 'error'
+                try:
+                    yield from fn(*args, **kwargs)
+                    outcome = 'ok'
+                finally:
+                    _record_stage(stage, started, outcome)
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = fn(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                _record_stage(stage, started, outcome)
+        return wrapper
+    return decorator
+
+
+# ==================== SQL Timing ====================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    elapsed = time.perf_counter() - started
+    current = current_context()
+    name = current.name if current is not None else 'background'
+    DB_QUERIES.inc(context=name)
+    DB_QUERY_DURATION.observe(elapsed, context=name)
+    if current is not None:
+        current.db_queries += 1
+        current.db_seconds += elapsed
+
+
+# ==================== Sampling Profiler ====================
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every interval and counts collapsed
+    stacks ("module:function;module:function ..."), the format flame graph
+    tools such as flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = FrameCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+
+# ==================== Flask Integration ====================
+
+def _endpoint_label(request):
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def init_app(app):
+    """Register request hooks and SQL listeners; call after db.init_app()"""
+    from flask import g, request
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_metrics():
+        endpoint = _endpoint_label(request)
+        context = g.metrics_context = _local.context = _Context(endpoint)
+        REQUESTS_IN_FLIGHT.inc(endpoint=endpoint)
+
+        # Opt-in profiling: ?profile=1 / X-Profile: 1, or a random sample of requests
+        if app.config.get('PROFILE_ENABLED') and (
+                request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+                or random.random() < app.config.get('PROFILE_SAMPLE_RATE', 0.0)):
+            context.profiler = SamplingProfiler(
+                threading.get_ident(), app.config.get('PROFILE_INTERVAL_MS', 5) / 1000.0).start()
+
+    @app.after_request
+    def finish_request_metrics(response):
+        context = g.pop('metrics_context', None)
+        if context is None:
+            return response
+        endpoint = context.name
+        response.headers['Server-Timing'] = context.server_timing()
+
+        profile_name = None
+        if context.profiler is not None:
+            profile_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint.strip('/').replace('/', '_') or 'root'}-{os.getpid()}.folded"
+            response.headers['X-Profile-File'] = profile_name
+
+        def finish():
+            # Runs once the body has been sent, so streamed responses are timed in full
+            elapsed = time.perf_counter() - context.started
+            REQUEST_DURATION.observe(elapsed, method=request_method, endpoint=endpoint, status=response.status_code)
+            REQUEST_DB_QUERIES.observe(context.db_queries, endpoint=endpoint)
+            REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+            if context.profiler is not None:
+                context.profiler.stop()
+                context.profiler.write(os.path.join(app.config.get('PROFILE_DIR', 'instance/profiles'), profile_name))
+            if current_context() is context:
+                _local.context = None
+
+        request_method = request.method
+        response.call_on_close(finish)
+        return response
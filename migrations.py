@@ -0,0 +1,205 @@
+# Versioned schema migrations for the SQLite database
+#
+# The applied version is stored in SQLite's PRAGMA user_version. Each migration
+# runs once, in order, in its own transaction together with the version bump,
+# so a failed migration leaves the database at the previous version. Migrations
+# must also be safe on a freshly created database, where the baseline already
+# builds the current schema.
+import json
+
+from sqlalchemy import text
+
+from models import db
+
+
+def _create_missing_tables(conn):
+    db.metadata.create_all(bind=conn)
+
+
+def _add_user_created_indexes(conn):
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_drone_images_user_created ON drone_images (user_id, created_at)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_soil_reports_user_created ON soil_reports (user_id, created_at)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_chat_history_user_created ON chat_history (user_id, created_at)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_jobs_user_id ON jobs (user_id)'))
+
+    # Keep the oldest suggestion per (user_id, date) before enforcing uniqueness
+    conn.execute(text(
+        'DELETE FROM weather_suggestions WHERE id NOT IN '
+        '(SELECT MIN(id) FROM weather_suggestions GROUP BY user_id, date)'
+    ))
+    conn.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_weather_suggestions_user_date ON weather_suggestions (user_id, date)'
+    ))
+
+
+def _create_ocr_cache(conn):
+    db.metadata.tables['ocr_cache'].create(bind=conn, checkfirst=True)
+
+
+def _create_soil_nutrients(conn):
+    from nutrients import parse_nutrients
+
+    db.metadata.tables['soil_nutrients'].create(bind=conn, checkfirst=True)
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_users_farm_location ON users (farm_location)'))
+
+    # Backfill readings for reports analyzed before nutrients were parsed
+    reports = conn.execute(text(
+        'SELECT id, user_id, ocr_text, created_at FROM soil_reports WHERE nutrient_levels IS NULL'
+    )).all()
+    for report_id, user_id, ocr_text, created_at in reports:
+        readings = parse_nutrients(ocr_text)
+        for nutrient, reading in readings.items():
+            conn.execute(text(
+                'INSERT INTO soil_nutrients (report_id, user_id, nutrient, value, unit, created_at) '
+                'VALUES (:report_id, :user_id, :nutrient, :value, :unit, :created_at)'
+            ), {'report_id': report_id, 'user_id': user_id, 'nutrient': nutrient,
+                'value': reading['value'], 'unit': reading['unit'], 'created_at': created_at})
+        conn.execute(text('UPDATE soil_reports SET nutrient_levels = :levels WHERE id = :id'),
+                     {'levels': json.dumps(readings), 'id': report_id})
+
+
+def _has_column(conn, table, column):
+    return any(row[1] == column for row in conn.execute(text(f'PRAGMA table_info({table})')))
+
+
+def _add_content_hashes(conn):
+    for table in ('drone_images', 'soil_reports'):
+        if not _has_column(conn, table, 'content_hash'):
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN content_hash VARCHAR(64)'))
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_content_hash ON {table} (content_hash)'))
+
+
+def _create_user_summaries(conn):
+    from summaries import rebuild_summaries
+
+    db.metadata.tables['user_summaries'].create(bind=conn, checkfirst=True)
+    rebuild_summaries(conn)
+
+
+def _create_cache_versions(conn):
+    db.metadata.tables['cache_versions'].create(bind=conn, checkfirst=True)
+
+
+def _create_outbreak_counts(conn):
+    from outbreaks import rebuild_outbreak_counts
+
+    db.metadata.tables['outbreak_counts'].create(bind=conn, checkfirst=True)
+    rebuild_outbreak_counts(conn)
+
+
+def _create_chat_summaries(conn):
+    db.metadata.tables['chat_summaries'].create(bind=conn, checkfirst=True)
+
+
+def _add_image_metrics(conn):
+    from field_health import backfill_image_metrics
+
+    for column, column_type in (('green_percentage', 'FLOAT'), ('image_health_score', 'FLOAT'),
+                                ('vegetation_grid', 'BLOB')):
+        if not _has_column(conn, 'drone_images', column):
+            conn.execute(text(f'ALTER TABLE drone_images ADD COLUMN {column} {column_type}'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_drone_images_user_created_health '
+                      'ON drone_images (user_id, created_at, green_percentage, image_health_score)'))
+    backfill_image_metrics(conn)
+
+
+# (version, description, function(conn)) - append only, never reorder
+MIGRATIONS = [
+    (1, 'baseline schema', _create_missing_tables),
+    (2, 'user_id/created_at indexes and unique daily weather suggestion', _add_user_created_indexes),
+    (3, 'ocr_cache table', _create_ocr_cache),
+    (4, 'soil_nutrients table with backfill from OCR text', _create_soil_nutrients),
+    (5, 'content_hash columns for upload dedup', _add_content_hashes),
+    (6, 'user_summaries table with backfill', _create_user_summaries),
+    (7, 'cache_versions table for HTTP ETags', _create_cache_versions),
+    (8, 'outbreak_counts table with backfill from drone_images', _create_outbreak_counts),
+    (9, 'chat_summaries table for rolling chat context', _create_chat_summaries),
+    (10, 'typed drone image health metrics with backfill from analysis_result', _add_image_metrics),
+]
+
+
+def current_version(conn):
+    return conn.execute(text('PRAGMA user_version')).scalar()
+
+
+def upgrade(engine=None):
+    """Apply pending migrations; returns the list of versions applied"""
+    engine = engine or db.engine
+    applied = []
+    # pysqlite commits before DDL and PRAGMAs on its own; with its transaction
+    # handling off (AUTOCOMMIT) the BEGIN/COMMIT below are the only boundaries
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for target, description, migrate in MIGRATIONS:
+            # IMMEDIATE takes the write lock first, so concurrent processes apply each migration once
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+            try:
+                if current_version(conn) >= target:
+                    conn.exec_driver_sql('COMMIT')
+                    continue
+                migrate(conn)
+                # PRAGMA does not accept bound parameters
+                conn.execute(text(f'PRAGMA user_version = {int(target)}'))
+            except BaseException:
+                conn.exec_driver_sql('ROLLBACK')
+                raise
+            conn.exec_driver_sql('COMMIT')
+            applied.append(target)
+    return applied
+
+
+# ==================== Query Plan Checks ====================
+
+# Hot queries and the index each one must use (checked by `flask db-check` and the test suite)
+def _plan_checks():
+    from models import DroneImage, SoilReport, SoilNutrient, ChatHistory, WeatherSuggestion, OutbreakCount
+
+    checks = []
+    for model, index in ((DroneImage, 'ix_drone_images_user_created'),
+                         (SoilReport, 'ix_soil_reports_user_created'),
+                         (ChatHistory, 'ix_chat_history_user_created')):
+        query = model.query.filter_by(user_id=1).order_by(model.created_at.desc(), model.id.desc()).limit(50)
+        checks.append((f'{model.__tablename__} dashboard listing', query, index))
+
+    query = (ChatHistory.query.filter(ChatHistory.user_id == 1, ChatHistory.id > 0)
+             .order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc()).limit(7))
+    checks.append(('chat_history context window', query, 'ix_chat_history_user_created'))
+
+    query = WeatherSuggestion.query.filter_by(user_id=1, date='2024-01-01')
+    checks.append(('weather_suggestions daily lookup', query, 'uq_weather_suggestions_user_date'))
+
+    query = SoilNutrient.query.filter_by(user_id=1, nutrient='ph').order_by(SoilNutrient.created_at)
+    checks.append(('soil_nutrients trend scan', query, 'ix_soil_nutrients_user_nutrient_created'))
+
+    query = (db.session.query(DroneImage.created_at, DroneImage.green_percentage, DroneImage.image_health_score)
+             .filter(DroneImage.user_id == 1, DroneImage.created_at >= '2024-01-01',
+                     DroneImage.green_percentage.isnot(None)))
+    checks.append(('drone_images field-health scan', query, 'ix_drone_images_user_created_health'))
+
+    query = OutbreakCount.query.filter(OutbreakCount.region_key.in_(['g:37:147', 'g:37:148']),
+                                       OutbreakCount.day >= '2024-01-01')
+    checks.append(('outbreak_counts region window', query, 'ix_outbreak_counts_region_day'))
+    return checks
+
+
+def explain_query_plan(query):
+    """Return the EXPLAIN QUERY PLAN detail lines for an ORM query"""
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')).all()
+    return [row[-1] for row in rows]
+
+
+def check_query_plans():
+    """
+    Verify hot queries use their indexes without a temp B-tree sort.
+    Returns a list of failure messages (empty when all plans are good).
+    """
+    failures = []
+    for name, query, index in _plan_checks():
+        plan = explain_query_plan(query)
+        joined = ' | '.join(plan)
+        if index not in joined:
+            failures.append(f'{name}: expected index {index}, plan was: {joined}')
+        elif 'USE TEMP B-TREE' in joined:
+            failures.append(f'{name}: plan sorts with a temp B-tree: {joined}')
+    return failures
@@ -0,0 +1,227 @@
+# Process-wide registry of ML models with micro-batched inference
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+
+# ==================== Loaders ====================
+
+def load_keras_model(path):
+    from tensorflow import keras
+    return keras.models.load_model(path)
+
+
+def load_torch_model(path):
+    import torch
+    model = torch.load(path, map_location='cpu')
+    if hasattr(model, 'eval'):
+        model.eval()
+    return model
+
+
+LOADERS = {
+    '.h5': load_keras_model,
+    '.keras': load_keras_model,
+    '.pth': load_torch_model,
+    '.pt': load_torch_model
+}
+
+
+def run_model(model, batch):
+    """Forward pass for a stacked NumPy batch; returns a NumPy array"""
+    import numpy as np
+
+    if hasattr(model, 'predict'):
+        return np.asarray(model.predict(batch, verbose=0))
+
+    import torch
+    with torch.no_grad():
+        return model(torch.from_numpy(batch)).cpu().numpy()
+
+
+# ==================== Micro-batching ====================
+
+class MicroBatcher:
+    """
+    Collects concurrent single-input inference calls into one forward pass.
+    A batch is run when max_batch_size inputs are queued or max_wait_ms has
+    passed since the first one arrived.
+    """
+
+    def __init__(self, registry, name, max_batch_size=16, max_wait_ms=10):
+        self.registry = registry
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = []
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, name=f'batcher-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, x):
+        future = Future()
+        with self._condition:
+            self._queue.append((x, future))
+            self._condition.notify()
+        return future
+
+    def _loop(self):
+        import numpy as np
+
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                deadline = time.monotonic() + self.max_wait
+                while len(self._queue) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._queue[:self.max_batch_size]
+                del self._queue[:self.max_batch_size]
+
+            try:
+                model = self.registry.get(self.name)
+                outputs = run_model(model, np.stack([x for x, _ in batch]))
+                for (_, future), output in zip(batch, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+# ==================== Registry ====================
+
+def _read_labels(model_path):
+    path = os.path.splitext(model_path)[0] + '.labels.json'
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class _Slot:
+    def __init__(self, path, loader):
+        self.path = path
+        self.loader = loader
+        self.model = None
+        self.labels = None
+        self.mtime = None
+        self.error = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Loads each model once per process and shares it across threads.
+
+    Models load lazily on first use, or all at once via preload() when
+    MODEL_PRELOAD is set. The file's mtime is re-checked at most every
+    MODEL_RELOAD_CHECK_SECONDS; a changed file is loaded (with its labels) and swapped in
+    atomically, so a new model can be deployed without a restart.
+    """
+
+    def __init__(self):
+        self.max_batch_size = 16
+        self.max_wait_ms = 10
+        self.reload_check_seconds = 5.0
+        self._slots = {}
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_batch_size = app.config.get('MODEL_BATCH_MAX_SIZE', self.max_batch_size)
+        self.max_wait_ms = app.config.get('MODEL_BATCH_MAX_WAIT_MS', self.max_wait_ms)
+        self.reload_check_seconds = app.config.get('MODEL_RELOAD_CHECK_SECONDS', self.reload_check_seconds)
+        for name, path in app.config.get('MODEL_PATHS', {}).items():
+            self.register(name, path)
+        if app.config.get('MODEL_PRELOAD'):
+            self.preload()
+
+    def register(self, name, path, loader=None):
+        """Register a model file; the loader defaults to one matching the extension"""
+        loader = loader or LOADERS.get(os.path.splitext(path)[1].lower())
+        if loader is None:
+            raise ValueError(f"No loader for model file '{path}'")
+        with self._lock:
+            self._slots[name] = _Slot(path, loader)
+
+    def preload(self):
+        for name in list(self._slots):
+            self.available(name)
+
+    def get(self, name):
+        """Return the loaded model, (re)loading it if needed; raises if it cannot load"""
+        slot = self._slots[name]
+        now = time.monotonic()
+        if slot.model is not None and now - slot.checked_at < self.reload_check_seconds:
+            return slot.model
+
+        with slot.lock:
+            slot.checked_at = time.monotonic()
+            mtime = os.path.getmtime(slot.path) if os.path.exists(slot.path) else None
+            if mtime != slot.mtime:
+                try:
+                    model = slot.loader(slot.path)
+                    labels = _read_labels(slot.path)
+                except Exception as e:
+                    # Keep serving the previous model (if any) and don't retry until the file changes
+                    slot.error = f"{type(e).__name__}: {e}"
+                else:
+                    slot.model, slot.labels, slot.error = model, labels, None
+                slot.mtime = mtime
+            if slot.model is None:
+                raise RuntimeError(f"Model '{name}' unavailable: {slot.error}")
+            return slot.model
+
+    def available(self, name):
+        """True if the model is registered and loads"""
+        if name not in self._slots:
+            return False
+        try:
+            self.get(name)
+            return True
+        except Exception:
+            return False
+
+    def reload(self, name):
+        """Force a reload on next use"""
+        slot = self._slots[name]
+        with slot.lock:
+            slot.mtime = None
+            slot.checked_at = 0.0
+
+    def predict_async(self, name, x):
+        """Queue one input for micro-batched inference; returns a Future of its output"""
+        with self._lock:
+            batcher = self._batchers.get(name)
+            if batcher is None:
+                batcher = self._batchers[name] = MicroBatcher(
+                    self, name, self.max_batch_size, self.max_wait_ms)
+        return batcher.submit(x)
+
+    def predict(self, name, x, timeout=30):
+        """Run one input through the model, micro-batched with concurrent callers"""
+        return self.predict_async(name, x).result(timeout=timeout)
+
+    def labels(self, name):
+        """Class names from an optional '<model>.labels.json' file, loaded along with the model"""
+        self.get(name)
+        return self._slots[name].labels
+
+    def status(self):
+        return {
+            name: {
+                'path': slot.path,
+                'loaded': slot.model is not None,
+                'error': slot.error
+            }
+            for name, slot in self._slots.items()
+        }
+
+
+model_registry = ModelRegistry()
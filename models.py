@@ -1,11 +1,26 @@
 # Database models for SQLite
+import json
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import datetime, date
+from thumbnails import derivative_url
 
 db = SQLAlchemy()
 
+def serialize_fields(obj, fields):
+    """Build a dict of the given attribute names, formatting dates as ISO strings"""
+    data = {}
+    for name in fields:
+        value = getattr(obj, name)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        data[name] = value
+    return data
+
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_farm_location', 'farm_location'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -34,38 +49,66 @@ class User(db.Model):
 
 class DroneImage(db.Model):
     __tablename__ = 'drone_images'
+    __table_args__ = (
+        db.Index('ix_drone_images_user_created', 'user_id', 'created_at'),
+        db.Index('ix_drone_images_content_hash', 'content_hash'),
+        # Covers the field-health trend aggregation (no table or JSON access)
+        db.Index('ix_drone_images_user_created_health', 'user_id', 'created_at', 'green_percentage',
+                 'image_health_score'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    content_hash = db.Column(db.String(64))  # SHA-256 of the stored file
     analysis_result = db.Column(db.Text)  # JSON string of analysis results
     crop_stress_level = db.Column(db.String(50))
     pest_detected = db.Column(db.Boolean, default=False)
     pest_type = db.Column(db.String(100))
     nutrient_deficiency = db.Column(db.String(200))
+    green_percentage = db.Column(db.Float)
+    image_health_score = db.Column(db.Float)
+    vegetation_grid = db.Column(db.LargeBinary)  # Per-tile green cover, float16 .npy (see field_health.py)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'filename': self.filename,
-            'file_path': self.file_path,
-            'analysis_result': self.analysis_result,
-            'crop_stress_level': self.crop_stress_level,
-            'pest_detected': self.pest_detected,
-            'pest_type': self.pest_type,
-            'nutrient_deficiency': self.nutrient_deficiency,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    # Fields exposed by to_dict(), in output order
+    SERIALIZED_FIELDS = (
+        'id', 'filename', 'file_path', 'thumbnail_url', 'preview_url', 'analysis_result',
+        'crop_stress_level', 'pest_detected', 'pest_type', 'nutrient_deficiency',
+        'green_percentage', 'image_health_score', 'created_at'
+    )
+    # Fields dropped from the lightweight list view
+    HEAVY_FIELDS = ('analysis_result',)
+    # Computed fields -> the columns they are built from
+    FIELD_DEPENDENCIES = {
+        'thumbnail_url': ('content_hash',),
+        'preview_url': ('content_hash',)
+    }
+    
+    @property
+    def thumbnail_url(self):
+        return derivative_url(self.content_hash, 'thumb') if self.content_hash else None
+    
+    @property
+    def preview_url(self):
+        return derivative_url(self.content_hash, 'medium') if self.content_hash else None
+    
+    def to_dict(self, fields=None):
+        return serialize_fields(self, fields or self.SERIALIZED_FIELDS)
 
 class SoilReport(db.Model):
     __tablename__ = 'soil_reports'
+    __table_args__ = (
+        db.Index('ix_soil_reports_user_created', 'user_id', 'created_at'),
+        db.Index('ix_soil_reports_content_hash', 'content_hash'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    content_hash = db.Column(db.String(64))  # SHA-256 of the stored file
     ocr_text = db.Column(db.Text)  # Raw OCR extracted text
     analysis_summary = db.Column(db.Text)  # AI-generated summary in English
     analysis_marathi = db.Column(db.Text)  # Translated to Marathi
@@ -76,23 +119,42 @@ class SoilReport(db.Model):
     recommendations_hindi = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'filename': self.filename,
-            'file_path': self.file_path,
-            'analysis_summary': self.analysis_summary,
-            'analysis_marathi': self.analysis_marathi,
-            'analysis_hindi': self.analysis_hindi,
-            'nutrient_levels': self.nutrient_levels,
-            'recommendations': self.recommendations,
-            'recommendations_marathi': self.recommendations_marathi,
-            'recommendations_hindi': self.recommendations_hindi,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    nutrients = db.relationship('SoilNutrient', backref='report', lazy=True)
+    
+    SERIALIZED_FIELDS = (
+        'id', 'filename', 'file_path', 'analysis_summary', 'analysis_marathi',
+        'analysis_hindi', 'nutrient_levels', 'recommendations',
+        'recommendations_marathi', 'recommendations_hindi', 'created_at'
+    )
+    HEAVY_FIELDS = (
+        'analysis_summary', 'analysis_marathi', 'analysis_hindi', 'nutrient_levels',
+        'recommendations', 'recommendations_marathi', 'recommendations_hindi'
+    )
+    
+    def to_dict(self, fields=None):
+        return serialize_fields(self, fields or self.SERIALIZED_FIELDS)
+
+class SoilNutrient(db.Model):
+    __tablename__ = 'soil_nutrients'
+    __table_args__ = (
+        db.Index('ix_soil_nutrients_user_nutrient_created', 'user_id', 'nutrient', 'created_at'),
+    )
+    
+    # One parsed reading per (report, nutrient); user_id and created_at are copied
+    # from the report so trend queries never touch the report text
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.Integer, db.ForeignKey('soil_reports.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    nutrient = db.Column(db.String(30), nullable=False)  # e.g. nitrogen, ph, zinc
+    value = db.Column(db.Float, nullable=False)
+    unit = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, nullable=False)
 
 class WeatherSuggestion(db.Model):
     __tablename__ = 'weather_suggestions'
+    __table_args__ = (
+        db.Index('uq_weather_suggestions_user_date', 'user_id', 'date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -104,6 +166,9 @@ class WeatherSuggestion(db.Model):
 
 class ChatHistory(db.Model):
     __tablename__ = 'chat_history'
+    __table_args__ = (
+        db.Index('ix_chat_history_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -111,11 +176,139 @@ class ChatHistory(db.Model):
     response = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    SERIALIZED_FIELDS = ('id', 'message', 'response', 'created_at')
+    HEAVY_FIELDS = ('response',)
+    
+    def to_dict(self, fields=None):
+        return serialize_fields(self, fields or self.SERIALIZED_FIELDS)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+        db.Index('ix_jobs_user_id', 'user_id'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True)  # UUID4 hex string
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    payload = db.Column(db.Text)  # JSON string of handler arguments
+    result = db.Column(db.Text)  # JSON string of handler output
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)  # Earliest time the job may (re)run
+    locked_at = db.Column(db.DateTime)  # When a worker claimed the job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
     def to_dict(self):
         return {
             'id': self.id,
-            'message': self.message,
-            'response': self.response,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'job_type': self.job_type,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class TranslationCache(db.Model):
+    __tablename__ = 'translation_cache'
+    
+    key = db.Column(db.String(64), primary_key=True)  # SHA-256 of (target_language, text)
+    target_language = db.Column(db.String(10), nullable=False)
+    translated_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class WeatherAdvisory(db.Model):
+    __tablename__ = 'weather_advisories'
+    __table_args__ = (
+        db.UniqueConstraint('date', 'farm_location', 'crop_type', name='uq_weather_advisory_key'),
+    )
+    
+    # One advisory per (date, location, crop), shared by every user with that profile
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    farm_location = db.Column(db.String(200), nullable=False)
+    crop_type = db.Column(db.String(100), nullable=False)
+    suggestion_text = db.Column(db.Text)
+    suggestion_marathi = db.Column(db.Text)
+    suggestion_hindi = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class OcrCache(db.Model):
+    __tablename__ = 'ocr_cache'
+    
+    content_hash = db.Column(db.String(64), primary_key=True)  # SHA-256 of the uploaded file
+    ocr_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UserSummary(db.Model):
+    __tablename__ = 'user_summaries'
+    
+    # Dashboard aggregates, updated in the same transaction as every
+    # DroneImage/SoilReport/ChatHistory insert (see summaries.py)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    drone_image_count = db.Column(db.Integer, nullable=False, default=0)
+    soil_report_count = db.Column(db.Integer, nullable=False, default=0)
+    chat_count = db.Column(db.Integer, nullable=False, default=0)
+    pest_alert_count = db.Column(db.Integer, nullable=False, default=0)
+    latest_stress_level = db.Column(db.String(50))  # Of the newest drone image
+    recent_images = db.Column(db.Text)  # JSON list, newest first
+    recent_reports = db.Column(db.Text)  # JSON list, newest first
+    recent_chats = db.Column(db.Text)  # JSON list, newest first
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'drone_image_count': self.drone_image_count or 0,
+            'soil_report_count': self.soil_report_count or 0,
+            'chat_count': self.chat_count or 0,
+            'pest_alert_count': self.pest_alert_count or 0,
+            'latest_stress_level': self.latest_stress_level,
+            'recent_images': json.loads(self.recent_images or '[]'),
+            'recent_reports': json.loads(self.recent_reports or '[]'),
+            'recent_chats': json.loads(self.recent_chats or '[]'),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+    
+    # Bumped on every change to a user's rows in table_name (see http_cache.py);
+    # ETags are built from these counters instead of the rows themselves
+    user_id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class OutbreakCount(db.Model):
+    __tablename__ = 'outbreak_counts'
+    __table_args__ = (
+        db.Index('uq_outbreak_counts_key', 'farm_location', 'crop_type', 'pest_type', 'day', unique=True),
+        db.Index('ix_outbreak_counts_region_day', 'region_key', 'day'),
+    )
+    
+    # Daily drone-image counts per (location, crop, pest), incremented on insert
+    # (see outbreaks.py); rolling windows are sums over the last N days
+    id = db.Column(db.Integer, primary_key=True)
+    region_key = db.Column(db.String(40), nullable=False)  # Spatial grid cell of farm_location
+    farm_location = db.Column(db.String(200), nullable=False)  # Normalized, e.g. 'pune'
+    crop_type = db.Column(db.String(100), nullable=False)  # Normalized, e.g. 'wheat'
+    pest_type = db.Column(db.String(100), nullable=False)  # '' when no pest was detected
+    day = db.Column(db.Date, nullable=False)
+    image_count = db.Column(db.Integer, nullable=False, default=0)
+    high_stress_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ChatSummary(db.Model):
+    __tablename__ = 'chat_summaries'
+    
+    # Rolling summary of a user's chat turns that have left the prompt's
+    # verbatim window (see chat_context.py)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    summary = db.Column(db.Text, nullable=False, default='')
+    last_chat_id = db.Column(db.Integer, nullable=False, default=0)  # Newest ChatHistory id folded in
+    folded_turns = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,137 @@
+# Deterministic nutrient extraction from soil report OCR text
+#
+# Soil health cards print each parameter on its own line, e.g.
+#   "Available Nitrogen (N)   245.6 kg/ha"   or   "pH : 7.2"
+# so a per-line regex finds the parameter name and the first number after it.
+import re
+
+# nutrient -> (name pattern, element symbol, default unit, plausible (min, max) range)
+# Names are matched case-insensitively. Single-letter symbols are common words on
+# a card ("S. No.", "N.A."), so they only count inside brackets, "Available (N)",
+# or as the label starting a line, "N : 245" (see _SYMBOL_PATTERNS). Oxide
+# formulas are part of the label, "Phosphorus (P2O5)", "Potassium as K2O", so
+# their digits are never read as the value.
+_P2O5 = r'(?:\s*\(?\s*(?:as\s+)?P2O5\s*\)?)?'
+_K2O = r'(?:\s*\(?\s*(?:as\s+)?K2O\s*\)?)?'
+NUTRIENTS = {
+    'nitrogen': (r'(?i:nitrogen)', 'N', 'kg/ha', (0, 2000)),
+    'phosphorus': (rf'(?i:phosph\w*){_P2O5}|\bP2O5\b', 'P', 'kg/ha', (0, 500)),
+    'potassium': (rf'(?i:potassium|potash){_K2O}|\bK2O\b', 'K', 'kg/ha', (0, 3000)),
+    'ph': (r'\b(?i:ph)\b', None, None, (0, 14)),
+    'ec': (r'(?i:electrical\s+conductivity)|\bEC\b', None, 'dS/m', (0, 50)),
+    'organic_carbon': (r'(?i:organic\s+carbon)|\bO\.?C\b', None, '%', (0, 20)),
+    'sulphur': (r'(?i:sulph\w*|sulf\w*)', 'S', 'ppm', (0, 500)),
+    'zinc': (r'(?i:zinc)|\bZn\b', None, 'ppm', (0, 100)),
+    'iron': (r'\b(?i:iron)\b|\bFe\b', None, 'ppm', (0, 500)),
+    'manganese': (r'(?i:manganese)|\bMn\b', None, 'ppm', (0, 500)),
+    'copper': (r'(?i:copper)|\bCu\b', None, 'ppm', (0, 100)),
+    'boron': (r'(?i:boron)', 'B', 'ppm', (0, 50)),
+}
+
+_UNIT = r'kg\s*/\s*ha|kg\s*ha-?1|ppm|mg\s*/\s*kg|%|dS\s*/\s*m|mS\s*/\s*cm|mmhos\s*/\s*cm'
+# Spelling variants -> canonical unit (mS/cm and mmhos/cm are numerically equal to dS/m)
+_UNIT_ALIASES = {'kg/ha': 'kg/ha', 'kgha-1': 'kg/ha', 'kgha1': 'kg/ha', 'ppm': 'ppm', 'mg/kg': 'ppm',
+                 '%': '%', 'ds/m': 'dS/m', 'ms/cm': 'dS/m', 'mmhos/cm': 'dS/m'}
+
+# Label, then up to 40 non-digit characters (symbol in brackets, unit, ':' ...), then
+# the value, which must follow a separator rather than a letter or digit ("P2O5", "B12")
+_READING = r'(?P<gap>[^\d\n]{0,40}?)(?<![^\W_])(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>(?i:' + _UNIT + r'))?'
+_NAME_PATTERNS = {
+    nutrient: re.compile(rf'(?:{names}){_READING}')
+    for nutrient, (names, _, _, _) in NUTRIENTS.items()
+}
+# "(N)" anywhere, or "N" starting the line and followed by a separator or the value
+_SYMBOL_PATTERNS = {
+    nutrient: re.compile(rf'(?:\(\s*{symbol}\s*\)|^\s*{symbol}(?=\s*[:=-]|\s+\d)){_READING}')
+    for nutrient, (_, symbol, _, _) in NUTRIENTS.items() if symbol
+}
+_UNIT_RE = re.compile(_UNIT, re.IGNORECASE)
+
+
+def _normalize_unit(raw):
+    unit = re.sub(r'\s+', '', raw)
+    return _UNIT_ALIASES.get(unit.lower(), unit)
+
+
+def _first_reading(lines, nutrient, pattern):
+    low, high = NUTRIENTS[nutrient][3]
+    for line in lines:
+        for match in pattern.finditer(line):
+            value = float(match.group('value'))
+            if not low <= value <= high:
+                continue
+            # Units may be printed after the value or in the header part before it
+            raw_unit = match.group('unit') or (_UNIT_RE.search(match.group('gap')) or [None])[0]
+            unit = _normalize_unit(raw_unit) if raw_unit else NUTRIENTS[nutrient][2]
+            return {'value': value, 'unit': unit}
+    return None
+
+
+def parse_nutrients(text):
+    """
+    Extract nutrient readings from OCR text.
+    Returns {nutrient: {'value': float, 'unit': str or None}}; the first
+    plausible reading of each nutrient wins, and a reading labelled by name
+    wins over one labelled only by its symbol.
+    """
+    readings = {}
+    if not text:
+        return readings
+
+    lines = text.splitlines()
+    for nutrient in NUTRIENTS:
+        reading = _first_reading(lines, nutrient, _NAME_PATTERNS[nutrient])
+        if reading is None and nutrient in _SYMBOL_PATTERNS:
+            reading = _first_reading(lines, nutrient, _SYMBOL_PATTERNS[nutrient])
+        if reading is not None:
+            readings[nutrient] = reading
+    return readings
+
+
+# ==================== Trend Queries ====================
+
+# SQLite strftime formats for the supported time buckets
+PERIOD_FORMATS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+    'year': '%Y'
+}
+
+
+def nutrient_trends(nutrient=None, period='month', user_id=None, farm_location=None, since=None):
+    """
+    Aggregate readings into time buckets for one user or every farm in a location.
+    Returns {nutrient: [{period, unit, avg, min, max, readings, farms}, ...]}.
+    """
+    from sqlalchemy import func
+    from models import db, SoilNutrient, User
+
+    bucket = func.strftime(PERIOD_FORMATS[period], SoilNutrient.created_at)
+    query = db.session.query(
+        SoilNutrient.nutrient, SoilNutrient.unit, bucket.label('period'),
+        func.avg(SoilNutrient.value), func.min(SoilNutrient.value), func.max(SoilNutrient.value),
+        func.count(SoilNutrient.id), func.count(func.distinct(SoilNutrient.user_id))
+    )
+    if farm_location is not None:
+        query = query.join(User, User.id == SoilNutrient.user_id).filter(User.farm_location == farm_location)
+    else:
+        query = query.filter(SoilNutrient.user_id == user_id)
+    if nutrient:
+        query = query.filter(SoilNutrient.nutrient == nutrient)
+    if since:
+        query = query.filter(SoilNutrient.created_at >= since)
+
+    series = {}
+    rows = query.group_by(SoilNutrient.nutrient, SoilNutrient.unit, bucket).order_by(SoilNutrient.nutrient, bucket)
+    for name, unit, bucket_label, avg, low, high, readings, farms in rows:
+        series.setdefault(name, []).append({
+            'period': bucket_label,
+            'unit': unit,
+            'avg': round(avg, 3),
+            'min': low,
+            'max': high,
+            'readings': readings,
+            'farms': farms
+        })
+    return series
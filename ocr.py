@@ -0,0 +1,122 @@
+# OCR pipeline for soil reports: preprocessing, PDF rasterization, parallel pages
+#
+# This module is imported by OCR worker processes, so it must not import
+# Flask, the models or anything else with side effects.
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import pytesseract
+
+OCR_TARGET_DPI = 300
+OCR_PAGE_LONG_SIDE_INCHES = 11.69  # A4; phone photos carry no reliable DPI
+OCR_LANG = 'eng'
+OCR_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+_pool = None
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ==================== Preprocessing ====================
+
+def downscale_to_dpi(gray, dpi=OCR_TARGET_DPI):
+    """Shrink so the long side matches an A4 page at the target DPI (never upscales)"""
+    target = int(dpi * OCR_PAGE_LONG_SIDE_INCHES)
+    long_side = max(gray.shape[:2])
+    if long_side <= target:
+        return gray
+    scale = target / long_side
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def deskew(gray):
+    """Rotate so text lines are horizontal, using the min-area box around ink pixels"""
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    points = cv2.findNonZero(ink)
+    if points is None or len(points) < 100:
+        return gray
+
+    angle = cv2.minAreaRect(points)[-1]
+    # OpenCV reports angles in (0, 90]; map to the smallest correction
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.5:
+        return gray
+
+    height, width = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_CUBIC,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+
+def binarize(gray):
+    """Adaptive threshold copes with the uneven lighting of phone photos"""
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    return cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, 31, 15)
+
+
+def preprocess(image):
+    """Grayscale -> downscale to target DPI -> deskew -> binarize"""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return binarize(deskew(downscale_to_dpi(gray)))
+
+
+# ==================== Pages ====================
+
+def load_pages(path):
+    """Decoded pages of an image or PDF as grayscale/BGR arrays"""
+    if path.lower().endswith('.pdf'):
+        try:
+            from pdf2image import convert_from_path
+        except ImportError:
+            raise RuntimeError('PDF support requires pdf2image and poppler')
+        return [cv2.cvtColor(np.asarray(page.convert('RGB')), cv2.COLOR_RGB2BGR)
+                for page in convert_from_path(path, dpi=OCR_TARGET_DPI)]
+
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        # Some OpenCV builds lack GIF or less common TIFF decoders; PIL reads those
+        try:
+            from PIL import Image
+            with Image.open(path) as page:
+                image = np.asarray(page.convert('L'))
+        except Exception:
+            raise ValueError('Could not load image')
+    return [image]
+
+
+def ocr_page(image):
+    """Preprocess and OCR one page (runs in a worker process for multi-page files)"""
+    text = pytesseract.image_to_string(preprocess(image), lang=OCR_LANG,
+                                       config=f'--dpi {OCR_TARGET_DPI}')
+    return text.strip()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: the web process is multi-threaded, so forking it is unsafe
+        _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS,
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def extract_text(path):
+    """OCR every page of a file; multi-page PDFs are processed in parallel"""
+    pages = load_pages(path)
+    if len(pages) == 1:
+        return ocr_page(pages[0])
+    texts = list(_get_pool().map(ocr_page, pages))
+    return '\n\n'.join(text for text in texts if text)
@@ -0,0 +1,249 @@
+# Region-level pest-outbreak aggregation over drone image uploads
+#
+# Every new DroneImage increments a daily counter for its owner's
+# (farm_location, crop_type, pest_type) in outbreak_counts, in the same
+# transaction, so a rolling window is a sum over one row per key and day
+# instead of a scan of drone_images.
+#
+# Locations are bucketed into a grid of REGION_CELL_DEGREES cells using the
+# gazetteer below; a region's alerts cover its own cell and the 8 around it.
+# Locations missing from the gazetteer get a cell of their own (no neighbours).
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, event, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, User, DroneImage, OutbreakCount
+
+REGION_CELL_DEGREES = 0.5  # ~55 km; neighbours span roughly 165 km
+ALERT_WINDOW_DAYS = 7
+BASELINE_DAYS = 28  # Window before ALERT_WINDOW_DAYS used for the usual detection rate
+ALERT_MIN_DETECTIONS = 3
+ALERT_GROWTH = 2.0  # Detection rate vs. baseline rate that raises a warning
+
+# District headquarters (approximate lat, lon) for Maharashtra and nearby cities
+LOCATION_COORDINATES = {
+    'ahmednagar': (19.09, 74.74), 'akola': (20.70, 77.00), 'amravati': (20.93, 77.75),
+    'aurangabad': (19.88, 75.34), 'baramati': (18.15, 74.58), 'beed': (18.99, 75.76),
+    'bhandara': (21.17, 79.65), 'buldhana': (20.53, 76.18), 'chandrapur': (19.96, 79.30),
+    'dhule': (20.90, 74.77), 'gadchiroli': (20.18, 80.00), 'gondia': (21.46, 80.19),
+    'hingoli': (19.72, 77.15), 'jalgaon': (21.00, 75.56), 'jalna': (19.84, 75.88),
+    'kolhapur': (16.70, 74.24), 'latur': (18.40, 76.56), 'mumbai': (19.08, 72.88),
+    'nagpur': (21.15, 79.09), 'nanded': (19.14, 77.32), 'nandurbar': (21.37, 74.24),
+    'nashik': (20.00, 73.79), 'osmanabad': (18.18, 76.04), 'palghar': (19.70, 72.77),
+    'parbhani': (19.27, 76.77), 'pune': (18.52, 73.86), 'raigad': (18.64, 72.87),
+    'ratnagiri': (16.99, 73.31), 'sangli': (16.85, 74.58), 'satara': (17.68, 74.02),
+    'sindhudurg': (16.11, 73.70), 'solapur': (17.66, 75.91), 'thane': (19.22, 72.98),
+    'wardha': (20.74, 78.60), 'washim': (20.11, 77.13), 'yavatmal': (20.39, 78.12),
+    'indore': (22.72, 75.86), 'bhopal': (23.26, 77.41),
+}
+LOCATION_ALIASES = {
+    'chhatrapati sambhajinagar': 'aurangabad', 'sambhajinagar': 'aurangabad',
+    'dharashiv': 'osmanabad', 'ahilyanagar': 'ahmednagar', 'bombay': 'mumbai', 'poona': 'pune',
+}
+
+
+# ==================== Location Bucketing ====================
+
+def normalize_location(farm_location):
+    """'Pune, Maharashtra' -> 'pune' (first comma-separated part found in the gazetteer, else the first part)"""
+    parts = [' '.join(part.lower().split()) for part in (farm_location or '').split(',')]
+    parts = [LOCATION_ALIASES.get(part, part) for part in parts if part]
+    for part in parts:
+        if part in LOCATION_COORDINATES:
+            return part
+    return parts[0] if parts else 'unknown'
+
+
+def normalize_crop(crop_type):
+    return ' '.join((crop_type or '').lower().split()) or 'general'
+
+
+def _cell(lat, lon):
+    return math.floor(lat / REGION_CELL_DEGREES), math.floor(lon / REGION_CELL_DEGREES)
+
+
+def region_key(location):
+    """Grid cell of a normalized location, e.g. 'g:37:147'; 'n:<name>' when its coordinates are unknown"""
+    coordinates = LOCATION_COORDINATES.get(location)
+    if coordinates is None:
+        return f'n:{location}'
+    row, col = _cell(*coordinates)
+    return f'g:{row}:{col}'
+
+
+def neighbour_keys(key):
+    """The cell itself and the 8 cells around it"""
+    if not key.startswith('g:'):
+        return [key]
+    _, row, col = key.split(':')
+    row, col = int(row), int(col)
+    return [f'g:{row + dr}:{col + dc}' for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+
+
+# ==================== Incremental Counters ====================
+
+def _counter_key(location, crop_type, image):
+    pest_type = (image.pest_type or 'unknown') if image.pest_detected else ''
+    return (region_key(location), location, normalize_crop(crop_type), pest_type, image.created_at.date())
+
+
+def record_images(conn, images):
+    """Increment the daily counters for newly inserted DroneImage rows"""
+    users = User.__table__
+    profiles = {
+        row.id: row for row in conn.execute(
+            select(users.c.id, users.c.farm_location, users.c.crop_type)
+            .where(users.c.id.in_({image.user_id for image in images}))
+        )
+    }
+
+    increments = {}
+    for image in images:
+        profile = profiles.get(image.user_id)
+        if profile is None:
+            continue
+        key = _counter_key(normalize_location(profile.farm_location), profile.crop_type, image)
+        counts = increments.setdefault(key, [0, 0])
+        counts[0] += 1
+        counts[1] += image.crop_stress_level == 'High'
+    if not increments:
+        return
+
+    table = OutbreakCount.__table__
+    insert = sqlite_insert(table)
+    statement = insert.on_conflict_do_update(
+        index_elements=[table.c.farm_location, table.c.crop_type, table.c.pest_type, table.c.day],
+        set_={'image_count': table.c.image_count + insert.excluded.image_count,
+              'high_stress_count': table.c.high_stress_count + insert.excluded.high_stress_count}
+    )
+    conn.execute(statement, [
+        {'region_key': region, 'farm_location': location, 'crop_type': crop, 'pest_type': pest, 'day': day,
+         'image_count': image_count, 'high_stress_count': high_stress_count}
+        for (region, location, crop, pest, day), (image_count, high_stress_count) in increments.items()
+    ])
+
+
+def _after_flush(session, flush_context):
+    images = [obj for obj in session.new if isinstance(obj, DroneImage) and obj.created_at is not None]
+    if images:
+        record_images(session.connection(), images)
+
+
+def rebuild_outbreak_counts(conn):
+    """
+    Recompute all counters from drone_images (one grouped scan); returns the
+    number of counter rows. Images are attributed to their owner's current
+    location and crop, whereas the listener uses the profile at upload time.
+    """
+    images, users = DroneImage.__table__, User.__table__
+    day = func.date(images.c.created_at)
+    rows = conn.execute(
+        select(users.c.farm_location, users.c.crop_type, images.c.pest_detected, images.c.pest_type,
+               day.label('day'), func.count().label('image_count'),
+               func.sum(case((images.c.crop_stress_level == 'High', 1), else_=0)).label('high_stress_count'))
+        .join(users, users.c.id == images.c.user_id)
+        .group_by(users.c.farm_location, users.c.crop_type, images.c.pest_detected, images.c.pest_type, day)
+    ).all()
+
+    # Different spellings of a location or crop collapse into one key
+    merged = {}
+    for row in rows:
+        location = normalize_location(row.farm_location)
+        pest_type = (row.pest_type or 'unknown') if row.pest_detected else ''
+        key = (region_key(location), location, normalize_crop(row.crop_type), pest_type,
+               datetime.strptime(row.day, '%Y-%m-%d').date())
+        counts = merged.setdefault(key, [0, 0])
+        counts[0] += row.image_count
+        counts[1] += row.high_stress_count or 0
+
+    table = OutbreakCount.__table__
+    conn.execute(table.delete())
+    if merged:
+        conn.execute(table.insert(), [
+            {'region_key': region, 'farm_location': location, 'crop_type': crop, 'pest_type': pest, 'day': day,
+             'image_count': image_count, 'high_stress_count': high_stress_count}
+            for (region, location, crop, pest, day), (image_count, high_stress_count) in merged.items()
+        ])
+    return len(merged)
+
+
+# ==================== Alerts ====================
+
+def region_alerts(farm_location, crop_type=None, today=None, window_days=ALERT_WINDOW_DAYS):
+    """
+    Pest activity around farm_location over the last window_days, from the
+    daily counters of the location's grid cell and its neighbours.
+    """
+    location = normalize_location(farm_location)
+    crop = normalize_crop(crop_type) if crop_type else None
+    key = region_key(location)
+    today = today or datetime.utcnow().date()
+    window_start = today - timedelta(days=window_days - 1)
+    baseline_start = window_start - timedelta(days=BASELINE_DAYS)
+
+    rows = db.session.query(
+        OutbreakCount.farm_location, OutbreakCount.crop_type, OutbreakCount.pest_type,
+        OutbreakCount.day, OutbreakCount.image_count, OutbreakCount.high_stress_count
+    ).filter(OutbreakCount.region_key.in_(neighbour_keys(key)), OutbreakCount.day >= baseline_start).all()
+
+    uploads = 0
+    high_stress = 0
+    pests = {}
+    for row in rows:
+        recent = row.day >= window_start
+        if recent:
+            uploads += row.image_count
+            high_stress += row.high_stress_count
+        if not row.pest_type:
+            continue
+        pest = pests.setdefault((row.pest_type, row.crop_type), {
+            'detections': 0, 'baseline_detections': 0, 'locations': set()
+        })
+        if recent:
+            pest['detections'] += row.image_count
+            pest['locations'].add(row.farm_location)
+        else:
+            pest['baseline_detections'] += row.image_count
+
+    alerts = []
+    for (pest_type, pest_crop), pest in pests.items():
+        if not pest['detections']:
+            continue
+        daily_rate = pest['detections'] / window_days
+        baseline_rate = pest['baseline_detections'] / BASELINE_DAYS
+        growth = round(daily_rate / baseline_rate, 2) if baseline_rate else None
+        if pest['detections'] >= ALERT_MIN_DETECTIONS and (growth is None or growth >= ALERT_GROWTH):
+            level = 'warning'
+        else:
+            level = 'watch'
+        alerts.append({
+            'pest_type': pest_type,
+            'crop_type': pest_crop,
+            'detections': pest['detections'],
+            'locations': sorted(pest['locations']),
+            'in_your_location': location in pest['locations'],
+            'same_crop': crop is not None and pest_crop == crop,
+            'daily_rate': round(daily_rate, 2),
+            'baseline_daily_rate': round(baseline_rate, 2),
+            'growth': growth,
+            'level': level
+        })
+    alerts.sort(key=lambda alert: (alert['level'] != 'warning', not alert['same_crop'], -alert['detections']))
+
+    return {
+        'farm_location': location,
+        'region_key': key,
+        'window_days': window_days,
+        'uploads': uploads,
+        'high_stress_uploads': high_stress,
+        'alerts': alerts
+    }
+
+
+def init_app(app):
+    """Register the insert listener (process-wide, for every session)"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
@@ -0,0 +1,92 @@
+# Keyset (cursor) pagination and column projection for per-user listing APIs
+import base64
+from datetime import datetime
+
+from sqlalchemy.orm import load_only
+
+from models import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor pointing just after (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_fields(model, fields_param=None, view=None):
+    """
+    Resolve the `fields=` and `view=` query parameters to a tuple of field names.
+    view=list drops the model's HEAVY_FIELDS; fields=a,b selects explicitly.
+    """
+    if fields_param:
+        fields = tuple(f.strip() for f in fields_param.split(',') if f.strip())
+        unknown = [f for f in fields if f not in model.SERIALIZED_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        return fields
+    if view == 'list':
+        return tuple(f for f in model.SERIALIZED_FIELDS if f not in model.HEAVY_FIELDS)
+    if view not in (None, 'full'):
+        raise ValueError(f"Unknown view '{view}'")
+    return model.SERIALIZED_FIELDS
+
+
+def parse_limit(limit_param, default=DEFAULT_PAGE_SIZE):
+    if limit_param is None:
+        return default
+    try:
+        limit = int(limit_param)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginate_user_rows(model, user_id, args, default_limit=DEFAULT_PAGE_SIZE):
+    """
+    Return (items, next_cursor) for one page of a user's rows, newest first.
+
+    Rows are ordered by (created_at, id) descending and the cursor is the last
+    row's key, so each page is an index range scan instead of an OFFSET.
+    Only the requested columns are loaded from SQLite.
+    """
+    fields = parse_fields(model, args.get('fields'), args.get('view'))
+    limit = parse_limit(args.get('limit'), default_limit)
+
+    query = model.query.filter(model.user_id == user_id)
+
+    cursor = args.get('cursor')
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            model.created_at < created_at,
+            db.and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    # The keyset columns are always needed to build the next cursor
+    columns = set(fields) | {'id', 'created_at'}
+    for name in fields:
+        columns.update(getattr(model, 'FIELD_DEPENDENCIES', {}).get(name, ()))
+    columns &= set(model.__table__.columns.keys())
+    query = query.options(load_only(*[getattr(model, name) for name in columns]))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return [row.to_dict(fields) for row in rows], next_cursor
@@ -0,0 +1,204 @@
+# Semantic cache for chatbot answers (exact + n-gram similarity lookup)
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    query = re.sub(r'[^\w\s]', ' ', query.lower())
+    return ' '.join(query.split())
+
+
+# Words that make a question lean on the conversation ("what about it?", "and for rice?")
+_FOLLOW_UP = re.compile(r'\b(?:it|its|that|this|these|those|they|them|their|same|above|previous|earlier|'
+                        r'again|else|instead)\b|^\s*(?:and|but|so|also|what about|how about)\b', re.IGNORECASE)
+
+
+def conversation_key(query, history=None):
+    """
+    '' when the answer does not depend on the conversation, otherwise a hash of
+    the summary and recent turns (chat_context.ChatContext). Standalone questions
+    share answers across conversations; follow-ups only match the same state.
+    """
+    if history is None or not (history.summary or history.turns) or not _FOLLOW_UP.search(query):
+        return ''
+    digest = hashlib.blake2b(digest_size=16)
+    for part in [history.summary, *(text for turn in history.turns for text in turn)]:
+        digest.update((part or '').encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def context_key(user_context, conversation=''):
+    """The (farm_location, crop_type, soil_type, conversation) tuple a cached answer is valid for"""
+    if not user_context:
+        return ('', '', '', conversation)
+    return tuple(normalize_query(user_context.get(field) or '')
+                 for field in ('farm_location', 'crop_type', 'soil_type')) + (conversation,)
+
+
+def embed(text, dim=1024):
+    """
+    Hashed bag of word unigrams and character trigrams, L2-normalized.
+    Cheap, deterministic and good enough to match rephrasings of the same question.
+    """
+    import numpy as np
+
+    vector = np.zeros(dim, dtype=np.float32)
+    features = text.split()
+    padded = f' {text} '
+    features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        vector[int.from_bytes(digest, 'little') % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Entry:
+    __slots__ = ('query', 'response', 'vector', 'created_at', 'cost_seconds')
+
+    def __init__(self, query, response, vector, cost_seconds):
+        self.query = query
+        self.response = response
+        self.vector = vector
+        self.created_at = time.time()
+        self.cost_seconds = cost_seconds
+
+
+class CacheHit:
+    def __init__(self, response, kind, similarity):
+        self.response = response
+        self.kind = kind  # 'exact' or 'similar'
+        self.similarity = similarity
+
+
+class ResponseCache:
+    """
+    In-process answer cache keyed on (user context, normalized query); a
+    follow-up question's key also includes its conversation (conversation_key).
+
+    Lookups try an exact match first, then cosine similarity against the
+    vectors cached for the same user context (one small matrix per context).
+    Entries expire after ttl_seconds; the least recently used entry is
+    evicted when max_entries is exceeded.
+    """
+
+    def __init__(self, max_entries=5000, ttl_seconds=86400, similarity_threshold=0.85, dim=1024):
+        self.enabled = True
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.dim = dim
+        self._entries = OrderedDict()  # (context, normalized query) -> _Entry
+        self._by_context = {}  # context -> {key: None}, insertion-ordered key set
+        self._index = {}  # context -> (keys, matrix), rebuilt lazily after changes
+        self._lock = threading.Lock()
+        self._stats = {'hits_exact': 0, 'hits_similar': 0, 'misses': 0,
+                       'evictions': 0, 'expirations': 0, 'saved_seconds': 0.0}
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CHAT_CACHE_ENABLED', self.enabled)
+        self.max_entries = app.config.get('CHAT_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl_seconds = app.config.get('CHAT_CACHE_TTL_SECONDS', self.ttl_seconds)
+        self.similarity_threshold = app.config.get('CHAT_CACHE_SIMILARITY', self.similarity_threshold)
+
+    def get(self, query, user_context=None, history=None):
+        """Return a CacheHit or None"""
+        if not self.enabled:
+            return None
+        context = context_key(user_context, conversation_key(query, history))
+        normalized = normalize_query(query)
+
+        with self._lock:
+            entry = self._live_entry((context, normalized))
+            if entry is not None:
+                return self._record_hit((context, normalized), entry, 'exact', 1.0)
+
+            keys, matrix = self._context_index(context)
+            if keys:
+                scores = matrix @ embed(normalized, self.dim)
+                best = int(scores.argmax())
+                if scores[best] >= self.similarity_threshold:
+                    entry = self._live_entry(keys[best])
+                    if entry is not None:
+                        return self._record_hit(keys[best], entry, 'similar', float(scores[best]))
+
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, query, response, user_context=None, cost_seconds=0.0, history=None):
+        """Cache an answer along with how long it took to generate"""
+        if not self.enabled:
+            return
+        context = context_key(user_context, conversation_key(query, history))
+        normalized = normalize_query(query)
+        entry = _Entry(normalized, response, embed(normalized, self.dim), cost_seconds)
+
+        with self._lock:
+            key = (context, normalized)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._by_context.setdefault(context, {})[key] = None
+            self._index.pop(context, None)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+                self._stats['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits_exact'] + stats['hits_similar'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits_exact'] + stats['hits_similar']) / lookups, 4) if lookups else 0.0
+        stats['saved_seconds'] = round(stats['saved_seconds'], 3)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+            self._index.clear()
+
+    # Callers hold self._lock for the helpers below
+
+    def _live_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry.created_at > self.ttl_seconds:
+            del self._entries[key]
+            self._forget(key)
+            self._stats['expirations'] += 1
+            return None
+        return entry
+
+    def _record_hit(self, key, entry, kind, similarity):
+        self._entries.move_to_end(key)
+        self._stats['hits_' + kind] += 1
+        self._stats['saved_seconds'] += entry.cost_seconds
+        return CacheHit(entry.response, kind, similarity)
+
+    def _forget(self, key):
+        keys = self._by_context.get(key[0])
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._by_context[key[0]]
+        self._index.pop(key[0], None)
+
+    def _context_index(self, context):
+        index = self._index.get(context)
+        if index is None:
+            import numpy as np
+            keys = list(self._by_context.get(context, ()))
+            matrix = (np.stack([self._entries[key].vector for key in keys])
+                      if keys else np.zeros((0, self.dim), dtype=np.float32))
+            index = self._index[context] = (keys, matrix)
+        return index
+
+
+response_cache = ResponseCache()
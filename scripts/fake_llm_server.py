@@ -0,0 +1,81 @@
+# Local fake LLM server for development and tests (no model, no network)
+#
+# Speaks the protocol expected by GEMMA_API_URL:
+#   POST /generate {"prompt": ..., "max_tokens": ..., "stream": true|false}
+#   stream=false -> {"response": "..."}
+#   stream=true  -> chunked newline-delimited JSON: {"token": "..."} ... {"done": true}
+#
+# Usage:
+#   python scripts/fake_llm_server.py --port 8009 --delay 0.05
+#   GEMMA_API_URL=http://127.0.0.1:8009/generate python app.py
+import argparse
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_answer(prompt, max_tokens):
+    """Deterministic answer built from the prompt's question line"""
+    match = re.search(r'User Question:\s*(.*)', prompt)
+    question = match.group(1).strip() if match else prompt.strip()[:80]
+    words = (f"Here is some advice about: {question}. "
+             "Check soil moisture before irrigating, scout the field twice a week "
+             "for pests, and follow the local agriculture office spray calendar.").split()
+    return [word + ' ' for word in words[:max_tokens]]
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so pooled clients can reuse connections
+    token_delay = 0.05
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        tokens = fake_answer(body.get('prompt', ''), int(body.get('max_tokens', 500)))
+
+        if not body.get('stream'):
+            time.sleep(self.token_delay * len(tokens))
+            payload = json.dumps({'response': ''.join(tokens).strip()}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for token in tokens:
+            time.sleep(self.token_delay)
+            self._write_chunk(json.dumps({'token': token}) + '\n')
+        self._write_chunk(json.dumps({'done': True}) + '\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+
+def make_server(host='127.0.0.1', port=0, delay=0.05):
+    """Create (not start) a fake LLM server; port=0 picks a free port"""
+    handler = type('ConfiguredFakeLLMHandler', (FakeLLMHandler,), {'token_delay': delay})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake streaming LLM server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8009)
+    parser.add_argument('--delay', type=float, default=0.05, help='Seconds between tokens')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.delay)
+    print(f"Fake LLM listening on http://{args.host}:{server.server_port}/generate")
+    server.serve_forever()
@@ -11,19 +11,24 @@ document.addEventListener('DOMContentLoaded', function() {
 
 async function checkAuthAndLoadData() {
     try {
-        // Load user details
-        const userResponse = await fetch(`${API_BASE}/api/user-details`);
-        if (userResponse.status === 401) {
+        // One request for the user, counts and recent items (precomputed per user)
+        const response = await fetch(`${API_BASE}/api/dashboard-summary`);
+        if (response.status === 401) {
             window.location.href = '/login';
             return;
         }
-        const user = await userResponse.json();
-        updateWelcomeMessage(user);
+        if (!response.ok) throw new Error('Failed to load dashboard summary');
+        const summary = await response.json();
+        updateWelcomeMessage(summary.user);
+        displayDashboardSummary(summary);
         
-        // Load all dashboard data
-        loadWeatherSuggestion();
-        loadDroneImages();
-        loadSoilReports();
+        // Today's advisory is included once generated; otherwise fetch (and generate) it
+        if (summary.weather) {
+            currentWeatherData = summary.weather;
+            displayWeatherSuggestion('en');
+        } else {
+            loadWeatherSuggestion();
+        }
     } catch (error) {
         console.error('Error loading dashboard:', error);
         showNotification('Error loading dashboard data', 'error');
@@ -63,6 +68,31 @@ async function handleLogout() {
     }
 }
 
+// ==================== Dashboard Summary ====================
+
+// Re-read the summary after an upload (counts and recent items changed)
+async function loadDashboardSummary() {
+    try {
+        const response = await fetch(`${API_BASE}/api/dashboard-summary`);
+        if (!response.ok) throw new Error('Failed to load dashboard summary');
+        
+        displayDashboardSummary(await response.json());
+    } catch (error) {
+        console.error('Error loading dashboard summary:', error);
+        showNotification('Error loading dashboard data', 'error');
+    }
+}
+
+function displayDashboardSummary(summary) {
+    document.getElementById('statImages').textContent = summary.drone_image_count;
+    document.getElementById('statReports').textContent = summary.soil_report_count;
+    document.getElementById('statPestAlerts').textContent = summary.pest_alert_count;
+    document.getElementById('statStress').textContent = summary.latest_stress_level || '-';
+    
+    displayDroneImages(summary.recent_images);
+    displaySoilReports(summary.recent_reports);
+}
+
 // ==================== Weather Suggestion ====================
 
 let currentWeatherData = {};
@@ -109,17 +139,9 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // ==================== Drone Images ====================
 
-async function loadDroneImages() {
-    try {
-        const response = await fetch(`${API_BASE}/api/drone-images`);
-        if (!response.ok) throw new Error('Failed to load images');
-        
-        const images = await response.json();
-        displayDroneImages(images);
-    } catch (error) {
-        console.error('Error loading images:', error);
-        document.getElementById('recentImages').innerHTML = '<div class="error">Error loading images</div>';
-    }
+// Cards use the small cached thumbnail; older uploads without one fall back to the original
+function imageCardSrc(image) {
+    return image.thumbnail_url ? `${API_BASE}${image.thumbnail_url}` : `${API_BASE}/${image.file_path}`;
 }
 
 function displayDroneImages(images) {
@@ -132,7 +154,7 @@ function displayDroneImages(images) {
     
     container.innerHTML = images.slice(0, 6).map(image => `
         <div class="image-card">
-            <img src="${API_BASE}/${image.file_path}" alt="${image.filename}" onerror="this.src='data:image/svg+xml,%3Csvg xmlns=\'http://www.w3.org/2000/svg\' width=\'200\' height=\'200\'%3E%3Crect fill=\'%23ddd\' width=\'200\' height=\'200\'/%3E%3Ctext fill=\'%23999\' font-family=\'sans-serif\' font-size=\'14\' dy=\'10.5\' font-weight=\'bold\' x=\'50%25\' y=\'50%25\' text-anchor=\'middle\'%3ENo Image%3C/text%3E%3C/svg%3E'">
+            <img src="${imageCardSrc(image)}" alt="${image.filename}" loading="lazy" onerror="this.src='data:image/svg+xml,%3Csvg xmlns=\'http://www.w3.org/2000/svg\' width=\'200\' height=\'200\'%3E%3Crect fill=\'%23ddd\' width=\'200\' height=\'200\'/%3E%3Ctext fill=\'%23999\' font-family=\'sans-serif\' font-size=\'14\' dy=\'10.5\' font-weight=\'bold\' x=\'50%25\' y=\'50%25\' text-anchor=\'middle\'%3ENo Image%3C/text%3E%3C/svg%3E'">
             <div class="image-info">
                 <h4>${image.filename}</h4>
                 <div class="image-stats">
@@ -146,6 +168,14 @@ function displayDroneImages(images) {
     `).join('');
 }
 
+// Grid of colored cells, one per image tile, laid out like the field
+function renderStressHeatmap(heatmap) {
+    const cells = heatmap.stress_level.map((row, r) => row.map((level, c) => `
+        <div class="heatmap-cell stress-${level.toLowerCase()}" title="${heatmap.green_percentage[r][c]}% green"></div>
+    `).join('')).join('');
+    return `<div class="stress-heatmap" style="grid-template-columns: repeat(${heatmap.cols}, 1fr)">${cells}</div>`;
+}
+
 function getStressBadgeClass(level) {
     if (level === 'Low') return 'badge-success';
     if (level === 'Medium') return 'badge-warning';
@@ -154,19 +184,6 @@ function getStressBadgeClass(level) {
 
 // ==================== Soil Reports ====================
 
-async function loadSoilReports() {
-    try {
-        const response = await fetch(`${API_BASE}/api/soil-reports`);
-        if (!response.ok) throw new Error('Failed to load reports');
-        
-        const reports = await response.json();
-        displaySoilReports(reports);
-    } catch (error) {
-        console.error('Error loading reports:', error);
-        document.getElementById('recentReports').innerHTML = '<div class="error">Error loading reports</div>';
-    }
-}
-
 function displaySoilReports(reports) {
     const container = document.getElementById('recentReports');
     
@@ -192,6 +209,39 @@ function displaySoilReports(reports) {
     `).join('');
 }
 
+// ==================== Background Jobs ====================
+
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Upload endpoints return a job id; poll until the job finishes and return its result
+async function waitForJob(jobData) {
+    while (true) {
+        const statusResponse = await fetch(`${API_BASE}${jobData.status_url}`);
+        const job = await statusResponse.json();
+        if (!statusResponse.ok) throw new Error(job.error || 'Failed to check job status');
+        
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            const resultResponse = await fetch(`${API_BASE}${jobData.result_url}`);
+            return { response: resultResponse, data: await resultResponse.json() };
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
+
+async function submitAnalysisJob(url, formData) {
+    const response = await fetch(url, {
+        method: 'POST',
+        body: formData
+    });
+    const data = await response.json();
+    
+    if (response.status === 202 && data.job_id) {
+        return waitForJob(data);
+    }
+    return { response, data };
+}
+
 // ==================== Image Upload ====================
 
 function openImageUpload() {
@@ -214,12 +264,7 @@ async function handleImageUpload(event) {
     resultDiv.innerHTML = '<div class="loading">Analyzing image...</div>';
     
     try {
-        const response = await fetch(`${API_BASE}/api/analyze-image`, {
-            method: 'POST',
-            body: formData
-        });
-        
-        const data = await response.json();
+        const { response, data } = await submitAnalysisJob(`${API_BASE}/api/analyze-image`, formData);
         
         if (response.ok && data.success) {
             resultDiv.innerHTML = `
@@ -230,12 +275,13 @@ async function handleImageUpload(event) {
                         ${data.analysis.pest_detected ? '<p><strong>Pest Status:</strong> <span class="badge badge-danger">Pest Detected</span></p>' : '<p><strong>Pest Status:</strong> <span class="badge badge-success">No Pests</span></p>'}
                         ${data.analysis.nutrient_deficiency ? `<p><strong>Issue:</strong> ${data.analysis.nutrient_deficiency}</p>` : ''}
                         ${data.analysis.image_health_score ? `<p><strong>Health Score:</strong> ${data.analysis.image_health_score}%</p>` : ''}
+                        ${data.analysis.stress_heatmap ? `<p><strong>Field Stress Map:</strong></p>${renderStressHeatmap(data.analysis.stress_heatmap)}` : ''}
                     </div>
                 </div>
             `;
             
-            // Reload images list
-            loadDroneImages();
+            // Reload counts and the images list
+            loadDashboardSummary();
             
             // Reset form after delay
             setTimeout(() => {
@@ -272,12 +318,7 @@ async function handleSoilUpload(event) {
     resultDiv.innerHTML = '<div class="loading">Processing soil report...<br>Extracting text, analyzing with AI, and translating...</div>';
     
     try {
-        const response = await fetch(`${API_BASE}/api/analyze-soil`, {
-            method: 'POST',
-            body: formData
-        });
-        
-        const data = await response.json();
+        const { response, data } = await submitAnalysisJob(`${API_BASE}/api/analyze-soil`, formData);
         
         if (response.ok && data.success) {
             resultDiv.innerHTML = `
@@ -295,8 +336,8 @@ async function handleSoilUpload(event) {
                 </div>
             `;
             
-            // Reload reports list
-            loadSoilReports();
+            // Reload counts and the reports list
+            loadDashboardSummary();
         } else {
             resultDiv.innerHTML = `<div class="error-message">Error: ${data.error || 'Analysis failed'}</div>`;
         }
@@ -386,7 +427,7 @@ async function handleChatSubmit(event) {
     messagesDiv.scrollTop = messagesDiv.scrollHeight;
     
     try {
-        const response = await fetch(`${API_BASE}/api/chat`, {
+        const response = await fetch(`${API_BASE}/api/chat/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -394,33 +435,37 @@ async function handleChatSubmit(event) {
             body: JSON.stringify({ message: message })
         });
         
-        const data = await response.json();
+        if (!response.ok || !response.body) {
+            const data = await response.json();
+            throw new Error(data.error || 'Failed to get response');
+        }
         
-        // Remove typing indicator
-        document.getElementById(typingId).remove();
+        // Replace the typing indicator with the message bubble the tokens stream into
+        const typingElement = document.getElementById(typingId);
+        const contentDiv = typingElement.querySelector('.message-content');
+        typingElement.removeAttribute('id');
+        contentDiv.classList.remove('typing');
+        contentDiv.textContent = '';
         
-        if (response.ok && data.success) {
-            messagesDiv.innerHTML += `
-                <div class="chat-message bot-message">
-                    <div class="message-content">${escapeHtml(data.response)}</div>
-                </div>
-            `;
-            messagesDiv.scrollTop = messagesDiv.scrollHeight;
-            
-            // Reload chat history
-            loadChatHistory();
-        } else {
-            messagesDiv.innerHTML += `
-                <div class="chat-message bot-message">
-                    <div class="message-content error">Error: ${data.error || 'Failed to get response'}</div>
-                </div>
-            `;
-        }
+        await readChatStream(response, {
+            token: data => {
+                contentDiv.textContent += data.token;
+                messagesDiv.scrollTop = messagesDiv.scrollHeight;
+            },
+            done: data => {
+                contentDiv.textContent = data.response;
+            },
+            error: data => {
+                contentDiv.classList.add('error');
+                contentDiv.textContent = `Error: ${data.error}`;
+            }
+        });
     } catch (error) {
-        document.getElementById(typingId).remove();
+        const typingElement = document.getElementById(typingId);
+        if (typingElement) typingElement.remove();
         messagesDiv.innerHTML += `
             <div class="chat-message bot-message">
-                <div class="message-content error">Error: ${error.message}</div>
+                <div class="message-content error">Error: ${escapeHtml(error.message)}</div>
             </div>
         `;
     }
@@ -429,6 +474,33 @@ async function handleChatSubmit(event) {
     input.focus();
 }
 
+// Parse a Server-Sent Events response body and dispatch each event to its handler
+async function readChatStream(response, handlers) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'token';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) eventName = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (data && handlers[eventName]) handlers[eventName](JSON.parse(data));
+        }
+    }
+}
+
 // Close modals when clicking outside
 window.onclick = function(event) {
     const modals = document.querySelectorAll('.modal');
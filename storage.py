@@ -0,0 +1,62 @@
+# Content-addressed storage for uploaded files
+#
+# Files are stored as <root>/<h[:2]>/<h[2:4]>/<sha256><ext>. Uploads are streamed
+# to a temp file in the same root while hashing, then atomically renamed into
+# place, so identical uploads share one file and concurrent uploads never clobber
+# each other.
+import hashlib
+import io
+import os
+import tempfile
+from collections import namedtuple
+
+from werkzeug.utils import secure_filename
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+StoredFile = namedtuple('StoredFile', ['path', 'content_hash', 'size'])
+
+
+def content_path(root, content_hash, ext=''):
+    """Sharded path of a stored file (two directory levels keep directories small)"""
+    return os.path.join(root, content_hash[:2], content_hash[2:4], content_hash + ext)
+
+
+def store_stream(stream, filename, root):
+    """Stream a file-like object into content-addressed storage; returns a StoredFile"""
+    ext = os.path.splitext(secure_filename(filename))[1].lower()
+    tmp_dir = os.path.join(root, '.tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=ext)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        content_hash = digest.hexdigest()
+        path = content_path(root, content_hash, ext)
+        if os.path.exists(path):
+            # Identical bytes are already stored
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return StoredFile(path, content_hash, size)
+
+
+def store_bytes(data, filename, root):
+    """Store an in-memory file (e.g. a frame extracted from a zip)"""
+    return store_stream(io.BytesIO(data), filename, root)
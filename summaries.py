@@ -0,0 +1,148 @@
+# Per-user dashboard summaries, maintained incrementally on insert
+#
+# An after_flush listener folds every new DroneImage, SoilReport and ChatHistory
+# row into its owner's UserSummary row, using the flush's own connection, so the
+# summary commits (or rolls back) together with the rows it counts. The
+# dashboard then reads one row by primary key instead of running list queries.
+#
+# Rows inserted with Core statements (e.g. benchmarks.seed) bypass the listener;
+# run rebuild_summaries() or `flask rebuild-summaries` afterwards.
+import json
+from datetime import datetime
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from models import User, DroneImage, SoilReport, ChatHistory, UserSummary, serialize_fields
+from thumbnails import derivative_url
+
+PREVIEW_CHARS = 200  # Long texts are cut to this in the summary's item lists
+
+# Columns each item is built from. The builders accept ORM instances (listener)
+# and Core rows (rebuild), and only name columns that exist from migration 6 on,
+# so the backfill keeps working as the models grow.
+IMAGE_ITEM_COLUMNS = ('id', 'filename', 'file_path', 'content_hash', 'crop_stress_level', 'pest_detected',
+                      'pest_type', 'nutrient_deficiency', 'created_at')
+REPORT_ITEM_COLUMNS = ('id', 'filename', 'analysis_summary', 'recommendations', 'created_at')
+CHAT_ITEM_COLUMNS = ('id', 'message', 'response', 'created_at')
+
+
+def _preview(text):
+    if text and len(text) > PREVIEW_CHARS:
+        return text[:PREVIEW_CHARS]
+    return text
+
+
+def _image_item(image):
+    item = serialize_fields(image, [c for c in IMAGE_ITEM_COLUMNS if c != 'content_hash'])
+    item['thumbnail_url'] = derivative_url(image.content_hash, 'thumb') if image.content_hash else None
+    item['preview_url'] = derivative_url(image.content_hash, 'medium') if image.content_hash else None
+    return item
+
+
+def _report_item(report):
+    item = serialize_fields(report, REPORT_ITEM_COLUMNS)
+    item['analysis_summary'] = _preview(item['analysis_summary'])
+    item['recommendations'] = _preview(item['recommendations'])
+    return item
+
+
+def _chat_item(chat):
+    item = serialize_fields(chat, CHAT_ITEM_COLUMNS)
+    item['response'] = _preview(item['response'])
+    return item
+
+
+# model -> (count column, recent items column, item builder, item source columns, items kept)
+SOURCES = {
+    DroneImage: ('drone_image_count', 'recent_images', _image_item, IMAGE_ITEM_COLUMNS, 6),
+    SoilReport: ('soil_report_count', 'recent_reports', _report_item, REPORT_ITEM_COLUMNS, 5),
+    ChatHistory: ('chat_count', 'recent_chats', _chat_item, CHAT_ITEM_COLUMNS, 5),
+}
+
+
+def _merge_items(existing_json, new_items, keep):
+    """Newest-first list of at most `keep` items (ISO timestamps sort chronologically)"""
+    items = new_items + json.loads(existing_json or '[]')
+    items.sort(key=lambda item: (item['created_at'] or '', item['id']), reverse=True)
+    return json.dumps(items[:keep])
+
+
+def apply_inserts(conn, user_id, rows_by_model):
+    """Fold newly inserted rows ({model: [instances]}) into the user's summary row"""
+    table = UserSummary.__table__
+    current = conn.execute(select(table).where(table.c.user_id == user_id)).mappings().first()
+    values = dict(current) if current else {
+        'user_id': user_id, 'drone_image_count': 0, 'soil_report_count': 0, 'chat_count': 0,
+        'pest_alert_count': 0, 'latest_stress_level': None,
+        'recent_images': None, 'recent_reports': None, 'recent_chats': None
+    }
+
+    for model, rows in rows_by_model.items():
+        count_column, items_column, build_item, _, keep = SOURCES[model]
+        values[count_column] += len(rows)
+        values[items_column] = _merge_items(values[items_column], [build_item(row) for row in rows], keep)
+
+    images = rows_by_model.get(DroneImage, ())
+    values['pest_alert_count'] += sum(1 for image in images if image.pest_detected)
+    if images:
+        newest = json.loads(values['recent_images'])
+        values['latest_stress_level'] = newest[0]['crop_stress_level'] if newest else None
+    values['updated_at'] = datetime.utcnow()
+
+    if current:
+        conn.execute(table.update().where(table.c.user_id == user_id).values(values))
+    else:
+        conn.execute(table.insert().values(values))
+
+
+def _after_flush(session, flush_context):
+    rows_by_user = {}
+    for obj in session.new:
+        if type(obj) in SOURCES and obj.user_id is not None:
+            rows_by_user.setdefault(obj.user_id, {}).setdefault(type(obj), []).append(obj)
+    if not rows_by_user:
+        return
+
+    conn = session.connection()
+    for user_id, rows_by_model in rows_by_user.items():
+        apply_inserts(conn, user_id, rows_by_model)
+
+
+def rebuild_summaries(conn, user_ids=None):
+    """
+    Recompute summary rows from the source tables (all users, or just user_ids).
+    Core selects of the item columns only, so this also runs as a migration
+    backfill against older table layouts.
+    """
+    table = UserSummary.__table__
+    if user_ids is None:
+        user_ids = conn.execute(select(User.__table__.c.id)).scalars().all()
+
+    images = DroneImage.__table__
+    for user_id in user_ids:
+        values = {'user_id': user_id, 'updated_at': datetime.utcnow()}
+        for model, (count_column, items_column, build_item, columns, keep) in SOURCES.items():
+            source = model.__table__
+            values[count_column] = conn.execute(
+                select(func.count()).select_from(source).where(source.c.user_id == user_id)).scalar()
+            recent = conn.execute(
+                select(*[source.c[name] for name in columns]).where(source.c.user_id == user_id)
+                .order_by(source.c.created_at.desc(), source.c.id.desc()).limit(keep)
+            ).all()
+            values[items_column] = json.dumps([build_item(row) for row in recent])
+        values['pest_alert_count'] = conn.execute(
+            select(func.count()).select_from(images)
+            .where(images.c.user_id == user_id, images.c.pest_detected.is_(True))).scalar()
+        newest = json.loads(values['recent_images'])
+        values['latest_stress_level'] = newest[0]['crop_stress_level'] if newest else None
+
+        conn.execute(table.delete().where(table.c.user_id == user_id))
+        conn.execute(table.insert().values(values))
+    return len(user_ids)
+
+
+def init_app(app):
+    """Register the insert listener (process-wide, for every session)"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
@@ -0,0 +1,36 @@
+# The application modules live at the repository root
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The Flask app on a throwaway SQLite database, with one registered user"""
+    from benchmarks.common import load_app
+
+    app = load_app(f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}")
+    app.config['TESTING'] = True
+    from models import db, User
+    with app.app_context():
+        if not User.query.filter_by(username='tester').first():
+            db.session.add(User(username='tester', email='tester@example.com', password_hash='x',
+                                farm_location='Pune', crop_type='Wheat', soil_type='Black'))
+            db.session.commit()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as the test user"""
+    from models import User
+
+    client = app.test_client()
+    with app.app_context():
+        user_id = User.query.filter_by(username='tester').one().id
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client
@@ -0,0 +1,91 @@
+import io
+import zipfile
+
+import pytest
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def zip_reads(monkeypatch):
+    """Names of the archive members that get decompressed"""
+    reads = []
+    original_read = zipfile.ZipFile.read
+
+    def read(self, name, pwd=None):
+        reads.append(name)
+        return original_read(self, name, pwd)
+
+    monkeypatch.setattr(zipfile.ZipFile, 'read', read)
+    return reads
+
+
+def upload(client, archive):
+    return client.post('/api/analyze-images-batch', data={'archive': (archive, 'flight.zip')},
+                       content_type='multipart/form-data')
+
+
+def test_oversized_member_is_rejected_before_decompression(app, client, monkeypatch, zip_reads):
+    monkeypatch.setitem(app.config, 'BATCH_MAX_FRAME_BYTES', 1024 * 1024)
+
+    # ~10 KB compressed, 64 MB uncompressed
+    response = upload(client, make_zip([('frame.jpg', b'\0' * (64 * 1024 * 1024))]))
+
+    assert response.status_code == 400
+    assert 'larger than 1 MB' in response.get_json()['error']
+    assert zip_reads == []
+
+
+def test_frame_count_limit_stops_reading(app, client, monkeypatch, zip_reads):
+    monkeypatch.setitem(app.config, 'BATCH_MAX_FRAMES', 3)
+
+    response = upload(client, make_zip([(f'frame_{i}.jpg', b'x') for i in range(10)]))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Too many frames (max 3)'
+    assert len(zip_reads) == 3
+
+
+def test_total_size_limit(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'BATCH_MAX_TOTAL_BYTES', 1024 * 1024)
+
+    response = upload(client, make_zip([(f'frame_{i}.jpg', b'\0' * (600 * 1024)) for i in range(2)]))
+
+    assert response.status_code == 400
+    assert 'in total' in response.get_json()['error']
+
+
+def test_batch_body_may_exceed_single_upload_limit(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'BATCH_MAX_TOTAL_BYTES', 1024 * 1024)
+    frame = b'\0' * (17 * 1024 * 1024)
+    assert len(frame) > app.config['MAX_CONTENT_LENGTH']
+
+    response = client.post('/api/analyze-images-batch', data={'files': (io.BytesIO(frame), 'frame.jpg')},
+                           content_type='multipart/form-data')
+
+    # The handler ran and applied its own limits instead of a 413 from MAX_CONTENT_LENGTH
+    assert response.status_code == 400
+    assert 'in total' in response.get_json()['error']
+
+
+def test_batch_upload_limit(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'BATCH_MAX_UPLOAD_BYTES', 1024 * 1024)
+
+    response = upload(client, io.BytesIO(b'\0' * (2 * 1024 * 1024)))
+
+    assert response.status_code == 413
+
+
+def test_single_uploads_keep_max_content_length(app, client):
+    response = client.post('/api/analyze-image',
+                           data={'file': (io.BytesIO(b'\0' * (17 * 1024 * 1024)), 'field.jpg')},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 413
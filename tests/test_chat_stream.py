@@ -0,0 +1,63 @@
+import json
+import threading
+
+import pytest
+
+from llm_client import llm_client
+from scripts.fake_llm_server import make_server
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """The fake streaming LLM server, with llm_client pointed at it"""
+    server = make_server('127.0.0.1', 0, delay=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(llm_client, 'endpoint', f'http://127.0.0.1:{server.server_port}/generate')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read_events(response):
+    """(event, data) pairs from a text/event-stream body"""
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+def test_chat_stream_sends_tokens_then_done(app, client, fake_llm):
+    from app import write_batcher
+    from models import ChatHistory
+
+    question = 'How deep should I plough before sowing gram?'
+    response = client.post('/api/chat/stream', json={'message': question})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = read_events(response)
+    tokens = [data['token'] for event, data in events if event == 'message']
+    assert len(tokens) > 3
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['response'] == ''.join(tokens).strip()
+    assert question in events[-1][1]['response']
+
+    write_batcher.flush()
+    with app.app_context():
+        row = ChatHistory.query.filter_by(message=question).one()
+        assert row.response == events[-1][1]['response']
+
+
+def test_chat_stream_reports_context_errors_as_events(app, client, monkeypatch):
+    import app as app_module
+
+    def broken_context(user_id):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(app_module, 'load_chat_context', broken_context)
+
+    response = client.post('/api/chat/stream', json={'message': 'Is it going to rain?'})
+
+    assert response.status_code == 200
+    assert read_events(response) == [('error', {'error': 'Chat error: database is locked'})]
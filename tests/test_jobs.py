@@ -0,0 +1,81 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def stopped_queue(app):
+    """The app's job queue with its dispatcher paused, so test jobs are not claimed"""
+    from app import job_queue
+
+    job_queue.stop()
+    yield job_queue
+    with app.app_context():
+        from models import db, Job
+        Job.query.filter(Job.id.like('recover-%')).delete(synchronize_session=False)
+        db.session.commit()
+    job_queue.start()
+
+
+def test_first_request_starts_the_queue(app, client):
+    from app import job_queue
+
+    client.get('/login')
+
+    assert job_queue.running
+
+
+def test_recover_requeues_abandoned_jobs_until_attempts_run_out(app, stopped_queue):
+    from models import db, Job
+
+    job_queue = stopped_queue
+
+    stale = datetime.utcnow() - timedelta(seconds=job_queue.lease_seconds + 60)
+    with app.app_context():
+        for job_id, attempts in (('recover-retry', 1), ('recover-exhausted', 3)):
+            db.session.add(Job(id=job_id, job_type='weather_prewarm', status='running', payload='{}',
+                               attempts=attempts, max_attempts=3, locked_at=stale,
+                               run_after=datetime.utcnow() + timedelta(days=1)))
+        db.session.add(Job(id='recover-live', job_type='weather_prewarm', status='running', payload='{}',
+                           attempts=1, max_attempts=3, locked_at=datetime.utcnow()))
+        db.session.commit()
+
+        assert job_queue.recover() == 1
+
+        db.session.expire_all()
+        assert db.session.get(Job, 'recover-retry').status == 'queued'
+        exhausted = db.session.get(Job, 'recover-exhausted')
+        assert exhausted.status == 'failed'
+        assert exhausted.error
+        assert db.session.get(Job, 'recover-live').status == 'running'
+
+
+def test_running_job_keeps_its_lease(app, stopped_queue):
+    from jobs import JobQueue, job_handler
+    from models import db, Job
+
+    runs = []
+
+    @job_handler('test_slow')
+    def slow(payload):
+        runs.append(payload)
+        time.sleep(1.5)
+        return {'ok': True}
+
+    # Lease far shorter than the job, so without renewal it would be recovered and run again
+    queue = JobQueue(app)
+    queue.lease_seconds = 0.5
+    queue.poll_interval = 0.05
+    with app.app_context():
+        queue.enqueue('test_slow', {}, job_id='recover-slow')
+        deadline = time.monotonic() + 10
+        while db.session.get(Job, 'recover-slow').status != 'succeeded' and time.monotonic() < deadline:
+            db.session.expire_all()
+            time.sleep(0.05)
+        queue.stop()
+
+        job = db.session.get(Job, 'recover-slow')
+        assert job.status == 'succeeded'
+        assert job.attempts == 1
+    assert len(runs) == 1
@@ -0,0 +1,69 @@
+import pytest
+import requests
+
+from llm_client import LLMClient, LLMError
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Client Error')
+
+    def json(self):
+        return self.body
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def post(self, *args, **kwargs):
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def client():
+    client = LLMClient(endpoint='http://llm.test/generate')
+    client.backoff_base = 0
+    return client
+
+
+def _free_slots(client):
+    acquired = 0
+    while client._slots.acquire(blocking=False):
+        acquired += 1
+    for _ in range(acquired):
+        client._slots.release()
+    return acquired
+
+
+@pytest.mark.parametrize('responses', [
+    [FakeResponse(400)],
+    [FakeResponse(503), FakeResponse(404)],
+    [FakeResponse(200, {'unexpected': 'shape'})],
+])
+def test_failed_calls_close_every_response(client, responses):
+    client._session = FakeSession(*responses)
+    slots = _free_slots(client)
+
+    with pytest.raises(LLMError):
+        client.generate('hello')
+
+    assert all(response.closed for response in responses)
+    assert _free_slots(client) == slots
+
+
+def test_successful_call_closes_the_response(client):
+    response = FakeResponse(200, {'response': 'hi'})
+    client._session = FakeSession(response)
+
+    assert client.generate('hello') == 'hi'
+    assert response.closed
@@ -0,0 +1,134 @@
+import json
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+
+import migrations
+
+# Schema created by the original app (db.create_all() before versioned migrations), user_version 0
+LEGACY_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, email VARCHAR(120) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL, farmer_name VARCHAR(100), farm_location VARCHAR(200),
+    crop_type VARCHAR(100), soil_type VARCHAR(100), created_at DATETIME,
+    PRIMARY KEY (id), UNIQUE (username), UNIQUE (email)
+);
+CREATE TABLE drone_images (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, filename VARCHAR(255) NOT NULL,
+    file_path VARCHAR(500) NOT NULL, analysis_result TEXT, crop_stress_level VARCHAR(50),
+    pest_detected BOOLEAN, pest_type VARCHAR(100), nutrient_deficiency VARCHAR(200), created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE TABLE soil_reports (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, filename VARCHAR(255) NOT NULL,
+    file_path VARCHAR(500) NOT NULL, ocr_text TEXT, analysis_summary TEXT, analysis_marathi TEXT,
+    analysis_hindi TEXT, nutrient_levels TEXT, recommendations TEXT, recommendations_marathi TEXT,
+    recommendations_hindi TEXT, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE TABLE weather_suggestions (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, date DATE, suggestion_text TEXT,
+    suggestion_marathi TEXT, suggestion_hindi TEXT, created_at DATETIME,
+    PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE TABLE chat_history (
+    id INTEGER NOT NULL, user_id INTEGER NOT NULL, message TEXT NOT NULL, response TEXT NOT NULL,
+    created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+"""
+
+ANALYSIS = {
+    'green_percentage': 42.5, 'image_health_score': 42.5, 'crop_stress_level': 'Medium',
+    'stress_heatmap': {'rows': 2, 'cols': 2, 'green_percentage': [[40.0, 45.0], [50.0, 35.0]]}
+}
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    path = tmp_path / 'legacy.db'
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO users VALUES (1, 'farmer', 'farmer@example.com', 'x', 'Farmer', "
+                 "'Pune, Maharashtra', 'Wheat', 'Black', '2026-01-01 00:00:00')")
+    conn.execute("INSERT INTO drone_images VALUES (1, 1, 'field.jpg', 'static/uploads/images/field.jpg', ?, "
+                 "'Medium', 1, 'aphid', NULL, '2026-02-01 08:00:00')", (json.dumps(ANALYSIS),))
+    conn.execute("INSERT INTO soil_reports VALUES (1, 1, 'card.jpg', 'static/uploads/soil-reports/card.jpg', "
+                 "'pH : 7.2', 'Summary', NULL, NULL, NULL, 'Add compost', NULL, NULL, '2026-02-02 08:00:00')")
+    conn.execute("INSERT INTO chat_history VALUES (1, 1, 'When to irrigate?', 'Early morning.', "
+                 "'2026-02-03 08:00:00')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_legacy_database_upgrades_to_latest(legacy_db):
+    engine = create_engine(f'sqlite:///{legacy_db}')
+    latest = migrations.MIGRATIONS[-1][0]
+
+    assert migrations.upgrade(engine) == [version for version, _, _ in migrations.MIGRATIONS]
+
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == latest
+        summary = conn.exec_driver_sql(
+            'SELECT drone_image_count, soil_report_count, chat_count, pest_alert_count, recent_images '
+            'FROM user_summaries WHERE user_id = 1').one()
+        assert summary[:4] == (1, 1, 1, 1)
+        assert json.loads(summary[4])[0]['filename'] == 'field.jpg'
+        assert conn.exec_driver_sql('SELECT green_percentage, vegetation_grid IS NOT NULL '
+                                    'FROM drone_images').one() == (42.5, 1)
+        assert conn.exec_driver_sql("SELECT value FROM soil_nutrients WHERE nutrient = 'ph'").scalar() == 7.2
+        assert conn.exec_driver_sql('SELECT SUM(image_count) FROM outbreak_counts').scalar() == 1
+
+    # Already current: nothing left to apply
+    assert migrations.upgrade(engine) == []
+
+
+def test_fresh_database_upgrades_to_latest(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+
+    assert migrations.upgrade(engine) == [version for version, _, _ in migrations.MIGRATIONS]
+
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == migrations.MIGRATIONS[-1][0]
+        indexes = set(conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+        assert {'ix_drone_images_user_created_health', 'ix_chat_history_user_created',
+                'uq_weather_suggestions_user_date'} <= indexes
+        columns = {row[1] for row in conn.exec_driver_sql('PRAGMA table_info(drone_images)')}
+        assert {'content_hash', 'green_percentage', 'vegetation_grid'} <= columns
+
+
+def test_failed_migration_rolls_back(legacy_db, monkeypatch):
+    engine = create_engine(f'sqlite:///{legacy_db}')
+    migrations.upgrade(engine)
+    latest = migrations.MIGRATIONS[-1][0]
+
+    def broken(conn):
+        conn.exec_driver_sql('CREATE TABLE half_done (id INTEGER)')
+        conn.exec_driver_sql("UPDATE users SET farmer_name = 'changed'")
+        raise RuntimeError('migration failed')
+
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [(latest + 1, 'broken', broken)])
+    with pytest.raises(RuntimeError):
+        migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == latest
+        assert conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE name = 'half_done'").first() is None
+        assert conn.exec_driver_sql('SELECT farmer_name FROM users').scalar() == 'Farmer'
+
+
+def test_failed_legacy_upgrade_keeps_earlier_migrations(legacy_db, monkeypatch):
+    engine = create_engine(f'sqlite:///{legacy_db}')
+
+    def broken(conn):
+        raise RuntimeError('migration failed')
+
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS[:2] + [(3, 'broken', broken)])
+    with pytest.raises(RuntimeError):
+        migrations.upgrade(engine)
+
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == 2
+        assert conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE name = 'ix_drone_images_user_created'").first() is not None
@@ -0,0 +1,34 @@
+import json
+import os
+
+from model_registry import ModelRegistry
+
+
+def test_labels_are_cached_and_reloaded_with_the_model(tmp_path, monkeypatch):
+    model_path = tmp_path / 'pest_detector.h5'
+    labels_path = tmp_path / 'pest_detector.labels.json'
+    model_path.write_bytes(b'weights')
+    labels_path.write_text(json.dumps(['healthy', 'aphid']))
+    registry = ModelRegistry()
+    registry.reload_check_seconds = 0
+    registry.register('pest_detector', str(model_path), loader=lambda path: object())
+
+    reads = []
+    original_open = open
+
+    def counting_open(path, *args, **kwargs):
+        reads.append(path)
+        return original_open(path, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', counting_open)
+    assert registry.labels('pest_detector') == ['healthy', 'aphid']
+    assert registry.labels('pest_detector') == ['healthy', 'aphid']
+    assert reads == [str(labels_path)]
+
+    # A new deployment replaces the model file and its labels
+    labels_path.write_text(json.dumps(['healthy', 'aphid', 'armyworm']))
+    stat = model_path.stat()
+    os.utime(model_path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert registry.labels('pest_detector') == ['healthy', 'aphid', 'armyworm']
+    assert len(reads) == 2
@@ -0,0 +1,72 @@
+from nutrients import parse_nutrients
+
+# OCR text of a Soil Health Card: serial numbers, sample details and a parameter table
+SOIL_HEALTH_CARD = """GOVERNMENT OF MAHARASHTRA
+SOIL HEALTH CARD
+Soil Sample Number: MH/PUN/2024/1187    Date of Sample Collection: 12/06/2024
+Farmer Name: R. Patil    Survey No. 214/2B    Khasra No. 7    Area: 1.5 ha
+S. No. 1    Parameter    Test Value    Unit    Rating
+1  pH  7.8    Moderately alkaline
+2  EC  0.42  dS/m  Normal
+3  Organic Carbon (OC)  0.38  %  Low
+4  Available Nitrogen (N)  188  kg/ha  Low
+5  Available Phosphorus (P)  14.2  kg/ha  Medium
+6  Available Potassium (K)  356  kg/ha  High
+7  Available Sulphur (S)  12  ppm  Medium
+8  Available Zinc (Zn)  0.64  ppm  Sufficient
+9  Available Boron (B)  0.45  ppm  Sufficient
+"""
+
+
+def test_soil_health_card_header_is_not_read_as_readings():
+    readings = parse_nutrients(SOIL_HEALTH_CARD)
+
+    assert readings['sulphur'] == {'value': 12.0, 'unit': 'ppm'}
+    assert readings['nitrogen'] == {'value': 188.0, 'unit': 'kg/ha'}
+    assert readings['phosphorus'] == {'value': 14.2, 'unit': 'kg/ha'}
+    assert readings['potassium'] == {'value': 356.0, 'unit': 'kg/ha'}
+    assert readings['boron'] == {'value': 0.45, 'unit': 'ppm'}
+    assert readings['ph'] == {'value': 7.8, 'unit': None}
+    assert readings['ec'] == {'value': 0.42, 'unit': 'dS/m'}
+    assert readings['organic_carbon'] == {'value': 0.38, 'unit': '%'}
+    assert readings['zinc'] == {'value': 0.64, 'unit': 'ppm'}
+
+
+def test_symbol_labels_are_used_without_names():
+    readings = parse_nutrients("N : 245 kg/ha\nAvailable (P) 18\nK 310\nS. No. 4")
+
+    assert readings['nitrogen'] == {'value': 245.0, 'unit': 'kg/ha'}
+    assert readings['phosphorus'] == {'value': 18.0, 'unit': 'kg/ha'}
+    assert readings['potassium'] == {'value': 310.0, 'unit': 'kg/ha'}
+    assert 'sulphur' not in readings
+
+
+def test_named_reading_wins_over_earlier_symbol():
+    readings = parse_nutrients("S : 3\nSulphur (S) 12 ppm")
+
+    assert readings['sulphur'] == {'value': 12.0, 'unit': 'ppm'}
+
+
+def test_oxide_formulas_are_part_of_the_label():
+    readings = parse_nutrients("Available Phosphorus (P2O5) 14.2 kg/ha\nPotassium (K2O) 356")
+
+    assert readings['phosphorus'] == {'value': 14.2, 'unit': 'kg/ha'}
+    assert readings['potassium'] == {'value': 356.0, 'unit': 'kg/ha'}
+
+
+def test_oxide_with_as_and_unit_before_the_value():
+    readings = parse_nutrients("Phosphorus as P2O5 kg/ha : 30\nPotash as K2O kg/ha : 280")
+
+    assert readings['phosphorus'] == {'value': 30.0, 'unit': 'kg/ha'}
+    assert readings['potassium'] == {'value': 280.0, 'unit': 'kg/ha'}
+
+
+def test_oxide_label_without_a_value_is_skipped():
+    assert 'phosphorus' not in parse_nutrients("Available Phosphorus (P2O5)    Not tested")
+
+
+def test_iron_needs_a_whole_word():
+    readings = parse_nutrients("Environment score 7\nIron (Fe) 4.5 ppm")
+
+    assert readings['iron'] == {'value': 4.5, 'unit': 'ppm'}
+    assert 'iron' not in parse_nutrients("Environment score 7")
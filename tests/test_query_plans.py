@@ -0,0 +1,7 @@
+import migrations
+
+
+def test_hot_queries_use_their_indexes(app):
+    """A dropped, renamed or shadowed index fails here rather than in production"""
+    with app.app_context():
+        assert migrations.check_query_plans() == []
@@ -0,0 +1,45 @@
+from chat_context import ChatContext
+from response_cache import ResponseCache, conversation_key
+
+FARM = {'farm_location': 'Pune', 'crop_type': 'Wheat', 'soil_type': 'Black'}
+TALK = ChatContext('Farmer asked about aphids on wheat.', [('Aphids on my wheat', 'Spray neem oil.')], None)
+OTHER_TALK = ChatContext('', [('Rust on my wheat', 'Use a fungicide.')], None)
+
+
+def test_standalone_questions_ignore_the_conversation():
+    assert conversation_key('When should I irrigate wheat?', TALK) == ''
+    assert conversation_key('What about it in winter?', None) == ''
+    assert conversation_key('What about it in winter?', TALK) != conversation_key('What about it in winter?',
+                                                                                   OTHER_TALK)
+
+
+def test_active_users_hit_the_cache_for_standalone_questions():
+    cache = ResponseCache()
+    cache.put('When should I irrigate wheat?', 'Early morning.', FARM, history=None)
+
+    assert cache.get('When should I irrigate wheat?', FARM, TALK).response == 'Early morning.'
+
+
+def test_follow_ups_only_hit_within_the_same_conversation():
+    cache = ResponseCache()
+    cache.put('How often should I spray it?', 'Every 10 days.', FARM, history=TALK)
+
+    assert cache.get('How often should I spray it?', FARM, TALK).response == 'Every 10 days.'
+    assert cache.get('How often should I spray it?', FARM, OTHER_TALK) is None
+    assert cache.get('How often should I spray it?', FARM) is None
+
+
+def test_repeated_chat_question_is_served_from_cache(app, client):
+    from app import write_batcher
+    from response_cache import response_cache
+
+    question = 'Which wheat variety suits late sowing in black soil?'
+    first = client.post('/api/chat', json={'message': question})
+    write_batcher.flush()  # The first turn is now part of the conversation
+    before = response_cache.stats()
+    second = client.post('/api/chat', json={'message': question})
+    after = response_cache.stats()
+
+    assert second.get_json()['response'] == first.get_json()['response']
+    assert after['hits_exact'] == before['hits_exact'] + 1
+    assert after['misses'] == before['misses']
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+import utils
+
+
+@pytest.mark.parametrize('filename', ['card.pdf', 'card.jpg', 'card.PNG', 'card.tiff', 'card.bmp', 'card.gif'])
+def test_soil_reports_accept_scans_photos_and_pdfs(filename):
+    assert utils.allowed_file(filename, 'document')
+
+
+def test_soil_report_upload_accepts_tiff(app, client, monkeypatch, tmp_path):
+    from PIL import Image
+
+    monkeypatch.setattr(utils, 'UPLOAD_FOLDER', str(tmp_path))
+    scan = io.BytesIO()
+    Image.new('L', (64, 64), 255).save(scan, format='TIFF')
+    scan.seek(0)
+
+    response = client.post('/api/analyze-soil', data={'file': (scan, 'card.tiff')},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 202
+
+
+def test_soil_report_upload_rejects_other_types(app, client):
+    response = client.post('/api/analyze-soil', data={'file': (io.BytesIO(b'MZ'), 'card.exe')},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('failure', [
+    {'ocr_text': 'OCR Error: tesseract is not installed'},
+    {'analysis_summary': 'AI Analysis Error: LLM endpoint returned 503'},
+    {'analysis_hindi': 'Soil is alkaline [Translation unavailable: timed out]'},
+    {'recommendations_marathi': 'Add gypsum [Translation unavailable: timed out]'},
+    {},
+])
+def test_only_successful_soil_analyses_are_reused(app, client, monkeypatch, tmp_path, failure):
+    import hashlib
+    from models import db, SoilReport, User
+
+    monkeypatch.setattr(utils, 'UPLOAD_FOLDER', str(tmp_path))
+    card = f'soil card {sorted(failure)}'.encode()
+    with app.app_context():
+        report = SoilReport(user_id=User.query.filter_by(username='tester').one().id,
+                            filename='card.pdf', file_path='card.pdf',
+                            content_hash=hashlib.sha256(card).hexdigest(), ocr_text='pH 7.2',
+                            analysis_summary='Soil is alkaline', analysis_marathi='ok', analysis_hindi='ok',
+                            recommendations_marathi='ok', recommendations_hindi='ok')
+        for column, value in failure.items():
+            setattr(report, column, value)
+        db.session.add(report)
+        db.session.commit()
+
+    response = client.post('/api/analyze-soil', data={'file': (io.BytesIO(card), 'card.pdf')},
+                           content_type='multipart/form-data')
+
+    # Duplicate uploads reuse a successful analysis and re-run a failed one
+    assert response.status_code == (202 if failure else 200)
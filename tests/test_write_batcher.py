@@ -0,0 +1,35 @@
+import pytest
+
+
+@pytest.fixture
+def batcher(app):
+    """A batcher that only writes when flush() is called"""
+    from database import WriteBehindBatcher
+
+    batcher = WriteBehindBatcher(app)
+    batcher.batch_size = 1000
+    batcher.flush_interval = 60
+    yield batcher
+    batcher.stop()
+
+
+def test_bad_row_does_not_lose_the_rest_of_the_batch(app, batcher, caplog):
+    from models import db, ChatHistory, User
+
+    with app.app_context():
+        user_id = User.query.filter_by(username='tester').one().id
+
+    good = [batcher.submit(ChatHistory, user_id=user_id, message=f'batch question {i}', response='answer')
+            for i in range(3)]
+    bad = batcher.submit(ChatHistory, user_id=user_id, message=None, response='answer')  # NOT NULL
+    good.append(batcher.submit(ChatHistory, user_id=user_id, message='batch question 3', response='answer'))
+
+    assert batcher.flush() == 4
+
+    with pytest.raises(Exception):
+        bad.result(timeout=1)
+    ids = [future.result(timeout=1) for future in good]
+    with app.app_context():
+        stored = ChatHistory.query.filter(ChatHistory.id.in_(ids)).all()
+        assert sorted(chat.message for chat in stored) == [f'batch question {i}' for i in range(4)]
+    assert 'Write-behind insert into chat_history failed' in caplog.text
@@ -0,0 +1,76 @@
+# Derived images (thumbnails and previews) for the dashboard gallery
+#
+# Derivatives are keyed by the source file's content hash, so a derivative URL
+# never changes meaning and can be cached by browsers forever.
+import os
+import tempfile
+
+from singleflight import SingleFlight
+from storage import content_path
+
+DERIVED_FOLDER = 'static/uploads/derived'
+
+# size name -> longest side in pixels
+DERIVATIVE_SIZES = {
+    'thumb': 256,
+    'medium': 1024
+}
+
+# format (URL extension) -> (PIL format, save options, mimetype)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}, 'image/webp'),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}, 'image/jpeg')
+}
+
+_generation = SingleFlight()
+
+
+def derivative_url(content_hash, size, fmt='webp'):
+    return f"/thumbs/{size}/{content_hash}.{fmt}"
+
+
+def derivative_path(content_hash, size, fmt):
+    return content_path(os.path.join(DERIVED_FOLDER, size), content_hash, f'.{fmt}')
+
+
+def _render(source_path, target_path, size, fmt):
+    from PIL import Image, ImageOps
+
+    pil_format, options, _ = DERIVATIVE_FORMATS[fmt]
+    max_side = DERIVATIVE_SIZES[size]
+
+    with Image.open(source_path) as image:
+        # For JPEG sources, draft() lets the decoder downscale by 1/2..1/8 while decoding
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        # Write to a temp file and rename, so readers never see a partial image
+        target_dir = os.path.dirname(target_path)
+        os.makedirs(target_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix=f'.{fmt}')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                image.save(out, pil_format, **options)
+            os.replace(tmp_path, target_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return target_path
+
+
+def get_derivative(source_path, content_hash, size, fmt='webp'):
+    """Path of the derivative on disk, rendering it on first use"""
+    target_path = derivative_path(content_hash, size, fmt)
+    if os.path.exists(target_path):
+        return target_path
+    # Concurrent first requests for the same derivative render it once
+    return _generation.do((content_hash, size, fmt), _render, source_path, target_path, size, fmt)
+
+
+def generate_derivatives(source_path, content_hash, fmt='webp'):
+    """Render every size up front (called at upload time)"""
+    return {size: get_derivative(source_path, content_hash, size, fmt) for size in DERIVATIVE_SIZES}
@@ -0,0 +1,205 @@
+# Cached, batched translation service with pluggable backends
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+
+from models import db, TranslationCache
+from metrics import timed
+
+
+def cache_key(text, target_language):
+    """Content hash identifying a (text, target language) pair"""
+    return hashlib.sha256(f"{target_language}\0{text}".encode('utf-8')).hexdigest()
+
+
+# ==================== Backends ====================
+
+class GoogleTranslateBackend:
+    """googletrans backend; one client is shared by all calls"""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from googletrans import Translator
+                self._client = Translator()
+            return self._client
+
+    def translate_many(self, texts, target_language):
+        """Translate a list of texts to one language in a single request"""
+        translations = self._get_client().translate(list(texts), dest=target_language)
+        return [t.text for t in translations]
+
+
+class OfflineBackend:
+    """Local backend that needs no network; returns glossary entries or the input text"""
+
+    def __init__(self, glossary=None):
+        self.glossary = glossary or {}
+
+    def translate_many(self, texts, target_language):
+        table = self.glossary.get(target_language, {})
+        return [table.get(text, text) for text in texts]
+
+
+BACKENDS = {
+    'google': GoogleTranslateBackend,
+    'offline': OfflineBackend
+}
+
+
+# ==================== Service ====================
+
+class TranslationService:
+    """
+    Translation front end: in-memory LRU -> SQLite translation_cache -> backend.
+    Misses for all target languages are sent to the backend together.
+    """
+
+    def __init__(self, lru_size=1024):
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._backend = None
+
+    def init_app(self, app):
+        """Read cache size and backend choice from the Flask config"""
+        self.lru_size = app.config.get('TRANSLATION_LRU_SIZE', self.lru_size)
+        self._backend = BACKENDS[app.config.get('TRANSLATION_BACKEND', 'google')]()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            name = 'google'
+            if has_app_context():
+                name = current_app.config.get('TRANSLATION_BACKEND', name)
+            self._backend = BACKENDS[name]()
+        return self._backend
+
+    def set_backend(self, backend):
+        """Swap the translation backend (e.g. OfflineBackend() in tests)"""
+        self._backend = backend
+        self.clear_memory()
+
+    def clear_memory(self):
+        with self._lock:
+            self._lru.clear()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _recall(self, key):
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+            return value
+
+    def translate_batch(self, texts, target_languages=('mr', 'hi')):
+        """
+        Translate every text into every target language.
+        Returns {language: [translation for each text]}.
+        """
+        texts = list(texts)
+        resolved = {}  # key -> translation or fallback for texts not found in the LRU
+        results = {lang: [None] * len(texts) for lang in target_languages}
+        pending = {}  # key -> (lang, text)
+
+        # 1. In-memory LRU
+        for lang in target_languages:
+            for i, text in enumerate(texts):
+                if not text:
+                    results[lang][i] = text
+                    continue
+                key = cache_key(text, lang)
+                cached = self._recall(key)
+                if cached is not None:
+                    results[lang][i] = cached
+                else:
+                    pending[key] = (lang, text)
+
+        # 2. Persistent SQLite cache (one query for all misses)
+        if pending and has_app_context():
+            rows = TranslationCache.query.filter(TranslationCache.key.in_(list(pending))).all()
+            for row in rows:
+                self._remember(row.key, row.translated_text)
+                resolved[row.key] = row.translated_text
+                pending.pop(row.key, None)
+
+        # 3. Backend, one call per language issued concurrently
+        if pending:
+            by_language = {}
+            for key, (lang, text) in pending.items():
+                by_language.setdefault(lang, []).append((key, text))
+            translated, fallback = self._translate_missing(by_language)
+            self._store(translated)
+            resolved.update(fallback)
+            resolved.update({key: output for key, (_, output) in translated.items()})
+
+        for lang in target_languages:
+            for i, text in enumerate(texts):
+                if results[lang][i] is None:
+                    results[lang][i] = resolved.get(cache_key(text, lang), text)
+        return results
+
+    @timed('translate_backend')
+    def _translate_missing(self, by_language):
+        """Call the backend for uncached texts; returns ({key: (lang, translation)}, {key: fallback})"""
+        translated = {}
+        fallback = {}
+
+        def run(lang):
+            items = by_language[lang]
+            try:
+                outputs = self.backend.translate_many([text for _, text in items], lang)
+                return lang, items, outputs, None
+            except Exception as e:
+                return lang, items, None, e
+
+        with ThreadPoolExecutor(max_workers=len(by_language)) as pool:
+            for lang, items, outputs, error in pool.map(run, list(by_language)):
+                if error is not None:
+                    # Fallback: return original text if translation fails (not cached)
+                    for key, text in items:
+                        fallback[key] = f"{text} [Translation unavailable: {str(error)}]"
+                    continue
+                for (key, _), output in zip(items, outputs):
+                    translated[key] = (lang, output)
+                    self._remember(key, output)
+        return translated, fallback
+
+    def _store(self, translated):
+        if not translated or not has_app_context():
+            return
+        try:
+            existing = {
+                key for (key,) in db.session.query(TranslationCache.key)
+                .filter(TranslationCache.key.in_(list(translated)))
+            }
+            db.session.add_all([
+                TranslationCache(key=key, target_language=lang, translated_text=text)
+                for key, (lang, text) in translated.items() if key not in existing
+            ])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning('Could not persist translations: %s', e)
+
+
+translator = TranslationService()
+
+
+@timed('translate')
+def translate_batch(texts, target_languages=('mr', 'hi')):
+    """Translate texts into several languages using the shared cached service"""
+    return translator.translate_batch(texts, target_languages)
@@ -1,17 +1,42 @@
 # Utility functions for image processing, OCR, AI, and translation
 import os
-import cv2
-import numpy as np
-from PIL import Image
-import pytesseract
+import re
+import zipfile
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import json
-from werkzeug.utils import secure_filename
-import requests
+from llm_client import llm_client
+from model_registry import model_registry
+from storage import store_stream, store_bytes
+from metrics import timed
 
 # Configuration
 UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'}
-ALLOWED_DOCUMENT_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+ALLOWED_DOCUMENT_EXTENSIONS = {'pdf'} | ALLOWED_IMAGE_EXTENSIONS  # Soil reports: scans, photos or PDFs
+
+# HSV range treated as healthy vegetation by the green-cover heuristic
+GREEN_HSV_LOWER = (40, 50, 50)
+GREEN_HSV_UPPER = (80, 255, 255)
+
+# Memory-bounded analysis: large frames are decoded at 1/2, 1/4 or 1/8 scale
+ANALYSIS_MAX_PIXELS = 4_000_000
+ANALYSIS_STRIP_ROWS = 256  # Rows converted to HSV at a time
+HEATMAP_GRID = (8, 8)  # (rows, cols) of the per-tile stress heatmap
+REDUCED_READ_FLAGS = {  # Names of cv2 flags, resolved on first use (cv2 is imported lazily)
+    1: 'IMREAD_COLOR',
+    2: 'IMREAD_REDUCED_COLOR_2',
+    4: 'IMREAD_REDUCED_COLOR_4',
+    8: 'IMREAD_REDUCED_COLOR_8'
+}
+
+# Pest detector (ml_models/pest_detector.h5, loaded through model_registry)
+PEST_MODEL_INPUT_SIZE = (224, 224)  # (width, height)
+PEST_THRESHOLD = 0.5
+
+# Batch analysis: frames are resized to a common size so they can be stacked
+BATCH_FRAME_SIZE = (512, 512)  # (width, height), multiples of HEATMAP_GRID
+BATCH_CHUNK_SIZE = 32  # Frames per stacked NumPy batch
 
 def allowed_file(filename, file_type='image'):
     """Check if file extension is allowed"""
@@ -20,67 +45,134 @@ def allowed_file(filename, file_type='image'):
     else:
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_DOCUMENT_EXTENSIONS
 
-def save_uploaded_file(file, folder='images'):
-    """Save uploaded file and return the file path"""
-    if file and allowed_file(file.filename, 'image'):
-        filename = secure_filename(file.filename)
-        # Create folder if it doesn't exist
-        folder_path = os.path.join(UPLOAD_FOLDER, folder)
-        os.makedirs(folder_path, exist_ok=True)
-        
-        # Add timestamp to avoid conflicts
-        import time
-        timestamp = int(time.time())
-        name, ext = os.path.splitext(filename)
-        filename = f"{name}_{timestamp}{ext}"
-        
-        file_path = os.path.join(folder_path, filename)
-        file.save(file_path)
-        return file_path
+def save_uploaded_file(file, folder='images', file_type='image'):
+    """
+    Stream an uploaded file into content-addressed storage.
+    Returns a StoredFile (path, content_hash, size), or None for a disallowed type.
+    """
+    if file and allowed_file(file.filename, file_type):
+        return store_stream(file.stream, file.filename, os.path.join(UPLOAD_FOLDER, folder))
+    return None
+
+def save_file_bytes(data, original_filename, folder='images'):
+    """Save raw file bytes (e.g. a frame extracted from a zip); returns a StoredFile or None"""
+    if data and allowed_file(original_filename, 'image'):
+        return store_bytes(data, os.path.basename(original_filename), os.path.join(UPLOAD_FOLDER, folder))
     return None
 
+def read_zip_frames(zip_file, max_frame_bytes=None):
+    """
+    Yield (filename, read) for every allowed image inside an uploaded zip
+    archive; read() returns the member's bytes. Nothing is decompressed until
+    read() is called, so a caller can stop at its frame limit. A member whose
+    uncompressed size exceeds max_frame_bytes is rejected (ValueError) up
+    front; zipfile never inflates past the size declared in the archive directory.
+    """
+    with zipfile.ZipFile(zip_file) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not allowed_file(info.filename, 'image'):
+                continue
+            if max_frame_bytes is not None and info.file_size > max_frame_bytes:
+                raise ValueError(f"Frame '{os.path.basename(info.filename)}' is larger than "
+                                 f"{max_frame_bytes // (1024 * 1024)} MB uncompressed")
+            yield os.path.basename(info.filename), functools.partial(archive.read, info)
+
+def classify_crop_stress(green_percentage):
+    """Map green cover percentage to (crop_stress_level, nutrient_deficiency)"""
+    if green_percentage < 30:
+        return "High", "Possible nitrogen deficiency detected"
+    elif green_percentage < 60:
+        return "Medium", None
+    else:
+        return "Low", None
+
+def read_image_reduced(image_path, max_pixels=None):
+    """
+    Decode an image at the largest power-of-two reduction (1, 2, 4 or 8) that
+    keeps it under max_pixels. The reduction happens inside the decoder, so
+    the full-resolution frame is never materialized.
+    Returns (image, scale) or (None, None) if the file cannot be decoded.
+    """
+    import cv2
+    from PIL import Image
+    
+    max_pixels = max_pixels or ANALYSIS_MAX_PIXELS
+    try:
+        with Image.open(image_path) as header:  # Reads only the header
+            width, height = header.size
+    except Exception:
+        width, height = 0, 0
+    
+    scale = 1
+    while scale < 8 and (width // scale) * (height // scale) > max_pixels:
+        scale *= 2
+    
+    image = cv2.imread(image_path, getattr(cv2, REDUCED_READ_FLAGS[scale]))
+    if image is None:
+        return None, None
+    return image, scale
+
+def green_tile_grid(image, grid=None):
+    """
+    Per-tile green cover for a BGR image, computed strip by strip so only a
+    few hundred rows are converted to HSV at a time.
+    Returns (green_percentage_grid as float array [rows, cols], overall percentage).
+    """
+    import cv2
+    import numpy as np
+    
+    rows, cols = grid or HEATMAP_GRID
+    height, width = image.shape[:2]
+    row_edges = np.linspace(0, height, rows + 1).astype(int)
+    col_edges = np.linspace(0, width, cols + 1).astype(int)
+    green_counts = np.zeros((rows, cols), dtype=np.int64)
+    
+    for r in range(rows):
+        for y0 in range(row_edges[r], row_edges[r + 1], ANALYSIS_STRIP_ROWS):
+            y1 = min(y0 + ANALYSIS_STRIP_ROWS, row_edges[r + 1])
+            hsv = cv2.cvtColor(image[y0:y1], cv2.COLOR_BGR2HSV)
+            mask = cv2.inRange(hsv, GREEN_HSV_LOWER, GREEN_HSV_UPPER)
+            # Green pixels per column, then summed within each tile's column range
+            column_counts = np.count_nonzero(mask, axis=0)
+            green_counts[r] += np.add.reduceat(column_counts, col_edges[:-1])
+    
+    tile_pixels = np.outer(np.diff(row_edges), np.diff(col_edges))
+    grid_percentage = green_counts / np.maximum(tile_pixels, 1) * 100
+    overall = green_counts.sum() / max(height * width, 1) * 100
+    return grid_percentage, float(overall)
+
+def stress_heatmap(grid_percentage):
+    """JSON-friendly per-tile heatmap: green cover and stress level per tile"""
+    import numpy as np
+    
+    return {
+        'rows': int(grid_percentage.shape[0]),
+        'cols': int(grid_percentage.shape[1]),
+        'green_percentage': np.round(grid_percentage, 1).tolist(),
+        'stress_level': [[classify_crop_stress(value)[0] for value in row] for row in grid_percentage.tolist()]
+    }
+
+@timed('ml_image')
 def analyze_image_with_ml(image_path):
     """
     Analyze drone/field image using ML models for crop stress, pests, and nutrient deficiency
     This is a placeholder - integrate with your actual ML models
     """
     try:
-        # Load image
-        image = cv2.imread(image_path)
+        # Load image, reduced in the decoder for very large frames
+        image, scale = read_image_reduced(image_path)
         if image is None:
             return {'error': 'Could not load image'}
         
-        # Convert to RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
         # Placeholder analysis - Replace with actual ML model inference
-        # Example: Using color analysis as a simple placeholder
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        
-        # Simple heuristics (replace with actual ML models)
-        green_mask = cv2.inRange(hsv, (40, 50, 50), (80, 255, 255))
-        green_percentage = (np.sum(green_mask > 0) / green_mask.size) * 100
+        # Green-cover heuristic, accumulated per tile without full-frame HSV/mask copies
+        grid_percentage, green_percentage = green_tile_grid(image)
         
         # Determine crop stress level based on green percentage
-        if green_percentage < 30:
-            crop_stress_level = "High"
-            nutrient_deficiency = "Possible nitrogen deficiency detected"
-        elif green_percentage < 60:
-            crop_stress_level = "Medium"
-            nutrient_deficiency = None
-        else:
-            crop_stress_level = "Low"
-            nutrient_deficiency = None
-        
-        # Simple pest detection placeholder (replace with actual pest detection model)
-        # In production, use your pest_detector.h5 model here
-        pest_detected = False
-        pest_type = None
-        
-        # You can load your actual models here:
-        # from tensorflow import keras
-        # pest_model = keras.models.load_model('ml_models/pest_detector.h5')
-        # pest_prediction = pest_model.predict(preprocessed_image)
+        crop_stress_level, nutrient_deficiency = classify_crop_stress(green_percentage)
+        
+        # Pest detection with the shared, micro-batched pest_detector model
+        pest_detected, pest_type = detect_pests([image])[0]
         
         result = {
             'crop_stress_level': crop_stress_level,
@@ -88,37 +180,174 @@ def analyze_image_with_ml(image_path):
             'pest_type': pest_type,
             'nutrient_deficiency': nutrient_deficiency,
             'green_percentage': round(green_percentage, 2),
-            'image_health_score': round((green_percentage / 100) * 100, 2)
+            'image_health_score': round((green_percentage / 100) * 100, 2),
+            'analysis_scale': scale,
+            'stress_heatmap': stress_heatmap(grid_percentage)
         }
         
         return result
     except Exception as e:
         return {'error': str(e)}
 
+def _pest_from_scores(scores, labels):
+    import numpy as np
+    
+    scores = np.ravel(scores)
+    if scores.size == 1:
+        # Single sigmoid output: probability that a pest is present
+        return bool(scores[0] >= PEST_THRESHOLD), None
+    
+    best = int(np.argmax(scores))
+    label = labels[best] if labels and best < len(labels) else f'class_{best}'
+    if scores[best] < PEST_THRESHOLD or label.lower() == 'healthy':
+        return False, None
+    return True, label
+
+@timed('ml_pest')
+def detect_pests(images_bgr):
+    """
+    Run the pest detector on BGR images; returns [(pest_detected, pest_type), ...].
+    Inputs are submitted together so the registry can batch them into one forward pass.
+    Falls back to (False, None) when the model is not available.
+    """
+    if not model_registry.available('pest_detector'):
+        return [(False, None) for _ in images_bgr]
+    
+    import cv2
+    import numpy as np
+    
+    futures = []
+    for image_bgr in images_bgr:
+        # Resize first so the RGB conversion only touches the small model input
+        small = cv2.resize(image_bgr, PEST_MODEL_INPUT_SIZE, interpolation=cv2.INTER_AREA)
+        x = cv2.cvtColor(small, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+        futures.append(model_registry.predict_async('pest_detector', x))
+    labels = model_registry.labels('pest_detector')
+    return [_pest_from_scores(future.result(timeout=30), labels) for future in futures]
+
+def _decode_frame(data):
+    """Decode encoded image bytes and resize to the common batch frame size"""
+    import cv2
+    import numpy as np
+    
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    return cv2.resize(image, BATCH_FRAME_SIZE, interpolation=cv2.INTER_AREA)
+
+@timed('ml_batch')
+def analyze_images_batch(frames_data):
+    """
+    Analyze many encoded frames at once.
+    Frames are decoded in parallel (OpenCV releases the GIL), then the HSV
+    green-mask heuristic runs on stacked NumPy batches instead of per image.
+    Returns one result dict per input, in order (with 'error' for undecodable frames).
+    """
+    import cv2
+    import numpy as np
+    
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        decoded = list(pool.map(_decode_frame, frames_data))
+    
+    results = [{'error': 'Could not load image'} for _ in decoded]
+    valid = [i for i, image in enumerate(decoded) if image is not None]
+    lower = np.array(GREEN_HSV_LOWER, dtype=np.uint8)
+    upper = np.array(GREEN_HSV_UPPER, dtype=np.uint8)
+    width, height = BATCH_FRAME_SIZE
+    
+    for start in range(0, len(valid), BATCH_CHUNK_SIZE):
+        chunk = valid[start:start + BATCH_CHUNK_SIZE]
+        stack = np.stack([decoded[i] for i in chunk])
+        
+        # cvtColor works on 2D images, so convert the batch as one tall image
+        hsv = cv2.cvtColor(stack.reshape(-1, width, 3), cv2.COLOR_BGR2HSV).reshape(stack.shape)
+        green_mask = np.all((hsv >= lower) & (hsv <= upper), axis=-1)
+        green_percentages = green_mask.mean(axis=(1, 2)) * 100
+        
+        # Per-tile green cover for every frame at once (frame size is a multiple of the grid)
+        rows, cols = HEATMAP_GRID
+        tile_grids = green_mask.reshape(len(chunk), rows, height // rows, cols, width // cols).mean(axis=(2, 4)) * 100
+        
+        pests = detect_pests([decoded[i] for i in chunk])
+        
+        for i, green_percentage, tile_grid, (pest_detected, pest_type) in zip(
+                chunk, green_percentages.tolist(), tile_grids, pests):
+            crop_stress_level, nutrient_deficiency = classify_crop_stress(green_percentage)
+            results[i] = {
+                'crop_stress_level': crop_stress_level,
+                'pest_detected': pest_detected,
+                'pest_type': pest_type,
+                'nutrient_deficiency': nutrient_deficiency,
+                'green_percentage': round(green_percentage, 2),
+                'image_health_score': round(green_percentage, 2),
+                'stress_heatmap': stress_heatmap(tile_grid)
+            }
+    
+    return results
+
+def summarize_flight(results):
+    """Aggregate per-frame batch results into per-flight statistics"""
+    import numpy as np
+    
+    analyzed = [r for r in results if 'error' not in r]
+    green = np.array([r['green_percentage'] for r in analyzed], dtype=np.float64)
+    
+    stress_histogram = {'Low': 0, 'Medium': 0, 'High': 0}
+    for r in analyzed:
+        stress_histogram[r['crop_stress_level']] += 1
+    
+    counts, edges = np.histogram(green, bins=10, range=(0, 100))
+    
+    return {
+        'frame_count': len(results),
+        'analyzed_count': len(analyzed),
+        'failed_count': len(results) - len(analyzed),
+        'mean_green_percentage': round(float(green.mean()), 2) if green.size else None,
+        'min_green_percentage': round(float(green.min()), 2) if green.size else None,
+        'max_green_percentage': round(float(green.max()), 2) if green.size else None,
+        'stress_histogram': stress_histogram,
+        'green_percentage_histogram': [
+            {'range': [int(edges[i]), int(edges[i + 1])], 'count': int(counts[i])}
+            for i in range(len(counts))
+        ]
+    }
+
+@timed('ocr')
 def extract_text_with_ocr(image_path):
     """
-    Extract text from soil report image using OCR
+    Extract text from soil report image or PDF using OCR
+    Results are cached by file content hash, so re-uploads skip tesseract
     """
     try:
-        # Load image
-        image = Image.open(image_path)
+        import ocr
+        from flask import has_app_context
+        from models import db, OcrCache
+        
+        content_hash = ocr.file_sha256(image_path)
+        if has_app_context():
+            cached = db.session.get(OcrCache, content_hash)
+            if cached:
+                return cached.ocr_text
         
-        # Perform OCR
-        text = pytesseract.image_to_string(image, lang='eng')
+        # Preprocess (deskew, binarize, downscale) and OCR each page
+        text = ocr.extract_text(image_path)
         
-        return text.strip()
+        if has_app_context():
+            db.session.merge(OcrCache(content_hash=content_hash, ocr_text=text))
+            db.session.commit()
+        
+        return text
     except Exception as e:
         return f"OCR Error: {str(e)}"
 
+@timed('llm_soil')
 def analyze_soil_with_ai(ocr_text):
     """
     Analyze soil report text using AI/LLM (Gemma or similar)
     This is a placeholder - integrate with your actual LLM API
     """
     try:
-        # Placeholder - Replace with actual LLM API call
-        # Example prompt for Gemma or similar LLM
-        
+        # Prompt for Gemma or similar LLM (sent when GEMMA_API_URL is configured)
         prompt = f"""Analyze the following soil report text and provide:
 1. A brief summary of key nutrient levels (N, P, K, pH, etc.)
 2. Overall soil health assessment
@@ -129,9 +358,8 @@ Soil Report Text:
 
 Please provide a clear, concise analysis:"""
         
-        # In production, replace this with actual API call:
-        # response = requests.post('YOUR_LLM_API_ENDPOINT', json={'prompt': prompt})
-        # ai_summary = response.json()['summary']
+        if llm_client.configured:
+            return llm_client.generate(prompt, max_tokens=500).strip()
         
         # Placeholder response
         ai_summary = f"""
@@ -157,18 +385,13 @@ Please provide a clear, concise analysis:"""
 def translate_text(text, target_language='hi'):
     """
     Translate text to Marathi (mr) or Hindi (hi)
-    Using googletrans library or similar translation service
+    Served from the translation cache; see translation.py for backends
     """
-    try:
-        from googletrans import Translator
-        
-        translator = Translator()
-        translation = translator.translate(text, dest=target_language)
-        return translation.text
-    except Exception as e:
-        # Fallback: return original text if translation fails
-        return f"{text} [Translation unavailable: {str(e)}]"
+    from translation import translate_batch
+    
+    return translate_batch([text], (target_language,))[target_language][0]
 
+@timed('llm_weather')
 def get_weather_suggestion(user_location, crop_type):
     """
     Get weather-based farming suggestions
@@ -190,37 +413,42 @@ def get_weather_suggestion(user_location, crop_type):
     except Exception as e:
         return f"Weather suggestion error: {str(e)}"
 
-def chat_with_gemma(user_query, user_context=None):
+def build_chat_prompt(user_query, user_context=None, history=None):
     """
-    Send user query to Gemma LLM API
-    Enhanced with user's farm context for better responses
+    Build the context-aware prompt sent to Gemma
+    history is a chat_context.ChatContext (summary plus recent turns), already
+    trimmed to the token budget
     """
-    try:
-        # Build context-aware prompt
-        context_prompt = ""
-        if user_context:
-            context_prompt = f"""
-            User Context:
-            - Farm Location: {user_context.get('farm_location', 'Not specified')}
-            - Crop Type: {user_context.get('crop_type', 'Not specified')}
-            - Soil Type: {user_context.get('soil_type', 'Not specified')}
-            
-            """
-        
-        full_prompt = f"""{context_prompt}
-        User Question: {user_query}
-        
-        Please provide a helpful, accurate answer based on the context above:"""
-        
-        # Placeholder - Replace with actual Gemma API call
-        # response = requests.post('YOUR_GEMMA_API_ENDPOINT', json={
-        #     'prompt': full_prompt,
-        #     'max_tokens': 500
-        # })
-        # return response.json()['response']
+    context_prompt = ""
+    if user_context:
+        context_prompt = f"""
+        User Context:
+        - Farm Location: {user_context.get('farm_location', 'Not specified')}
+        - Crop Type: {user_context.get('crop_type', 'Not specified')}
+        - Soil Type: {user_context.get('soil_type', 'Not specified')}
         
-        # Placeholder response
-        response = f"""
+        """
+    
+    history_prompt = ""
+    if history and history.summary:
+        history_prompt += f"""
+    Earlier Conversation (summary):
+    {history.summary}
+    """
+    if history and history.turns:
+        turns = "\n".join(f"    Farmer: {message}\n    Assistant: {response}" for message, response in history.turns)
+        history_prompt += f"""
+    Recent Conversation:
+{turns}
+    """
+    
+    return f"""{context_prompt}{history_prompt}
+    User Question: {user_query}
+    
+    Please provide a helpful, accurate answer based on the context above:"""
+
+def _placeholder_chat_response(user_query, user_context=None):
+    return f"""
         **Answer to: "{user_query}"**
         
         Based on your farm context ({user_context.get('crop_type', 'farming') if user_context else 'general farming'}), 
@@ -231,9 +459,73 @@ def chat_with_gemma(user_query, user_context=None):
         1. Connecting to Gemma API endpoint
         2. Including user's farm data in the prompt
         3. Handling conversation history for better context
-        """
-        
-        return response.strip()
+        """.strip()
+
+@timed('llm_chat_stream')
+def stream_chat_with_gemma(user_query, user_context=None, history=None):
+    """
+    Generator yielding Gemma's answer token by token.
+    With an LLM endpoint configured (GEMMA_API_URL), tokens are streamed
+    through the pooled client in llm_client.py; otherwise the placeholder
+    answer is yielded word by word.
+    """
+    if llm_client.configured:
+        yield from llm_client.stream(build_chat_prompt(user_query, user_context, history), max_tokens=500)
+        return
+    
+    # Placeholder response, streamed word by word
+    for token in re.findall(r'\S+\s*', _placeholder_chat_response(user_query, user_context)):
+        yield token
+
+@timed('llm_chat')
+def chat_with_gemma(user_query, user_context=None, history=None):
+    """
+    Send user query to Gemma LLM API
+    Enhanced with user's farm context and recent conversation for better responses
+    """
+    try:
+        if llm_client.configured:
+            # Non-streaming calls are coalesced: identical prompts share one upstream request
+            return llm_client.generate(build_chat_prompt(user_query, user_context, history), max_tokens=500).strip()
+        return ''.join(stream_chat_with_gemma(user_query, user_context, history)).strip()
     except Exception as e:
         return f"Chat error: {str(e)}"
 
+def _extractive_summary(previous_summary, turns, max_tokens):
+    """Fallback summary: the farmer's questions, newest kept when over budget"""
+    lines = [line for line in (previous_summary or '').splitlines() if line.strip()]
+    for message, _ in turns:
+        question = ' '.join((message or '').split())
+        if question:
+            lines.append(f"- Asked: {question[:160]}")
+    while len(lines) > 1 and len('\n'.join(lines)) > max_tokens * 4:
+        lines.pop(0)
+    return '\n'.join(lines)[:max_tokens * 4]
+
+@timed('llm_chat_summary')
+def summarize_conversation(previous_summary, turns, max_tokens=250):
+    """
+    Fold chat turns [(message, response)], oldest first, into the rolling
+    conversation summary. Without an LLM endpoint (or if the call fails) the
+    summary is a trimmed list of the farmer's earlier questions.
+    """
+    if llm_client.configured:
+        transcript = "\n".join(f"Farmer: {message}\nAssistant: {response}" for message, response in turns)
+        prompt = f"""Update the summary of a conversation between a farmer and a farming assistant.
+Keep the farmer's crops, problems, decisions and any advice still relevant; drop small talk.
+Answer with the updated summary only, in at most {max_tokens * 3 // 4} words.
+
+Current Summary:
+{previous_summary or '(none)'}
+
+New Conversation Turns:
+{transcript}
+
+Updated Summary:"""
+        try:
+            summary = llm_client.generate(prompt, max_tokens=max_tokens).strip()
+            if summary:
+                return summary
+        except Exception:
+            pass
+    return _extractive_summary(previous_summary, turns, max_tokens)
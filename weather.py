@@ -0,0 +1,180 @@
+# Shared daily weather advisories, generated once per (location, crop)
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, WeatherAdvisory, WeatherSuggestion
+from singleflight import SingleFlight
+from translation import translate_batch
+from utils import get_weather_suggestion
+
+_generation = SingleFlight()
+
+
+def advisory_key(user):
+    """The (location, crop) pair an advisory depends on"""
+    return (user.farm_location or 'Unknown', user.crop_type or 'General')
+
+
+def get_or_create_advisory(farm_location, crop_type, date):
+    """Return today's shared advisory for a location/crop, generating it at most once"""
+    advisory = WeatherAdvisory.query.filter_by(
+        date=date, farm_location=farm_location, crop_type=crop_type
+    ).first()
+    if advisory:
+        return advisory
+
+    # Concurrent first requests in this process wait for the same generation
+    advisory_id = _generation.do((date, farm_location, crop_type),
+                                 _generate_advisory, farm_location, crop_type, date)
+    return db.session.get(WeatherAdvisory, advisory_id)
+
+
+def _generate_advisory(farm_location, crop_type, date):
+    existing = db.session.query(WeatherAdvisory.id).filter_by(
+        date=date, farm_location=farm_location, crop_type=crop_type
+    ).first()
+    if existing:
+        return existing.id
+
+    suggestion_text = get_weather_suggestion(farm_location, crop_type)
+    translations = translate_batch([suggestion_text], ('mr', 'hi'))
+
+    advisory = WeatherAdvisory(
+        date=date,
+        farm_location=farm_location,
+        crop_type=crop_type,
+        suggestion_text=suggestion_text,
+        suggestion_marathi=translations['mr'][0],
+        suggestion_hindi=translations['hi'][0]
+    )
+    try:
+        db.session.add(advisory)
+        db.session.commit()
+        return advisory.id
+    except IntegrityError:
+        # Another process generated it first; use theirs
+        db.session.rollback()
+        return db.session.query(WeatherAdvisory.id).filter_by(
+            date=date, farm_location=farm_location, crop_type=crop_type
+        ).scalar()
+
+
+def suggestion_from_advisory(user_id, advisory):
+    return WeatherSuggestion(
+        user_id=user_id,
+        date=advisory.date,
+        suggestion_text=advisory.suggestion_text,
+        suggestion_marathi=advisory.suggestion_marathi,
+        suggestion_hindi=advisory.suggestion_hindi
+    )
+
+
+def get_user_suggestion(user, date):
+    """Return the user's suggestion for a date, fanning out the shared advisory if needed"""
+    suggestion = WeatherSuggestion.query.filter_by(user_id=user.id, date=date).first()
+    if suggestion:
+        return suggestion
+
+    advisory = get_or_create_advisory(*advisory_key(user), date)
+    suggestion = suggestion_from_advisory(user.id, advisory)
+    try:
+        db.session.add(suggestion)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request (or the pre-warm job) created it first
+        db.session.rollback()
+        suggestion = WeatherSuggestion.query.filter_by(user_id=user.id, date=date).first()
+    return suggestion
+
+
+def prewarm_weather_advisories(date=None):
+    """
+    Generate every distinct (location, crop) advisory for a date once, then
+    bulk-create suggestions for users who do not have one yet.
+    """
+    date = date or datetime.utcnow().date()
+    location = db.func.coalesce(User.farm_location, 'Unknown')
+    crop = db.func.coalesce(User.crop_type, 'General')
+
+    groups = db.session.query(location, crop).group_by(location, crop).all()
+    advisories = {}
+    for farm_location, crop_type in groups:
+        advisories[(farm_location, crop_type)] = get_or_create_advisory(farm_location, crop_type, date)
+
+    # Users without a suggestion for this date
+    has_suggestion = db.session.query(WeatherSuggestion.id).filter(
+        WeatherSuggestion.user_id == User.id,
+        WeatherSuggestion.date == date
+    ).exists()
+    missing = db.session.query(User.id, location, crop).filter(~has_suggestion).all()
+
+    created = 0
+    for user_id, farm_location, crop_type in missing:
+        db.session.add(suggestion_from_advisory(user_id, advisories[(farm_location, crop_type)]))
+    try:
+        db.session.commit()
+        created = len(missing)
+    except IntegrityError:
+        # Some users requested theirs meanwhile; fall back to per-user inserts
+        db.session.rollback()
+        for user_id, farm_location, crop_type in missing:
+            try:
+                db.session.add(suggestion_from_advisory(user_id, advisories[(farm_location, crop_type)]))
+                db.session.commit()
+                created += 1
+            except IntegrityError:
+                db.session.rollback()
+
+    return {
+        'date': date.isoformat(),
+        'advisories': len(advisories),
+        'suggestions_created': created
+    }
+
+
+# ==================== Scheduler ====================
+
+class WeatherPrewarmScheduler:
+    """
+    Daemon thread that enqueues a 'weather_prewarm' job once a day at
+    WEATHER_PREWARM_TIME (UTC, HH:MM), ahead of the morning login spike.
+    The job id is derived from the date, so several processes scheduling
+    the same day produce a single job.
+    """
+
+    def __init__(self, app, job_queue):
+        self.app = app
+        self.job_queue = job_queue
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name='weather-prewarm', daemon=True)
+            self._thread.start()
+
+    def next_run(self, now=None):
+        now = now or datetime.utcnow()
+        hour, minute = (int(part) for part in self.app.config['WEATHER_PREWARM_TIME'].split(':'))
+        run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        return run_at
+
+    def _loop(self):
+        while True:
+            run_at = self.next_run()
+            time.sleep(max(0, (run_at - datetime.utcnow()).total_seconds()))
+            try:
+                with self.app.app_context():
+                    self.job_queue.enqueue('weather_prewarm', {'date': run_at.date().isoformat()},
+                                           job_id=f"weather-prewarm-{run_at.date().isoformat()}")
+            except IntegrityError:
+                pass  # Already scheduled by another process
+            except Exception as e:
+                self.app.logger.exception('Could not schedule weather pre-warm: %s', e)
@@ -0,0 +1,42 @@
+# Production entry point:  gunicorn -c gunicorn.conf.py wsgi:app
+#
+# With preload_app the master imports this module once (Flask, the heavy
+# libraries in PRELOAD_MODULES, the schema migration and, with MODEL_PRELOAD,
+# the ML models) and forks workers that share those pages copy-on-write.
+# Anything holding threads, sockets or SQLite connections is (re)created per
+# worker in after_fork().
+import importlib
+
+from app import app, db, job_queue, write_batcher, llm_client, ensure_schema
+
+# The app imports these on first use; load them in the master so workers share
+# the pages and no worker pays the import on its first request
+PRELOAD_MODULES = ('numpy', 'cv2', 'PIL.Image', 'requests')
+
+DEFAULT_SECRET_KEY = 'your-secret-key-change-this-in-production'
+
+if app.config['SECRET_KEY'] == DEFAULT_SECRET_KEY:
+    app.logger.warning('SECRET_KEY is the development default; set FLASK_SECRET_KEY in production')
+
+for module in PRELOAD_MODULES:
+    importlib.import_module(module)
+
+# Migrate once in the master, before any worker is forked
+ensure_schema()
+
+
+def after_fork():
+    """Per-worker setup, called by gunicorn's post_fork hook"""
+    with app.app_context():
+        # SQLite connections opened in the master must not be shared across processes
+        db.engine.dispose(close=False)
+    llm_client.init_app(app)  # Fresh HTTP connection pool
+    # Every worker claims queued jobs (claims are atomic), so work left by a
+    # recycled worker is picked up without waiting for a new upload
+    job_queue.start()
+
+
+def before_exit():
+    """Graceful worker shutdown (recycling or reload): finish running jobs, flush pending inserts"""
+    job_queue.stop(wait=True)
+    write_batcher.stop()